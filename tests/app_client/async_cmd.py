@@ -0,0 +1,109 @@
+from typing import List, Tuple, Union
+
+from app_client.cmd import parse_app_and_version, parse_version, parse_xpub
+from app_client.cmd_builder import CommandBuilder, InsType
+from app_client.exception import DeviceException
+from app_client.token import Token
+from app_client.transaction import ChangeInfo, Transaction
+from app_client.transport import AsyncApduTransport
+from app_client.utils import Bip32Path
+
+
+class AsyncCommand:
+    """asyncio version of `Command`.
+
+    APDUs are built with the same `CommandBuilder`, only the I/O is awaited,
+    so many devices can be driven from a single event loop.
+    """
+
+    def __init__(self, transport: AsyncApduTransport, debug: bool = False) -> None:
+        self.builder = CommandBuilder(debug=debug)
+        self.debug = debug
+        self.transport = transport
+
+    async def exchange(self, apdu: bytes, ins: int) -> bytes:
+        sw, response = await self.transport.exchange_apdu_raw(apdu)
+
+        if sw != 0x9000:
+            raise DeviceException(error_code=sw, ins=ins)
+
+        return response
+
+    async def get_app_and_version(self) -> Tuple[str, str]:
+        response = await self.exchange(self.builder.get_app_and_version(), 0x01)
+
+        return parse_app_and_version(response)
+
+    async def get_version(self) -> Tuple[bytes, int, int, int]:
+        response = await self.exchange(
+            self.builder.get_version(), InsType.INS_GET_VERSION
+        )
+
+        return parse_version(response)
+
+    async def get_address(self, bip32_path: Union[str, Bip32Path]) -> None:
+        await self.exchange(
+            self.builder.get_address(bip32_path), InsType.INS_GET_ADDRESS
+        )
+
+    async def get_xpub(
+        self, bip32_path: Union[str, Bip32Path]
+    ) -> Tuple[bytes, bytes, bytes]:
+        response = await self.exchange(
+            self.builder.get_xpub(bip32_path=bip32_path), InsType.INS_GET_XPUB
+        )
+
+        return parse_xpub(response)
+
+    async def sign_tx(
+        self,
+        transaction: Transaction,
+        change_list: List["ChangeInfo"] = [],
+        use_old_protocol: bool = False,
+        stream: bool = False,
+    ) -> List[bytes]:
+        for chunk in self.builder.sign_tx_send_data(
+            transaction=transaction,
+            change_list=change_list,
+            use_old_protocol=use_old_protocol,
+            stream=stream,
+            views=True,
+        ):
+            await self.exchange(chunk, InsType.INS_SIGN_TX)
+
+        # ask for signatures
+        signatures: List[bytes] = []
+        for chunk in self.builder.sign_tx_signatures(transaction):
+            signatures.append(await self.exchange(chunk, InsType.INS_SIGN_TX))
+
+        await self.exchange(self.builder.sign_tx_end(), InsType.INS_SIGN_TX)
+
+        return signatures
+
+    async def sign_token_data(self, token: Token) -> bytes:
+        return await self.exchange(
+            self.builder.sign_token_data(token), InsType.INS_SIGN_TOKEN_DATA
+        )
+
+    async def send_token_data(self, token: Token, signature: bytes, num: int = 0):
+        await self.exchange(
+            self.builder.send_token_data(token, signature, num=num),
+            InsType.INS_SEND_TOKEN_DATA,
+        )
+
+    async def send_token_data_list(self, tokens: List[Token], signatures: List[bytes]):
+        assert len(tokens) == len(signatures)
+        for i, token in enumerate(tokens):
+            await self.send_token_data(token, signatures[i], num=i)
+
+    async def verify_token_signature(self, token: Token, signature: bytes):
+        await self.exchange(
+            self.builder.verify_token_signature(token, signature),
+            InsType.INS_VERIFY_TOKEN_SIGNATURE,
+        )
+
+    async def reset_token_signatures(self):
+        await self.exchange(
+            self.builder.reset_token_signatures(),
+            InsType.INS_RESET_TOKEN_SIGNATURES,
+        )
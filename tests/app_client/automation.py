@@ -1,12 +1,19 @@
+import asyncio
+import hashlib
+import json
+import logging
 import operator
+import threading
 from abc import ABCMeta, abstractmethod
 from enum import IntEnum
 from functools import reduce
-from typing import Tuple
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
 from urllib.parse import urljoin
 
 from requests import Session
 
+from app_client.trace import tracer
+
 
 class ConditionFlag(IntEnum):
     RUN_ONCE = 1
@@ -68,6 +75,8 @@ class Rules:
         is_regex: bool = False,
         conditions: Tuple[str, ConditionFlag] = None,
     ) -> dict:
+        # copy, actions are often shared lists like `Rules.go_left`
+        actions = [list(action) for action in actions]
         rule = {}
         if text:
             if is_regex:
@@ -147,6 +156,64 @@ class Rules:
     # sign_tx_quit_rule?
 
 
+class RuleSet:
+    """Immutable automation rule set, compiled once to its JSON payload.
+
+    Attributes
+    ----------
+    payload: bytes
+        Canonical JSON body of the POST /automation request.
+    digest: str
+        sha256 of `payload`, equal rule sets have the same digest.
+    stateful: bool
+        Whether some rule has conditions, posting it again resets the
+        variables of those conditions on the simulator.
+
+    """
+
+    __slots__ = ("payload", "digest", "stateful")
+
+    _cache: Dict[str, "RuleSet"] = {}
+
+    def __init__(self, payload: bytes, stateful: bool) -> None:
+        object.__setattr__(self, "payload", payload)
+        object.__setattr__(self, "digest", hashlib.sha256(payload).hexdigest())
+        object.__setattr__(self, "stateful", stateful)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RuleSet is immutable")
+
+    @classmethod
+    def compile(cls, rules: Sequence[dict]) -> "RuleSet":
+        """Rule set of `rules`, the same rules always give the same object."""
+        text = json.dumps(
+            {"version": 1, "rules": list(rules)},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        ruleset = cls._cache.get(text)
+        if ruleset is None:
+            stateful = any("conditions" in rule for rule in rules)
+            ruleset = cls._cache[text] = cls(text.encode(), stateful)
+        return ruleset
+
+    @property
+    def rules(self) -> List[dict]:
+        """Decoded copy of the rules."""
+        return json.loads(self.payload)["rules"]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, RuleSet):
+            return self.digest == other.digest
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+    def __repr__(self) -> str:
+        return f"RuleSet({self.digest[:16]})"
+
+
 class Automation(metaclass=ABCMeta):
     @abstractmethod
     def set_accept_all(self):
@@ -166,9 +233,19 @@ class FakeAutomation(Automation):
 
 
 class CommandAutomation:
+    """Speculos automation client.
+
+    The digest of the last rule set posted is kept, posting the same stateless
+    rule set again is skipped. Call `invalidate` when the simulator is
+    restarted or its rules are changed by another client.
+    """
+
     def __init__(self, server: str) -> None:
         self.server = server
         self.session = Session()
+        self.active: Optional[str] = None
+        self.posted: int = 0
+        self.skipped: int = 0
 
     def close(self) -> None:
         self.session.close()
@@ -176,31 +253,235 @@ class CommandAutomation:
     def endpoint(self, path: str) -> str:
         return urljoin(self.server, path)
 
-    def automation(self, rules: dict) -> None:
-        print("Automation ======")
-        print(rules)
-        url = self.endpoint("/automation")
-        print(url)
+    def invalidate(self) -> None:
+        self.active = None
+
+    def automation(self, rules: Union[Sequence[dict], RuleSet]) -> None:
+        ruleset = rules if isinstance(rules, RuleSet) else RuleSet.compile(rules)
+        if ruleset.digest == self.active and not ruleset.stateful:
+            self.skipped += 1
+            return
+        if tracer.enabled:
+            tracer.event(logging.DEBUG, "automation: %s", ruleset.payload.decode())
+        self.active = None
         response = self.session.post(
-            url,
-            json={
-                "version": 1,
-                "rules": rules,
-            },
+            self.endpoint("/automation"),
+            data=ruleset.payload,
+            headers={"Content-Type": "application/json"},
         )
-        print(response.status_code, response.text)
+        self.posted += 1
         if response.status_code != 200:
+            if tracer.enabled:
+                tracer.event(
+                    logging.ERROR,
+                    "automation: %s %s",
+                    response.status_code,
+                    response.text,
+                )
             raise Exception("automation failed")
+        self.active = ruleset.digest
 
     def set_accept_all(self):
-        rules = [
-            Rules.rule(Rules.go_left, "Address"),
-            Rules.rule(Rules.go_left, "Output"),
-            Rules.rule(Rules.go_left, "Transaction?"),
-            Rules.rule(Rules.go_left, "access?"),
-            Rules.rule(Rules.go_left, "Confirm token data"),
-            Rules.rule(Rules.go_left, "Reset token signatures"),
-            Rules.rule(Rules.go_left, "Reject"),
-            Rules.rule(Rules.press_both, "Approve"),
-        ]
-        self.automation(rules)
+        self.automation(ACCEPT_ALL)
+
+
+class Screen(NamedTuple):
+    """Texts shown on one screen, in the order of the events."""
+
+    index: int
+    texts: Tuple[str, ...]
+
+    @property
+    def title(self) -> str:
+        return self.texts[0] if self.texts else ""
+
+
+# Answer to a screen: "left", "right", "both" (buttons to press) or None
+ScreenCallback = Callable[[Screen], Optional[str]]
+
+
+# Titles of the menu and "Processing" screens, they are not part of a flow to
+# confirm and are left alone: pressing right would cycle them without end
+IDLE_TITLES = frozenset(
+    ["Hathor", "Version", "About", "Quit", "Hathor App", "Back", "Processing"]
+)
+
+
+def accept_all(screen: Screen) -> Optional[str]:
+    """Go right through every flow until "Approve", then press both buttons."""
+    if screen.title in IDLE_TITLES:
+        return None
+    return "both" if "Approve" in screen.texts else "right"
+
+
+def reject_all(screen: Screen) -> Optional[str]:
+    if screen.title in IDLE_TITLES:
+        return None
+    return "both" if "Reject" in screen.texts else "right"
+
+
+class EventAutomation(Automation):
+    """Drive the simulator from its screen event stream.
+
+    An asyncio loop in a background thread reads `GET /events?stream=true`.
+    Text events are grouped in screens: a screen ends when no event comes for
+    `settle` seconds or when an event is drawn above the previous one.
+    Every screen is recorded on `screens` and passed to `callback`, the
+    buttons it answers are pressed with `POST /button/<name>`.
+    An error stops the stream, the device is then left waiting on its screen:
+    it is raised by the next `set_callback`, `join` or `close`.
+
+    Parameters
+    ----------
+    server: str
+        Speculos API endpoint.
+    callback: ScreenCallback
+        Decides the buttons to press on each screen, `accept_all` by default.
+    settle: float
+        Seconds without events after which a screen is complete.
+
+    """
+
+    def __init__(
+        self,
+        server: str,
+        callback: ScreenCallback = accept_all,
+        settle: float = 0.05,
+    ) -> None:
+        self.server = server
+        self.callback = callback
+        self.settle = settle
+        self.screens: List[Screen] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def endpoint(self, path: str) -> str:
+        return urljoin(self.server, path)
+
+    def set_accept_all(self) -> None:
+        self.set_callback(accept_all)
+
+    def set_callback(self, callback: ScreenCallback) -> None:
+        self.raise_error()
+        self.callback = callback
+        self.start()
+
+    def start(self, timeout: float = 10.0) -> None:
+        """Subscribe to the event stream, returns once it is connected."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            raise Exception("automation: event stream not connected")
+        self.raise_error()
+
+    def raise_error(self) -> None:
+        """Raise the error that stopped the event stream, once."""
+        error, self._error = self._error, None
+        if error is not None:
+            raise Exception("automation: event stream failed") from error
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wait for the event stream to stop, then raise its error if any."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if not self._thread.is_alive():
+                self._thread = None
+        self.raise_error()
+
+    def close(self) -> None:
+        if self._loop is not None and self._task is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                pass  # the stream already stopped and closed its loop
+        self.join(timeout=5)
+
+    def _run_loop(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._task = self._loop.create_task(self.run())
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self._error = e
+            if tracer.enabled:
+                tracer.event(logging.ERROR, "automation: %r", e)
+        finally:
+            self._ready.set()
+            self._loop.close()
+
+    async def run(self) -> None:
+        # aiohttp is only needed by the event automation
+        import aiohttp
+
+        timeout = aiohttp.ClientTimeout(total=None)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            # drop the events drawn before we subscribed
+            async with session.delete(self.endpoint("/events")):
+                pass
+            async with session.get(
+                self.endpoint("/events"), params={"stream": "true"}
+            ) as response:
+                if response.status != 200:
+                    raise Exception(f"automation: events {response.status}")
+                self._ready.set()
+                await self._read_events(session, response.content)
+
+    async def _read_events(self, session, stream) -> None:
+        texts: List[str] = []
+        last_y: Optional[int] = None
+        while True:
+            try:
+                line = await asyncio.wait_for(
+                    stream.readline(), self.settle if texts else None
+                )
+            except asyncio.TimeoutError:
+                await self._screen(session, texts)
+                texts, last_y = [], None
+                continue
+            if not line:
+                break
+            line = line.strip()
+            if not line.startswith(b"data:"):
+                continue
+            event = json.loads(line[5:])
+            y = event.get("y")
+            if texts and y is not None and last_y is not None and y <= last_y:
+                await self._screen(session, texts)
+                texts = []
+            texts.append(event.get("text", ""))
+            last_y = y
+
+    async def _screen(self, session, texts: List[str]) -> None:
+        screen = Screen(len(self.screens), tuple(texts))
+        self.screens.append(screen)
+        action = self.callback(screen)
+        if tracer.enabled:
+            tracer.event(logging.DEBUG, "screen: %s -> %s", screen.texts, action)
+        if action is not None:
+            async with session.post(
+                self.endpoint(f"/button/{action}"),
+                json={"action": "press-and-release"},
+            ) as response:
+                if response.status != 200:
+                    raise Exception(f"automation: button {action} {response.status}")
+
+
+ACCEPT_ALL = RuleSet.compile(
+    [
+        Rules.rule(Rules.go_left, "Address"),
+        Rules.rule(Rules.go_left, "Output"),
+        Rules.rule(Rules.go_left, "Transaction?"),
+        Rules.rule(Rules.go_left, "access?"),
+        Rules.rule(Rules.go_left, "Confirm token data"),
+        Rules.rule(Rules.go_left, "Reset token signatures"),
+        Rules.rule(Rules.go_left, "Reject"),
+        Rules.rule(Rules.press_both, "Approve"),
+    ]
+)
@@ -0,0 +1,427 @@
+"""Columnar containers of many transactions.
+
+`SighashBatch` decodes archives of sighash_all blobs: an archive is the
+concatenation of `Transaction.serialize()` outputs, each blob is self
+delimiting so no framing is needed. The whole archive is decoded into NumPy
+arrays (structure of arrays), one row per transaction, token, input or output,
+without a Python object per element.
+
+`TransactionBatch` holds a queue of transactions to sign (BIP32 paths
+included) in flat `array` and `bytearray` storage, `Transaction` objects are
+only built when a job is taken out.
+"""
+
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+from app_client.transaction import (
+    MAX_OUTPUT_VALUE_32,
+    TOKEN_UID_LEN,
+    TX_HEADER,
+    TX_INPUT,
+    TX_OUTPUT_HEADER_32,
+    TX_OUTPUT_HEADER_64,
+    Transaction,
+    TransactionError,
+    TxInput,
+    TxOutput,
+)
+from app_client.utils import Bip32Path
+
+TOKEN_DATA_AUTHORITY_MASK: int = 0x80
+TOKEN_DATA_INDEX_MASK: int = 0x7F
+TX_ID_LEN: int = 32
+
+
+def _gather(buf: np.ndarray, offsets: np.ndarray, width: int) -> np.ndarray:
+    """Rows of `width` bytes of `buf` starting at each of `offsets`."""
+    return buf[offsets[:, None] + np.arange(width)]
+
+
+def _segments(starts: np.ndarray, counts: np.ndarray, stride: int) -> np.ndarray:
+    """Offsets of `counts[i]` elements of `stride` bytes from `starts[i]`."""
+    total = int(counts.sum())
+    owner_start = np.repeat(starts, counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    return owner_start + (np.arange(total) - first) * stride
+
+
+class SighashBatch:
+    """Structure of arrays view over many sighash_all blobs.
+
+    Transactions own contiguous ranges of the token, input and output rows:
+    rows `token_start[i]:token_start[i] + num_tokens[i]` belong to the
+    transaction `i` (same for inputs and outputs).
+
+    Attributes
+    ----------
+    tx_offset, tx_version, num_tokens, num_inputs, num_outputs: np.ndarray
+        One row per transaction.
+    token_start, input_start, output_start: np.ndarray
+        First token, input and output row of each transaction.
+    token_uid: np.ndarray
+        (num_tokens, 32) uint8 token uids.
+    input_tx_id: np.ndarray
+        (num_inputs, 32) uint8 spent transaction ids.
+    input_index, input_tx: np.ndarray
+        Spent output index and owner transaction of each input.
+    output_value, output_token_data, output_script_offset, output_script_len,
+    output_tx: np.ndarray
+        Value, token data, script position in the archive and owner transaction
+        of each output.
+
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        self.data = bytes(data)
+        self._decode()
+
+    @classmethod
+    def from_blobs(cls, blobs: Iterable[bytes]) -> "SighashBatch":
+        return cls(b"".join(blobs))
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "SighashBatch":
+        return cls(Path(path).read_bytes())
+
+    def _scan(self):
+        """Walk the archive, only offsets and counts are recorded.
+
+        Outputs are variable sized so they need a sequential walk, everything
+        else is decoded with vectorized gathers in `_decode`.
+        """
+        data = self.data
+        size = len(data)
+        header_32 = TX_OUTPUT_HEADER_32.size
+        header_64 = TX_OUTPUT_HEADER_64.size
+        tx_offsets = array("q")
+        output_offsets = array("q")
+
+        pos = 0
+        while pos < size:
+            if size - pos < TX_HEADER.size:
+                raise TransactionError(f"Batch: truncated header at {pos}")
+            tx_offsets.append(pos)
+            num_tokens, num_inputs, num_outputs = data[pos + 2 : pos + 5]
+            pos += TX_HEADER.size
+            pos += TOKEN_UID_LEN * num_tokens + TX_INPUT.size * num_inputs
+            for _ in range(num_outputs):
+                if pos >= size:
+                    raise TransactionError(f"Batch: truncated output at {pos}")
+                header = header_64 if data[pos] & 0x80 else header_32
+                if size - pos < header:
+                    raise TransactionError(f"Batch: truncated output at {pos}")
+                output_offsets.append(pos)
+                pos += header + (data[pos + header - 2] << 8 | data[pos + header - 1])
+            if pos > size:
+                raise TransactionError(f"Batch: truncated transaction at {pos}")
+
+        return (
+            np.frombuffer(tx_offsets, dtype=np.int64),
+            np.frombuffer(output_offsets, dtype=np.int64),
+        )
+
+    def _decode(self) -> None:
+        tx_offset, output_offset = self._scan()
+        # padding so fixed width gathers never read past the end
+        buf = np.frombuffer(self.data + bytes(8), dtype=np.uint8)
+
+        header = _gather(buf, tx_offset, TX_HEADER.size).astype(np.int64)
+        self.tx_offset = tx_offset
+        self.tx_version = header[:, 0] << 8 | header[:, 1]
+        self.num_tokens = header[:, 2]
+        self.num_inputs = header[:, 3]
+        self.num_outputs = header[:, 4]
+        self.token_start = np.cumsum(self.num_tokens) - self.num_tokens
+        self.input_start = np.cumsum(self.num_inputs) - self.num_inputs
+        self.output_start = np.cumsum(self.num_outputs) - self.num_outputs
+        tx_rows = np.arange(len(tx_offset))
+
+        # tokens
+        tokens_offset = tx_offset + TX_HEADER.size
+        token_offset = _segments(tokens_offset, self.num_tokens, TOKEN_UID_LEN)
+        self.token_uid = _gather(buf, token_offset, TOKEN_UID_LEN)
+        self.token_tx = np.repeat(tx_rows, self.num_tokens)
+
+        # inputs
+        inputs_offset = tokens_offset + TOKEN_UID_LEN * self.num_tokens
+        input_offset = _segments(inputs_offset, self.num_inputs, TX_INPUT.size)
+        raw_inputs = _gather(buf, input_offset, TX_INPUT.size)
+        if raw_inputs[:, 33:].any():
+            raise TransactionError("Input: data length MUST be 0")
+        self.input_tx_id = raw_inputs[:, :32]
+        self.input_index = raw_inputs[:, 32]
+        self.input_tx = np.repeat(tx_rows, self.num_inputs)
+
+        # outputs
+        self.output_tx = np.repeat(tx_rows, self.num_outputs)
+        is_64 = buf[output_offset] & 0x80 != 0
+        raw_values = np.ascontiguousarray(_gather(buf, output_offset, 8))
+        values = raw_values.view(">u8").ravel()
+        self.output_value = np.where(
+            is_64, (-values.astype(np.int64)).astype(np.uint64), values >> 32
+        ).astype(np.uint64)
+        token_data_offset = output_offset + np.where(is_64, 8, 4)
+        self.output_token_data = buf[token_data_offset]
+        token_index = self.output_token_data & TOKEN_DATA_INDEX_MASK
+        out_of_range = token_index > self.num_tokens[self.output_tx]
+        if out_of_range.any():
+            pos = int(output_offset[np.argmax(out_of_range)])
+            raise TransactionError(f"Batch: token index out of range at {pos}")
+        self.output_script_len = (
+            buf[token_data_offset + 1].astype(np.int64) << 8
+        ) | buf[token_data_offset + 2]
+        self.output_script_offset = token_data_offset + 3
+
+    def __len__(self) -> int:
+        return len(self.tx_offset)
+
+    @property
+    def output_is_authority(self) -> np.ndarray:
+        return (self.output_token_data & TOKEN_DATA_AUTHORITY_MASK) != 0
+
+    @property
+    def output_token_row(self) -> np.ndarray:
+        """Row in `token_uid` of each output token, -1 for HTR."""
+        token_index = (self.output_token_data & TOKEN_DATA_INDEX_MASK).astype(np.int64)
+        rows = self.token_start[self.output_tx] + token_index - 1
+        return np.where(token_index == 0, -1, rows)
+
+    def output_script(self, row: int) -> bytes:
+        start = int(self.output_script_offset[row])
+        return self.data[start : start + int(self.output_script_len[row])]
+
+    def output_sum_by_token(self) -> dict:
+        """Sum of non authority output values per token uid (b"" for HTR).
+
+        Sums are exact Python ints, the high and low 32 bits of the values are
+        summed apart so the uint64 accumulators never overflow.
+        """
+        mask = ~self.output_is_authority
+        rows = self.output_token_row[mask]
+        values = self.output_value[mask]
+        # token rows are per transaction, group them by uid
+        uids = np.concatenate(
+            [np.zeros((1, TOKEN_UID_LEN), dtype=np.uint8), self.token_uid]
+        )
+        # HTR is keyed by its row, a token uid may be all zeros too
+        is_htr = rows == -1
+        unique, inverse = np.unique(
+            np.column_stack([is_htr, uids[rows + 1]]), axis=0, return_inverse=True
+        )
+        high = np.zeros(len(unique), dtype=np.uint64)
+        low = np.zeros(len(unique), dtype=np.uint64)
+        np.add.at(high, inverse.ravel(), values >> np.uint64(32))
+        np.add.at(low, inverse.ravel(), values & np.uint64(0xFFFFFFFF))
+        return {
+            (b"" if key[0] else key[1:].tobytes()): (int(h) << 32) + int(lo)
+            for key, h, lo in zip(unique, high, low)
+        }
+
+
+class TransactionBatch:
+    """Many transactions in flat storage, row ranges per transaction.
+
+    Tokens, inputs and outputs of the transaction `i` are the rows
+    `token_start[i]:token_start[i + 1]` (same for inputs and outputs), fixed
+    size fields are packed back to back and scripts are concatenated.
+    BIP32 paths are interned, each input only holds the index of its path in
+    `paths` (0 is no path).
+    Views returned by `tokens`, `input_tx_id` and `output_script` must be
+    released before appending more transactions.
+    """
+
+    def __init__(self, transactions: Iterable[Transaction] = ()) -> None:
+        self.tx_version = array("H")
+        self.token_start = array("I", [0])
+        self.input_start = array("I", [0])
+        self.output_start = array("I", [0])
+        self.token_uids = bytearray()
+        self.input_tx_ids = bytearray()
+        self.input_index = array("B")
+        self.input_path = array("I")
+        self.output_value = array("Q")
+        self.output_token_data = array("B")
+        self.script_start = array("I", [0])
+        self.scripts = bytearray()
+        self.paths: List[Optional[Bip32Path]] = [None]
+        self._path_ids: Dict[Bip32Path, int] = {}
+        self.extend(transactions)
+
+    def _path_id(self, path: Optional[Union[str, Bip32Path]]) -> int:
+        if path is None:
+            return 0
+        path = Bip32Path.from_any(path)
+        path_id = self._path_ids.get(path)
+        if path_id is None:
+            path_id = self._path_ids[path] = len(self.paths)
+            self.paths.append(path)
+        return path_id
+
+    def _columns(self) -> List[Union[array, bytearray]]:
+        return [
+            self.tx_version,
+            self.token_start,
+            self.input_start,
+            self.output_start,
+            self.token_uids,
+            self.input_tx_ids,
+            self.input_index,
+            self.input_path,
+            self.output_value,
+            self.output_token_data,
+            self.script_start,
+            self.scripts,
+        ]
+
+    def append(self, transaction: Transaction) -> None:
+        """Add a row, the batch is left unchanged when `transaction` is invalid."""
+        columns = self._columns()
+        lengths = [len(column) for column in columns]
+        try:
+            self._append(transaction)
+        except BaseException:
+            for column, length in zip(columns, lengths):
+                del column[length:]
+            raise
+
+    def _append(self, transaction: Transaction) -> None:
+        self.tx_version.append(transaction.tx_version)
+
+        for token in transaction.tokens:
+            if len(token) != TOKEN_UID_LEN:
+                raise TransactionError(f"Token uid: {len(token)} bytes")
+            self.token_uids += token
+        self.token_start.append(len(self.token_uids) // TOKEN_UID_LEN)
+
+        for tx_input in transaction.inputs:
+            if len(tx_input.tx_id) != TX_ID_LEN:
+                raise TransactionError(f"Input tx_id: {len(tx_input.tx_id)} bytes")
+            self.input_tx_ids += tx_input.tx_id
+            self.input_index.append(tx_input.index)
+            self.input_path.append(self._path_id(tx_input.bip32_path))
+        self.input_start.append(len(self.input_index))
+
+        for tx_output in transaction.outputs:
+            self.output_value.append(tx_output.value)
+            self.output_token_data.append(tx_output.token_data)
+            self.scripts += tx_output.script
+            self.script_start.append(len(self.scripts))
+        self.output_start.append(len(self.output_value))
+
+    def extend(self, transactions: Iterable[Transaction]) -> None:
+        for transaction in transactions:
+            self.append(transaction)
+
+    def __len__(self) -> int:
+        return len(self.tx_version)
+
+    def tokens(self, i: int) -> memoryview:
+        """Token uids of the transaction `i`, 32 bytes each."""
+        view = memoryview(self.token_uids)
+        start, end = self.token_start[i], self.token_start[i + 1]
+        return view[start * TOKEN_UID_LEN : end * TOKEN_UID_LEN]
+
+    def input_tx_id(self, row: int) -> memoryview:
+        start = row * TX_ID_LEN
+        return memoryview(self.input_tx_ids)[start : start + TX_ID_LEN]
+
+    def output_script(self, row: int) -> memoryview:
+        start, end = self.script_start[row], self.script_start[row + 1]
+        return memoryview(self.scripts)[start:end]
+
+    def serialize(self, i: int) -> bytes:
+        """sighash_all data of the transaction `i`, without building it."""
+        token_start, token_end = self.token_start[i], self.token_start[i + 1]
+        input_start, input_end = self.input_start[i], self.input_start[i + 1]
+        output_start, output_end = self.output_start[i], self.output_start[i + 1]
+        values = self.output_value[output_start:output_end]
+
+        size = TX_HEADER.size + TOKEN_UID_LEN * (token_end - token_start)
+        size += TX_INPUT.size * (input_end - input_start)
+        size += self.script_start[output_end] - self.script_start[output_start]
+        size += sum(
+            TX_OUTPUT_HEADER_64.size
+            if value > MAX_OUTPUT_VALUE_32
+            else TX_OUTPUT_HEADER_32.size
+            for value in values
+        )
+
+        buf = bytearray(size)
+        TX_HEADER.pack_into(
+            buf,
+            0,
+            self.tx_version[i],
+            token_end - token_start,
+            input_end - input_start,
+            output_end - output_start,
+        )
+        offset = TX_HEADER.size
+        tokens = self.token_uids[
+            token_start * TOKEN_UID_LEN : token_end * TOKEN_UID_LEN
+        ]
+        buf[offset : offset + len(tokens)] = tokens
+        offset += len(tokens)
+
+        # tx_id then index, data length is already 0
+        for row in range(input_start, input_end):
+            buf[offset : offset + TX_ID_LEN] = self.input_tx_id(row)
+            buf[offset + TX_ID_LEN] = self.input_index[row]
+            offset += TX_INPUT.size
+
+        for row, value in enumerate(values, output_start):
+            script = self.output_script(row)
+            if value > MAX_OUTPUT_VALUE_32:
+                TX_OUTPUT_HEADER_64.pack_into(
+                    buf, offset, -value, self.output_token_data[row], len(script)
+                )
+                offset += TX_OUTPUT_HEADER_64.size
+            else:
+                TX_OUTPUT_HEADER_32.pack_into(
+                    buf, offset, value, self.output_token_data[row], len(script)
+                )
+                offset += TX_OUTPUT_HEADER_32.size
+            buf[offset : offset + len(script)] = script
+            offset += len(script)
+
+        assert offset == size
+        return bytes(buf)
+
+    def __getitem__(self, i: int) -> Transaction:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("TransactionBatch index out of range")
+        tokens = self.tokens(i)
+        inputs = [
+            TxInput(
+                self.input_tx_id(row),
+                self.input_index[row],
+                self.paths[self.input_path[row]],
+            )
+            for row in range(self.input_start[i], self.input_start[i + 1])
+        ]
+        outputs = [
+            TxOutput(
+                self.output_value[row],
+                self.output_script(row),
+                self.output_token_data[row],
+            )
+            for row in range(self.output_start[i], self.output_start[i + 1])
+        ]
+        return Transaction(
+            self.tx_version[i],
+            [
+                bytes(tokens[j : j + TOKEN_UID_LEN])
+                for j in range(0, len(tokens), TOKEN_UID_LEN)
+            ],
+            inputs,
+            outputs,
+        )
+
+    def __iter__(self) -> Iterator[Transaction]:
+        for i in range(len(self)):
+            yield self[i]
@@ -1,19 +1,96 @@
+import logging
 import struct
-from typing import List, Tuple
+from contextlib import nullcontext
+from typing import ContextManager, List, Optional, Tuple, Union
 
 from app_client.cmd_builder import CommandBuilder, InsType
-from app_client.exception import DeviceException
+from app_client.cost import CostModel, Estimate, estimate_sign_tx
+from app_client.exception import DeviceException, InvalidSignatureError
+from app_client.metrics import MeteredTransport, Metrics
 from app_client.token import Token
+from app_client.token_cache import TokenSignatureCache
+from app_client.trace import Hex, tracer
 from app_client.transaction import ChangeInfo, Transaction
 from app_client.transport import ApduTransport
+from app_client.utils import Bip32Path
+
+
+def parse_app_and_version(response: bytes) -> Tuple[str, str]:
+    # response = format_id (1) ||
+    #            app_name_len (1) ||
+    #            app_name (var) ||
+    #            version_len (1) ||
+    #            version (var) ||
+    offset: int = 0
+
+    # format_id: int = response[offset]
+    offset += 1
+    app_name_len: int = response[offset]
+    offset += 1
+    app_name: str = response[offset : offset + app_name_len].decode("ascii")
+    offset += app_name_len
+    version_len: int = response[offset]
+    offset += 1
+    version: str = response[offset : offset + version_len].decode("ascii")
+    offset += version_len
+
+    return app_name, version
+
+
+def parse_version(response: bytes) -> Tuple[bytes, int, int, int]:
+    # response = 'H' || 'T' || 'R' || MAJOR (1) || MINOR (1) || PATCH (1)
+    assert len(response) == 6
+
+    h, t, r, major, minor, patch = struct.unpack(
+        "cccBBB", response
+    )  # type: bytes, bytes, bytes, int, int, int
+
+    htr = b"".join([h, t, r])
+
+    return htr, major, minor, patch
+
+
+def parse_xpub(response: bytes) -> Tuple[bytes, bytes, bytes]:
+    # response = raw_public_key(65) ||
+    #            chain_code(32) ||
+    #            fingerprint(4)
+    offset: int = 0
+    pub_key_len: int = 65
+    chain_code_len: int = 32
+
+    pub_key: bytes = response[offset : offset + pub_key_len]
+    offset += pub_key_len
+    chain_code: bytes = response[offset : offset + chain_code_len]
+    offset += chain_code_len
+    fingerprint: bytes = response[offset : offset + 4]
+    offset += 4
+
+    assert len(response) == pub_key_len + chain_code_len + 4
+
+    return pub_key, chain_code, fingerprint
 
 
 class Command:
-    def __init__(self, transport: ApduTransport, debug: bool = False) -> None:
+    def __init__(
+        self,
+        transport: ApduTransport,
+        debug: bool = False,
+        metrics: Optional[Metrics] = None,
+        token_cache: Optional[TokenSignatureCache] = None,
+        device_id: Optional[bytes] = None,
+    ) -> None:
         self.builder = CommandBuilder(debug=debug)
         self.debug = debug
+        self.metrics = metrics
+        self.token_cache = token_cache
+        self.device_id = device_id
+        if metrics is not None:
+            transport = MeteredTransport(transport, metrics)
         self.transport = transport
 
+    def phase(self, name: str) -> ContextManager:
+        return self.metrics.phase(name) if self.metrics is not None else nullcontext()
+
     def get_app_and_version(self) -> Tuple[str, str]:
         sw, response = self.transport.exchange_apdu_raw(
             self.builder.get_app_and_version()
@@ -22,25 +99,7 @@ class Command:
         if sw != 0x9000:
             raise DeviceException(error_code=sw, ins=0x01)
 
-        # response = format_id (1) ||
-        #            app_name_len (1) ||
-        #            app_name (var) ||
-        #            version_len (1) ||
-        #            version (var) ||
-        offset: int = 0
-
-        # format_id: int = response[offset]
-        offset += 1
-        app_name_len: int = response[offset]
-        offset += 1
-        app_name: str = response[offset : offset + app_name_len].decode("ascii")
-        offset += app_name_len
-        version_len: int = response[offset]
-        offset += 1
-        version: str = response[offset : offset + version_len].decode("ascii")
-        offset += version_len
-
-        return app_name, version
+        return parse_app_and_version(response)
 
     def get_version(self) -> Tuple[bytes, int, int, int]:
         sw, response = self.transport.exchange_apdu_raw(self.builder.get_version())
@@ -48,18 +107,9 @@ class Command:
         if sw != 0x9000:
             raise DeviceException(error_code=sw, ins=InsType.INS_GET_VERSION)
 
-        # response = 'H' || 'T' || 'R' || MAJOR (1) || MINOR (1) || PATCH (1)
-        assert len(response) == 6
-
-        h, t, r, major, minor, patch = struct.unpack(
-            "cccBBB", response
-        )  # type: bytes, bytes, bytes, int, int, int
+        return parse_version(response)
 
-        htr = b"".join([h, t, r])
-
-        return htr, major, minor, patch
-
-    def get_address(self, bip32_path: str) -> str:
+    def get_address(self, bip32_path: Union[str, Bip32Path]) -> str:
 
         sw, response = self.transport.exchange_apdu_raw(
             self.builder.get_address(bip32_path)
@@ -70,7 +120,7 @@ class Command:
 
         return
 
-    def get_xpub(self, bip32_path: str) -> Tuple[bytes, bytes]:
+    def get_xpub(self, bip32_path: Union[str, Bip32Path]) -> Tuple[bytes, bytes, bytes]:
         sw, response = self.transport.exchange_apdu_raw(
             self.builder.get_xpub(bip32_path=bip32_path)
         )
@@ -78,64 +128,103 @@ class Command:
         if sw != 0x9000:
             raise DeviceException(error_code=sw, ins=InsType.INS_GET_XPUB)
 
-        # response = raw_public_key(65) ||
-        #            chain_code(32) ||
-        #            fingerprint(4)
-        offset: int = 0
-        pub_key_len: int = 65
-        chain_code_len: int = 32
-
-        pub_key: bytes = response[offset : offset + pub_key_len]
-        offset += pub_key_len
-        chain_code: bytes = response[offset : offset + chain_code_len]
-        offset += chain_code_len
-        fingerprint: bytes = response[offset : offset + 4]
-        offset += 4
-
-        assert len(response) == pub_key_len + chain_code_len + 4
-
-        return pub_key, chain_code, fingerprint
+        return parse_xpub(response)
 
     def sign_tx(
         self,
         transaction: Transaction,
         change_list: List["ChangeInfo"] = [],
         use_old_protocol: bool = False,
+        stream: bool = False,
     ) -> List[bytes]:
 
         sw: int
         response: bytes = b""
 
         signatures: List[bytes] = []
-        for chunk in self.builder.sign_tx_send_data(
-            transaction=transaction,
-            change_list=change_list,
-            use_old_protocol=use_old_protocol,
-        ):
-            sw, response = self.transport.exchange_apdu_raw(chunk)
-            print("\n", "ledger_resp:", sw, response)
-
-            if sw != 0x9000:
-                raise DeviceException(error_code=sw, ins=InsType.INS_SIGN_TX)
+        with self.phase("sign_tx_data"):
+            for chunk in self.builder.sign_tx_send_data(
+                transaction=transaction,
+                change_list=change_list,
+                use_old_protocol=use_old_protocol,
+                stream=stream,
+                views=True,
+            ):
+                sw, response = self.transport.exchange_apdu_raw(chunk)
+                if tracer.enabled:
+                    tracer.event(logging.DEBUG, "sign_tx: %04x %s", sw, Hex(response))
+
+                if sw != 0x9000:
+                    raise DeviceException(error_code=sw, ins=InsType.INS_SIGN_TX)
 
         # ask for signatures
-        for chunk in self.builder.sign_tx_signatures(transaction):
-            sw, response = self.transport.exchange_apdu_raw(chunk)
-            print("\n", "ledger_resp:", sw, response)
+        with self.phase("sign_tx_sign"):
+            for chunk in self.builder.sign_tx_signatures(transaction):
+                sw, response = self.transport.exchange_apdu_raw(chunk)
+                if tracer.enabled:
+                    tracer.event(logging.DEBUG, "sign_tx: %04x %s", sw, Hex(response))
 
-            if sw != 0x9000:
-                raise DeviceException(error_code=sw, ins=InsType.INS_SIGN_TX)
+                if sw != 0x9000:
+                    raise DeviceException(error_code=sw, ins=InsType.INS_SIGN_TX)
 
-            signatures.append(response)
+                signatures.append(response)
 
-        sw, response = self.transport.exchange_apdu_raw(self.builder.sign_tx_end())
+        with self.phase("sign_tx_end"):
+            sw, response = self.transport.exchange_apdu_raw(self.builder.sign_tx_end())
 
         if sw != 0x9000:
             raise DeviceException(error_code=sw, ins=InsType.INS_SIGN_TX)
 
         return signatures
 
-    def sign_token_data(self, token: Token) -> bytes:
+    def estimate(
+        self,
+        transaction: Transaction,
+        change_list: List["ChangeInfo"] = [],
+        use_old_protocol: bool = False,
+        model: Optional[CostModel] = None,
+    ) -> Estimate:
+        """Cost of `sign_tx` with the same arguments, nothing is sent.
+
+        The wall time is predicted with `model`, or with the latencies recorded
+        on the metrics of this command when it has some.
+        """
+        if model is None and self.metrics is not None:
+            model = CostModel.from_metrics(self.metrics)
+        return estimate_sign_tx(
+            self.builder, transaction, change_list, use_old_protocol, model
+        )
+
+    def device_fingerprint(self) -> bytes:
+        """Key of this device in the token signature cache.
+
+        Defaults to the fingerprint of m/44'/280', read once as the parent
+        fingerprint in the GET_XPUB response of m/44'/280'/0'. On a device this
+        asks the user to confirm the access, pass `device_id` to `Command` to
+        avoid it.
+        """
+        if self.device_id is None:
+            _, _, self.device_id = self.get_xpub("m/44'/280'/0'")
+        return self.device_id
+
+    def sign_token_data(self, token: Token, verify: bool = True) -> bytes:
+        """Sign the token data, or take the signature from the token cache.
+
+        A cached signature is checked with VERIFY_TOKEN_SIGNATURE unless
+        `verify` is False: when the device was reset by another client it is
+        stale, so the cache epoch is bumped and the token is signed again.
+        """
+        if self.token_cache is not None:
+            signature = self.token_cache.get(self.device_fingerprint(), token)
+            if signature is not None and not verify:
+                return signature
+            if signature is not None:
+                try:
+                    self.verify_token_signature(token, signature)
+                    return signature
+                except InvalidSignatureError:
+                    self.token_cache.bump_epoch(self.device_fingerprint())
+
         sw, response = self.transport.exchange_apdu_raw(
             self.builder.sign_token_data(token)
         )
@@ -143,6 +232,9 @@ class Command:
         if sw != 0x9000:
             raise DeviceException(error_code=sw, ins=InsType.INS_GET_ADDRESS)
 
+        if self.token_cache is not None:
+            self.token_cache.put(self.device_fingerprint(), token, response)
+
         return response
 
     def send_token_data(self, token: Token, signature: bytes, num: int = 0):
@@ -153,7 +245,33 @@ class Command:
         if sw != 0x9000:
             raise DeviceException(error_code=sw, ins=InsType.INS_GET_ADDRESS)
 
-    def send_token_data_list(self, tokens: List[Token], signatures: List[bytes]):
+    def send_token_data_list(
+        self, tokens: List[Token], signatures: Optional[List[bytes]] = None
+    ):
+        """Fill the device token registry.
+
+        Without `signatures` the tokens are signed with `sign_token_data`, so
+        with a token cache only unknown tokens need a SIGN_TOKEN_DATA. Cached
+        signatures are not verified one by one, a stale one fails the whole
+        list, then the cache epoch is bumped and every token is signed again.
+        """
+        if signatures is None:
+            try:
+                self.send_token_data_list(
+                    tokens,
+                    [self.sign_token_data(token, verify=False) for token in tokens],
+                )
+            except InvalidSignatureError:
+                if self.token_cache is None:
+                    raise
+                # cached signatures from before a reset not made by this client
+                self.token_cache.bump_epoch(self.device_fingerprint())
+                self.send_token_data_list(
+                    tokens,
+                    [self.sign_token_data(token, verify=False) for token in tokens],
+                )
+            return
+
         assert len(tokens) == len(signatures)
         for i, token in enumerate(tokens):
             self.send_token_data(token, signatures[i], num=i)
@@ -173,3 +291,6 @@ class Command:
 
         if sw != 0x9000:
             raise DeviceException(error_code=sw, ins=InsType.INS_GET_ADDRESS)
+
+        if self.token_cache is not None:
+            self.token_cache.bump_epoch(self.device_fingerprint())
@@ -1,16 +1,28 @@
 import enum
 import logging
 import struct
-from typing import Iterator, List, Tuple, Union, cast
+from itertools import chain
+from typing import Iterable, Iterator, List, Tuple, Union, cast
 
 from app_client.token import Token
+from app_client.trace import Hex, tracer
 from app_client.transaction import ChangeInfo, Transaction
-from app_client.utils import bip32_path_from_string
+from app_client.utils import Bip32Path
 
 MAX_APDU_LEN: int = 255
 
+# CLA, INS, P1, P2, Lc
+APDU_HEADER = struct.Struct("BBBBB")
 
-def chunkify(data: bytes, chunk_len: int) -> Iterator[Tuple[bool, bytes]]:
+
+def chunkify(
+    data: Union[bytes, memoryview], chunk_len: int
+) -> Iterator[Tuple[bool, memoryview]]:
+    """Split `data` in chunks of at most `chunk_len` bytes.
+
+    Chunks are views over `data`, no bytes are copied.
+    """
+    data = memoryview(data)
     size: int = len(data)
 
     if size <= chunk_len:
@@ -22,7 +34,7 @@ def chunkify(data: bytes, chunk_len: int) -> Iterator[Tuple[bool, bytes]]:
     offset: int = 0
 
     for i in range(chunk):
-        is_last = (i == (chunk - 1)) and remaining
+        is_last = (i == (chunk - 1)) and not remaining
         yield is_last, data[offset : offset + chunk_len]
         offset += chunk_len
 
@@ -93,8 +105,8 @@ class CommandBuilder:
         """
         ins = cast(int, ins.value) if isinstance(ins, enum.IntEnum) else cast(int, ins)
 
-        header: bytes = struct.pack(
-            "BBBBB", cla, ins, p1, p2, len(cdata)
+        header: bytes = APDU_HEADER.pack(
+            cla, ins, p1, p2, len(cdata)
         )  # add Lc to APDU header
 
         if self.debug:
@@ -129,7 +141,7 @@ class CommandBuilder:
             cla=self.CLA, ins=InsType.INS_GET_VERSION, p1=0x00, p2=0x00, cdata=b""
         )
 
-    def get_address(self, bip32_path: str) -> bytes:
+    def get_address(self, bip32_path: Union[str, Bip32Path]) -> bytes:
         """Command builder for GET_ADDRESS.
 
         Returns
@@ -138,22 +150,18 @@ class CommandBuilder:
             APDU command for GET_APP_NAME.
 
         """
-        bip32_paths: List[bytes] = bip32_path_from_string(bip32_path)
-
-        cdata: bytes = b"".join(
-            [len(bip32_paths).to_bytes(1, byteorder="big"), *bip32_paths]
-        )
+        cdata: bytes = Bip32Path.from_any(bip32_path).serialize()
         return self.serialize(
             cla=self.CLA, ins=InsType.INS_GET_ADDRESS, p1=0x00, p2=0x00, cdata=cdata
         )
 
-    def get_xpub(self, bip32_path: str) -> bytes:
+    def get_xpub(self, bip32_path: Union[str, Bip32Path]) -> bytes:
         """Command builder for GET_XPUB.
 
         Parameters
         ----------
-        bip32_path: str
-            String representation of BIP32 path.
+        bip32_path: Union[str, Bip32Path]
+            BIP32 path, as a string or a parsed `Bip32Path`.
 
         Returns
         -------
@@ -161,11 +169,7 @@ class CommandBuilder:
             APDU command for GET_XPUB.
 
         """
-        bip32_paths: List[bytes] = bip32_path_from_string(bip32_path)
-
-        cdata: bytes = b"".join(
-            [len(bip32_paths).to_bytes(1, byteorder="big"), *bip32_paths]
-        )
+        cdata: bytes = Bip32Path.from_any(bip32_path).serialize()
 
         return self.serialize(
             cla=self.CLA, ins=InsType.INS_GET_XPUB, p1=0x00, p2=0x00, cdata=cdata
@@ -176,9 +180,16 @@ class CommandBuilder:
         transaction: Transaction,
         change_list: List["ChangeInfo"] = [],
         use_old_protocol: bool = False,
-    ) -> Iterator[bytes]:
+        stream: bool = False,
+        views: bool = False,
+    ) -> Iterator[Union[bytes, memoryview]]:
         """Command builder for INS_SIGN_TX.
 
+        The change info and the serialized transaction are copied straight into
+        a single APDU buffer, never joined.
+        In stream mode the transaction is serialized element by element while
+        chunks are cut, so the full data is never held in memory.
+
         Parameters
         ----------
         transaction : Transaction
@@ -187,10 +198,15 @@ class CommandBuilder:
             List of change information, default empty list.
         use_old_protocol: bool
             Weather to use the old or new protocol, default True.
+        stream: bool
+            Whether to stream the transaction serialization, default False.
+        views: bool
+            Yield views over the reused APDU buffer instead of bytes, each one
+            must be sent before requesting the next, default False.
 
         Yields
         -------
-        bytes
+        Union[bytes, memoryview]
             APDU command chunk for INS_SIGN_TX.
 
         """
@@ -200,7 +216,8 @@ class CommandBuilder:
                 # Old proto only allows 1 change
                 # ignore the rest of the list
                 cdata = change_list[0].old_proto_bytes()
-                print("Old change {}".format(cdata.hex()))
+                if tracer.enabled:
+                    tracer.event(logging.DEBUG, "old change: %s", Hex(cdata))
             else:
                 # No change
                 cdata = b"\x00"
@@ -212,23 +229,64 @@ class CommandBuilder:
                     *[c.serialize() for c in change_list],
                 ]
             )
-            print("change {}".format(cdata.hex()))
-        cdata = b"".join([cdata, transaction.serialize()])
-        for i, (is_last, chunk) in enumerate(chunkify(cdata, MAX_APDU_LEN)):
-            yield self.serialize(
-                cla=self.CLA, ins=InsType.INS_SIGN_TX, p1=0x00, p2=i, cdata=chunk
+            if tracer.enabled:
+                tracer.event(logging.DEBUG, "change: %s", Hex(cdata))
+        if stream:
+            pieces: Iterable[bytes] = chain([cdata], transaction.serialize_iter())
+        else:
+            pieces = [cdata, transaction.serialize()]
+        chunks = self.sign_tx_stream_chunks(pieces)
+        if views:
+            yield from chunks
+        else:
+            yield from map(bytes, chunks)
+
+    def sign_tx_stream_chunks(self, pieces: Iterable[bytes]) -> Iterator[memoryview]:
+        """Cut INS_SIGN_TX data APDUs from a stream of byte pieces.
+
+        Pieces are copied straight into a single APDU buffer, only one APDU is
+        held in memory regardless of the transaction size. The yielded views
+        are over that buffer, each one is only valid until the next.
+        """
+        buf = bytearray(APDU_HEADER.size + MAX_APDU_LEN)
+        data = memoryview(buf)[APDU_HEADER.size :]
+        filled: int = 0
+        chunk: int = 0
+
+        for piece in pieces:
+            view = memoryview(piece)
+            offset: int = 0
+            while offset < len(view):
+                size = min(MAX_APDU_LEN - filled, len(view) - offset)
+                data[filled : filled + size] = view[offset : offset + size]
+                filled += size
+                offset += size
+                if filled == MAX_APDU_LEN:
+                    yield self.sign_tx_data_header(buf, chunk, filled)
+                    chunk += 1
+                    filled = 0
+
+        if filled or chunk == 0:
+            yield self.sign_tx_data_header(buf, chunk, filled)
+
+    def sign_tx_data_header(self, buf: bytearray, chunk: int, lc: int) -> memoryview:
+        """Write the INS_SIGN_TX data header on `buf`, data already in place."""
+        APDU_HEADER.pack_into(buf, 0, self.CLA, InsType.INS_SIGN_TX, 0x00, chunk, lc)
+
+        if self.debug:
+            logging.info("header: %s", buf[: APDU_HEADER.size].hex())
+            logging.info(
+                "cdata:  %s", buf[APDU_HEADER.size : APDU_HEADER.size + lc].hex()
             )
 
+        return memoryview(buf)[: APDU_HEADER.size + lc]
+
     def sign_tx_signatures(self, transaction: Transaction) -> Iterator[bytes]:
 
         # Ask for input signatures
         for i, tx_input in enumerate(transaction.inputs):
             assert tx_input.bip32_path is not None
-            bip32_paths: List[bytes] = bip32_path_from_string(tx_input.bip32_path)
-
-            input_data: bytes = b"".join(
-                [len(bip32_paths).to_bytes(1, byteorder="big"), *bip32_paths]
-            )
+            input_data: bytes = Bip32Path.from_any(tx_input.bip32_path).serialize()
             yield self.serialize(
                 cla=self.CLA,
                 ins=InsType.INS_SIGN_TX,
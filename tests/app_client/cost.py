@@ -0,0 +1,125 @@
+"""Cost of a SIGN_TX before sending it.
+
+The APDUs are built with `CommandBuilder` exactly as `Command.sign_tx` sends
+them, so the counts are exact, only the wall time is predicted with a
+`CostModel` calibrated on recorded exchange latencies (see `Metrics`).
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app_client.cmd_builder import CommandBuilder, InsType
+from app_client.metrics import Metrics
+from app_client.transaction import ChangeInfo, Transaction
+
+# (INS, P1) of the SIGN_TX stages
+SIGN_TX_DATA: Tuple[int, int] = (InsType.INS_SIGN_TX, 0x00)
+SIGN_TX_SIGN: Tuple[int, int] = (InsType.INS_SIGN_TX, 0x01)
+SIGN_TX_END: Tuple[int, int] = (InsType.INS_SIGN_TX, 0x02)
+
+
+class Estimate(NamedTuple):
+    """Cost of one `sign_tx`, `seconds` is 0 without a cost model."""
+
+    apdus: int
+    bytes_sent: int
+    data_chunks: int
+    sign_calls: int
+    screens: int
+    seconds: float
+    # APDU count and bytes sent by (INS, P1)
+    exchanges: Dict[Tuple[int, int], Tuple[int, int]]
+
+
+class CostModel:
+    """Predict the wall time of an `Estimate`.
+
+    Parameters
+    ----------
+    latency: Dict[Tuple[int, int], float]
+        Mean seconds of an exchange by (INS, P1), without user confirmation.
+    byte_seconds: float
+        Seconds per byte sent, added to the latency of every exchange.
+    screen_seconds: float
+        Seconds spent by the user on each confirmation screen.
+    default_latency: float
+        Seconds of an exchange with an (INS, P1) missing from `latency`.
+
+    """
+
+    def __init__(
+        self,
+        latency: Optional[Dict[Tuple[int, int], float]] = None,
+        byte_seconds: float = 0.0,
+        screen_seconds: float = 0.0,
+        default_latency: float = 0.0,
+    ) -> None:
+        self.latency = dict(latency or {})
+        self.byte_seconds = byte_seconds
+        self.screen_seconds = screen_seconds
+        self.default_latency = default_latency
+
+    @classmethod
+    def from_metrics(cls, metrics: Metrics, screen_seconds: float = 0.0) -> "CostModel":
+        """Mean latency of every (INS, P1) recorded on `metrics`.
+
+        Recorded SIGN_TX data latencies already include the time spent on the
+        screens, keep `screen_seconds` at 0 unless they were automated.
+        """
+        latency = metrics.mean_latencies()
+        default = sum(latency.values()) / len(latency) if latency else 0.0
+        return cls(latency, screen_seconds=screen_seconds, default_latency=default)
+
+    def seconds(
+        self, exchanges: Dict[Tuple[int, int], Tuple[int, int]], screens: int
+    ) -> float:
+        total = screens * self.screen_seconds
+        for ins_p1, (count, bytes_sent) in exchanges.items():
+            total += count * self.latency.get(ins_p1, self.default_latency)
+            total += bytes_sent * self.byte_seconds
+        return total
+
+
+def estimate_sign_tx(
+    builder: CommandBuilder,
+    transaction: Transaction,
+    change_list: List[ChangeInfo] = [],
+    use_old_protocol: bool = False,
+    model: Optional[CostModel] = None,
+) -> Estimate:
+    """Count the APDUs of `Command.sign_tx`, see `Command.estimate`."""
+    exchanges: Dict[Tuple[int, int], Tuple[int, int]] = {}
+
+    def count(ins_p1: Tuple[int, int], apdus: List[int]) -> None:
+        exchanges[ins_p1] = (len(apdus), sum(apdus))
+
+    count(
+        SIGN_TX_DATA,
+        [
+            len(chunk)
+            for chunk in builder.sign_tx_send_data(
+                transaction=transaction,
+                change_list=change_list,
+                use_old_protocol=use_old_protocol,
+                views=True,
+            )
+        ],
+    )
+    count(SIGN_TX_SIGN, [len(apdu) for apdu in builder.sign_tx_signatures(transaction)])
+    count(SIGN_TX_END, [len(builder.sign_tx_end())])
+
+    # old protocol only sends the first change
+    changes = change_list[:1] if use_old_protocol else change_list
+    change_indices = {change.output_index for change in changes}
+    outputs = sum(1 for i in range(len(transaction.outputs)) if i not in change_indices)
+    # one screen per output and the final "Transaction?" confirmation
+    screens = outputs + 1
+
+    return Estimate(
+        apdus=sum(apdus for apdus, _ in exchanges.values()),
+        bytes_sent=sum(sent for _, sent in exchanges.values()),
+        data_chunks=exchanges[SIGN_TX_DATA][0],
+        sign_calls=exchanges[SIGN_TX_SIGN][0],
+        screens=screens,
+        seconds=model.seconds(exchanges, screens) if model is not None else 0.0,
+        exchanges=exchanges,
+    )
@@ -0,0 +1,610 @@
+"""In-process model of the Hathor ledger app.
+
+The emulator answers the same APDUs as the app in ``src/`` and returns the
+same status words (see ``src/sw.h``), so a ``Command`` can be driven without
+speculos or a physical device.
+"""
+
+import enum
+import hashlib
+import hmac
+import struct
+import unicodedata
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, utils
+from hathorlib.utils import get_address_b58_from_public_key_hash, get_hash160
+
+from app_client.cmd_builder import InsType
+from app_client.exception import StatusWord
+from app_client.trace import tracer
+from app_client.transport import ApduTransport
+
+SPECULOS_MNEMONIC: str = (
+    "glory promote mansion idle axis finger extra february uncover one trip resource "
+    "lawn turtle enact monster seven myth punch hobby comfort wild raise skin"
+)
+
+# secp256k1 group order
+CURVE_ORDER: int = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+CLA: int = 0xE0
+APP_NAME: str = "Hathor"
+APP_VERSION: Tuple[int, int, int] = (1, 1, 0)
+
+MAX_BIP32_PATH: int = 5
+MAX_DERIVATION_INDEX: int = 1 << 20
+TX_MAX_TOKENS: int = 10
+TX_INPUT_LEN: int = 35
+TOKEN_UID_LEN: int = 32
+MAX_TOKEN_SYMBOL_LEN: int = 5
+MAX_TOKEN_NAME_LEN: int = 30
+TX_BUFFER_LEN: int = 300
+TX_MAX_BUFFERED_OUTPUTS: int = 10
+TOKEN_DATA_AUTHORITY_MASK: int = 0x80
+TOKEN_DATA_INDEX_MASK: int = 0x7F
+
+P2PKH_PREFIX: bytes = b"\x76\xa9\x14"
+P2PKH_SUFFIX: bytes = b"\x88\xac"
+
+
+class State(enum.IntEnum):
+    STATE_NONE = 0
+    STATE_RECV_DATA = 1
+    STATE_PARSED = 2
+    STATE_APPROVED = 3
+
+
+# Callback deciding the user answer to a confirmation flow.
+# It receives the screen title (the text speculos automation rules match on)
+# and the values displayed on the following screens.
+ApproveCallback = Callable[[str, Tuple[str, ...]], bool]
+
+
+def approve_all(title: str, fields: Tuple[str, ...]) -> bool:
+    return True
+
+
+class EmulatorError(Exception):
+    """Raised inside the emulator to abort the current APDU with a status word."""
+
+    def __init__(self, sw: int) -> None:
+        super().__init__(hex(sw))
+        self.sw = sw
+
+
+class _TxReady(Exception):
+    """Decoder needs more data (``TX_STATE_READY``)."""
+
+
+class _TxError(Exception):
+    """Decoder found an invalid element (``TX_STATE_ERR``)."""
+
+
+def format_value(value: int) -> str:
+    """Same formatting as ``format_value`` in ``src/common/format.c``."""
+    return f"{value // 100:,}.{value % 100:02d}"
+
+
+class _SignTxContext:
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+        self.sha256 = hashlib.sha256()
+        self.sighash_all: Optional[bytes] = None
+        self.change: List[Tuple[int, List[int]]] = []
+        self.tx_version: int = 0
+        self.remaining_tokens: int = 0
+        self.remaining_inputs: int = 0
+        self.outputs_len: int = 0
+        self.current_output: int = 0
+        self.confirmed_outputs: int = 0
+        self.tokens: List[Tuple[bytes, str]] = []
+
+    @property
+    def change_indices(self) -> List[int]:
+        return sorted(index for index, _ in self.change)
+
+
+class HathorEmulator(ApduTransport):
+    """Pure-Python model of the Hathor app, usable wherever an ``ApduTransport`` is.
+
+    Parameters
+    ----------
+    mnemonic: str
+        BIP39 mnemonic of the device, defaults to the speculos seed so keys match
+        the ones documented in ``conftest.py``.
+    passphrase: str
+        Optional BIP39 passphrase.
+    secret: bytes
+        Initial token signature secret, derived from the seed when omitted.
+    approve: ApproveCallback
+        Answers every user confirmation, accepts everything by default.
+
+    """
+
+    def __init__(
+        self,
+        mnemonic: str = SPECULOS_MNEMONIC,
+        passphrase: str = "",
+        secret: Optional[bytes] = None,
+        approve: ApproveCallback = approve_all,
+    ) -> None:
+        seed = hashlib.pbkdf2_hmac(
+            "sha512",
+            unicodedata.normalize("NFKD", mnemonic).encode(),
+            unicodedata.normalize("NFKD", "mnemonic" + passphrase).encode(),
+            2048,
+        )
+        digest = hmac.new(b"Bitcoin seed", seed, hashlib.sha512).digest()
+        self._nodes: Dict[Tuple[int, ...], Tuple[int, bytes]] = {
+            (): (int.from_bytes(digest[:32], byteorder="big"), digest[32:])
+        }
+        self._pubkeys: Dict[int, bytes] = {}
+        self.secret: bytes = secret or hashlib.sha256(b"token secret" + seed).digest()
+        self.approve = approve
+        self.state: State = State.STATE_NONE
+        self.tx: Optional[_SignTxContext] = None
+        self.token_registry: List[Tuple[bytes, str]] = []
+
+    def close(self) -> None:
+        pass
+
+    # Key derivation
+
+    def _public_key(self, private_key: int) -> bytes:
+        """Uncompressed (65 bytes) public key of `private_key`."""
+        public_key = self._pubkeys.get(private_key)
+        if public_key is None:
+            public_key = (
+                ec.derive_private_key(private_key, ec.SECP256K1())
+                .public_key()
+                .public_bytes(
+                    serialization.Encoding.X962,
+                    serialization.PublicFormat.UncompressedPoint,
+                )
+            )
+            self._pubkeys[private_key] = public_key
+        return public_key
+
+    @staticmethod
+    def compress(public_key: bytes) -> bytes:
+        return bytes([0x03 if public_key[64] & 1 else 0x02]) + public_key[1:33]
+
+    def derive(self, path: Sequence[int]) -> Tuple[int, bytes]:
+        """BIP32 private derivation, returns (private_key, chain_code)."""
+        path = tuple(path)
+        node = self._nodes.get(path)
+        if node is not None:
+            return node
+
+        private_key, chain_code = self.derive(path[:-1])
+        index = path[-1]
+        if index & 0x80000000:
+            data = b"\x00" + private_key.to_bytes(32, byteorder="big")
+        else:
+            data = self.compress(self._public_key(private_key))
+        digest = hmac.new(
+            chain_code, data + index.to_bytes(4, byteorder="big"), hashlib.sha512
+        ).digest()
+        child_key = (int.from_bytes(digest[:32], byteorder="big") + private_key) % (
+            CURVE_ORDER
+        )
+        node = (child_key, digest[32:])
+        self._nodes[path] = node
+        return node
+
+    def public_key(self, path: Sequence[int]) -> bytes:
+        return self._public_key(self.derive(path)[0])
+
+    def pubkey_hash(self, path: Sequence[int]) -> bytes:
+        return get_hash160(self.compress(self.public_key(path)))
+
+    # APDU handling
+
+    def exchange_apdu_raw(self, data: bytes) -> Tuple[int, bytes]:
+        try:
+            sw, response = StatusWord.SW_OK, self.dispatch(bytes(data))
+        except EmulatorError as e:
+            sw, response = e.sw, b""
+        if tracer.enabled:
+            tracer.exchange("emulator", data, sw, response)
+        return sw, response
+
+    def dispatch(self, apdu: bytes) -> bytes:
+        # apdu_parser: header must be complete and Lc must match the data length
+        if len(apdu) < 5 or len(apdu) - 5 != apdu[4]:
+            raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+
+        cla, ins, p1, p2, lc = apdu[:5]
+        cdata = apdu[5:]
+
+        if cla == 0xB0 and ins == 0x01:
+            # GET_APP_AND_VERSION is answered by BOLOS
+            return self.get_app_and_version()
+        if cla != CLA:
+            raise EmulatorError(StatusWord.SW_CLA_NOT_SUPPORTED)
+
+        handler = self.handlers.get(ins)
+        if handler is None:
+            raise EmulatorError(StatusWord.SW_INS_NOT_SUPPORTED)
+        return handler(self, p1, p2, cdata)
+
+    def reset_context(self) -> None:
+        self.state = State.STATE_NONE
+        self.tx = None
+
+    def confirm(self, title: str, *fields: str) -> None:
+        if not self.approve(title, fields):
+            raise EmulatorError(StatusWord.SW_DENY)
+
+    @staticmethod
+    def read_bip32_path(cdata: bytes, offset: int = 0) -> Tuple[List[int], int]:
+        """Same checks as ``bip32_path_read``, returns the path and new offset."""
+        if len(cdata) - offset < 1:
+            raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+        length = cdata[offset]
+        if length > MAX_BIP32_PATH or 1 + 4 * length > len(cdata) - offset:
+            raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+        path = list(struct.unpack_from(f">{length}I", cdata, offset + 1))
+        if length > 4 and path[4] > MAX_DERIVATION_INDEX:
+            raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+        if length > 3 and path[3] > 1:
+            raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+        return path, offset + 1 + 4 * length
+
+    @staticmethod
+    def check_p1p2(p1: int, p2: int) -> None:
+        if p1 != 0 or p2 != 0:
+            raise EmulatorError(StatusWord.SW_WRONG_P1P2)
+
+    def get_app_and_version(self) -> bytes:
+        name = APP_NAME.encode()
+        version = "{}.{}.{}".format(*APP_VERSION).encode()
+        return b"".join(
+            [b"\x01", bytes([len(name)]), name, bytes([len(version)]), version, b"\x00"]
+        )
+
+    def get_version(self, p1: int, p2: int, cdata: bytes) -> bytes:
+        self.check_p1p2(p1, p2)
+        return b"HTR" + bytes(APP_VERSION)
+
+    def get_address(self, p1: int, p2: int, cdata: bytes) -> bytes:
+        self.check_p1p2(p1, p2)
+        if not cdata:
+            raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+        self.reset_context()
+        path, _ = self.read_bip32_path(cdata)
+        address = get_address_b58_from_public_key_hash(self.pubkey_hash(path))
+        self.confirm("Address", address)
+        return b""
+
+    def get_xpub(self, p1: int, p2: int, cdata: bytes) -> bytes:
+        self.check_p1p2(p1, p2)
+        if not cdata:
+            raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+        self.reset_context()
+        path, _ = self.read_bip32_path(cdata)
+        private_key, chain_code = self.derive(path)
+        fingerprint = get_hash160(self.compress(self.public_key(path[:-1])))[:4]
+        self.confirm("access?")
+        return b"".join([self._public_key(private_key), chain_code, fingerprint])
+
+    # SIGN_TX
+
+    def sign_tx(self, p1: int, p2: int, cdata: bytes) -> bytes:
+        if p1 > 2 or (p1 in (1, 2) and p2 != 0):
+            raise EmulatorError(StatusWord.SW_WRONG_P1P2)
+        if (p1 in (0, 1)) != bool(cdata):
+            raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+
+        if p1 == 2:
+            # caller is done, cleanup
+            self.reset_context()
+            return b""
+
+        if p1 == 1:
+            if self.state != State.STATE_APPROVED:
+                raise EmulatorError(StatusWord.SW_BAD_STATE)
+            path, _ = self.read_bip32_path(cdata)
+            return self.sign_tx_with_key(path)
+
+        if self.state == State.STATE_APPROVED or (
+            p2 > 0 and self.state != State.STATE_RECV_DATA
+        ):
+            self.reset_context()
+            raise EmulatorError(StatusWord.SW_BAD_STATE)
+        return self.receive_data(cdata, p2)
+
+    def sign_tx_with_key(self, path: List[int]) -> bytes:
+        assert self.tx is not None
+        if self.tx.sighash_all is None:
+            self.tx.sighash_all = hashlib.sha256(self.tx.sha256.digest()).digest()
+        private_key = ec.derive_private_key(self.derive(path)[0], ec.SECP256K1())
+        return private_key.sign(
+            self.tx.sighash_all, ec.ECDSA(utils.Prehashed(hashes.SHA256()))
+        )
+
+    def read_change_info(self, cdata: bytes) -> int:
+        """Parse change info from the first chunk, returns the new offset."""
+        assert self.tx is not None
+        proto_version = cdata[0]
+        offset = 1
+        if proto_version == 0:
+            # old protocol, no change
+            return offset
+
+        if proto_version & 0x80:
+            # old protocol, 1 change output
+            path_len = proto_version & 0x0F
+            if len(cdata) < offset + 1:
+                raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+            index = cdata[offset]
+            offset += 1
+            if path_len > MAX_BIP32_PATH or len(cdata) - offset < 4 * path_len:
+                raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+            path, _ = self.read_bip32_path(
+                bytes([path_len]) + cdata[offset : offset + 4 * path_len]
+            )
+            self.tx.change.append((index, path))
+            return offset + 4 * path_len
+
+        if proto_version != 1:
+            raise EmulatorError(StatusWord.SW_INVALID_TX)
+
+        if len(cdata) < offset + 1:
+            raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+        change_len = cdata[offset]
+        offset += 1
+        if change_len > TX_MAX_TOKENS + 1:
+            raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+        for _ in range(change_len):
+            if len(cdata) < offset + 1:
+                raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+            index = cdata[offset]
+            path, offset = self.read_bip32_path(cdata, offset + 1)
+            self.tx.change.append((index, path))
+        return offset
+
+    def receive_data(self, cdata: bytes, chunk: int) -> bytes:
+        if chunk == 0:
+            if self.state == State.STATE_RECV_DATA:
+                # first chunk sent twice
+                self.reset_context()
+                raise EmulatorError(StatusWord.SW_BAD_STATE)
+
+            self.tx = _SignTxContext()
+            self.state = State.STATE_RECV_DATA
+            offset = self.read_change_info(cdata)
+            if len(cdata) - offset < 5:
+                raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+            (
+                self.tx.tx_version,
+                self.tx.remaining_tokens,
+                self.tx.remaining_inputs,
+                self.tx.outputs_len,
+            ) = struct.unpack_from(">HBBB", cdata, offset)
+            self.tx.sha256.update(cdata[offset:])
+            data = cdata[offset + 5 :]
+        else:
+            assert self.tx is not None
+            self.tx.sha256.update(cdata)
+            data = cdata
+
+        if len(data) > TX_BUFFER_LEN - len(self.tx.buffer):
+            raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+        self.tx.buffer += data
+
+        try:
+            outputs = self.decode_elements()
+        except _TxError:
+            self.reset_context()
+            raise EmulatorError(StatusWord.SW_INVALID_TX)
+
+        try:
+            self.confirm_outputs(outputs)
+        except EmulatorError:
+            self.reset_context()
+            raise
+        return b""
+
+    def decode_elements(self) -> List[Tuple[int, int, int, bytes]]:
+        """Decode every complete element in the buffer.
+
+        Returns the outputs decoded as (index, value, token_data, pubkey_hash).
+        """
+        tx = self.tx
+        assert tx is not None
+        outputs: List[Tuple[int, int, int, bytes]] = []
+        try:
+            while tx.buffer:
+                if tx.remaining_tokens > 0:
+                    if len(tx.buffer) < TOKEN_UID_LEN:
+                        raise _TxReady()
+                    uid = bytes(tx.buffer[:TOKEN_UID_LEN])
+                    for token in self.token_registry:
+                        if token[0] == uid:
+                            tx.tokens.append(token)
+                            break
+                    else:
+                        # token MUST be verified with SEND_TOKEN_DATA first
+                        raise _TxError()
+                    tx.remaining_tokens -= 1
+                    del tx.buffer[:TOKEN_UID_LEN]
+                elif tx.remaining_inputs > 0:
+                    if len(tx.buffer) < TX_INPUT_LEN:
+                        raise _TxReady()
+                    if tx.buffer[33] or tx.buffer[34]:
+                        # input data_len must be 0
+                        raise _TxError()
+                    tx.remaining_inputs -= 1
+                    del tx.buffer[:TX_INPUT_LEN]
+                elif tx.current_output < tx.outputs_len:
+                    output_len, value, token_data, pubkey_hash = self.parse_output()
+                    if token_data & TOKEN_DATA_AUTHORITY_MASK:
+                        raise _TxError()
+                    if (token_data & TOKEN_DATA_INDEX_MASK) > len(tx.tokens):
+                        raise _TxError()
+                    index = tx.current_output
+                    tx.current_output += 1
+                    for change_index, path in tx.change:
+                        if change_index == index and pubkey_hash != self.pubkey_hash(
+                            path
+                        ):
+                            raise _TxError()
+                    del tx.buffer[:output_len]
+                    if len(outputs) >= TX_MAX_BUFFERED_OUTPUTS:
+                        raise _TxError()
+                    outputs.append((index, value, token_data, pubkey_hash))
+                else:
+                    # buffer has more data than the transaction
+                    raise _TxError()
+        except _TxReady:
+            pass
+        return outputs
+
+    def parse_output(self) -> Tuple[int, int, int, bytes]:
+        """Parse the output at the start of the buffer, same as ``parse_output``."""
+        assert self.tx is not None
+        buf = self.tx.buffer
+        if buf[0] & 0x80:
+            if len(buf) < 8:
+                raise _TxReady()
+            value = -int.from_bytes(buf[:8], byteorder="big", signed=True)
+            offset = 8
+        else:
+            if len(buf) < 4:
+                raise _TxReady()
+            value = int.from_bytes(buf[:4], byteorder="big")
+            offset = 4
+        if len(buf) < offset + 3:
+            raise _TxReady()
+        token_data, script_len = struct.unpack_from(">BH", buf, offset)
+        offset += 3
+        if script_len != 25:
+            raise _TxError()
+        if len(buf) < offset + 25:
+            raise _TxReady()
+        script = bytes(buf[offset : offset + 25])
+        if script[:3] != P2PKH_PREFIX or script[23:] != P2PKH_SUFFIX:
+            raise _TxError()
+        return offset + 25, value, token_data, script[3:23]
+
+    def confirm_outputs(self, outputs: List[Tuple[int, int, int, bytes]]) -> None:
+        tx = self.tx
+        assert tx is not None
+        change_indices = tx.change_indices
+        total = tx.outputs_len - len(tx.change)
+        for index, value, token_data, pubkey_hash in outputs:
+            if index not in change_indices:
+                token_index = token_data & TOKEN_DATA_INDEX_MASK
+                symbol = tx.tokens[token_index - 1][1] if token_index else "HTR"
+                display_index = index + 1 - sum(1 for i in change_indices if i < index)
+                self.confirm(
+                    "Output",
+                    f"{display_index}/{total}",
+                    get_address_b58_from_public_key_hash(pubkey_hash),
+                    f"{symbol} {format_value(value)}",
+                )
+            tx.confirmed_outputs += 1
+
+        if outputs and tx.confirmed_outputs == tx.outputs_len:
+            self.state = State.STATE_PARSED
+            self.confirm("Transaction?")
+            self.state = State.STATE_APPROVED
+
+    # Token data
+
+    @staticmethod
+    def parse_token(cdata: bytes) -> Tuple[Tuple[int, bytes, bytes, bytes], int]:
+        """Same as ``parse_token``, returns (version, uid, symbol, name) and offset."""
+        try:
+            version = cdata[0]
+            uid = cdata[1 : 1 + TOKEN_UID_LEN]
+            offset = 1 + TOKEN_UID_LEN
+            symbol_len = cdata[offset]
+            symbol = cdata[offset + 1 : offset + 1 + symbol_len]
+            offset += 1 + symbol_len
+            name_len = cdata[offset]
+            name = cdata[offset + 1 : offset + 1 + name_len]
+            offset += 1 + name_len
+        except IndexError:
+            raise EmulatorError(StatusWord.SW_INVALID_SIGNATURE)
+
+        if len(uid) != TOKEN_UID_LEN:
+            raise EmulatorError(StatusWord.SW_INVALID_SIGNATURE)
+        if symbol_len > MAX_TOKEN_SYMBOL_LEN or len(symbol) != symbol_len:
+            raise EmulatorError(StatusWord.SW_INVALID_SIGNATURE)
+        if name_len > MAX_TOKEN_NAME_LEN or len(name) != name_len:
+            raise EmulatorError(StatusWord.SW_INVALID_SIGNATURE)
+
+        for text in (symbol, name):
+            printable = text.split(b"\x00", 1)[0]
+            if any(c < 0x20 or c >= 0x80 for c in printable):
+                raise EmulatorError(StatusWord.SW_INVALID_SIGNATURE)
+
+        return (version, uid, symbol, name), offset
+
+    def token_signature(self, token: Tuple[int, bytes, bytes, bytes]) -> bytes:
+        version, uid, symbol, name = token
+        return hashlib.sha256(
+            b"".join([self.secret, uid, symbol, name, bytes([version])])
+        ).digest()
+
+    def check_token_signature(self, cdata: bytes) -> Tuple[int, bytes, bytes, bytes]:
+        token, offset = self.parse_token(cdata)
+        signature = cdata[offset : offset + 32]
+        if len(signature) != 32 or not hmac.compare_digest(
+            signature, self.token_signature(token)
+        ):
+            raise EmulatorError(StatusWord.SW_INVALID_SIGNATURE)
+        return token
+
+    def sign_token_data(self, p1: int, p2: int, cdata: bytes) -> bytes:
+        self.check_p1p2(p1, p2)
+        self.reset_context()
+        token, _ = self.parse_token(cdata)
+        _, uid, symbol, name = token
+        self.confirm(
+            "Confirm token data",
+            symbol.decode("latin-1"),
+            name.decode("latin-1"),
+            uid.hex(),
+        )
+        return self.token_signature(token)
+
+    def send_token_data(self, p1: int, p2: int, cdata: bytes) -> bytes:
+        if p2 != 0:
+            raise EmulatorError(StatusWord.SW_WRONG_P1P2)
+        if p1 == 0:
+            self.reset_context()
+            self.token_registry = []
+        if len(self.token_registry) >= TX_MAX_TOKENS:
+            self.token_registry = []
+            raise EmulatorError(StatusWord.SW_WRONG_DATA_LENGTH)
+        _, uid, symbol, _ = self.check_token_signature(cdata)
+        self.token_registry.append((uid, symbol.decode("latin-1")))
+        return b""
+
+    def verify_token_signature(self, p1: int, p2: int, cdata: bytes) -> bytes:
+        self.check_p1p2(p1, p2)
+        self.reset_context()
+        self.check_token_signature(cdata)
+        return b""
+
+    def reset_token_signatures(self, p1: int, p2: int, cdata: bytes) -> bytes:
+        self.check_p1p2(p1, p2)
+        self.confirm("Reset token signatures")
+        self.secret = hashlib.sha256(self.secret).digest()
+        return b""
+
+    handlers: Dict[int, Callable[["HathorEmulator", int, int, bytes], bytes]] = {
+        InsType.INS_GET_VERSION: get_version,
+        InsType.INS_GET_ADDRESS: get_address,
+        InsType.INS_GET_XPUB: get_xpub,
+        InsType.INS_SIGN_TX: sign_tx,
+        InsType.INS_SIGN_TOKEN_DATA: sign_token_data,
+        InsType.INS_SEND_TOKEN_DATA: send_token_data,
+        InsType.INS_VERIFY_TOKEN_SIGNATURE: verify_token_signature,
+        InsType.INS_RESET_TOKEN_SIGNATURES: reset_token_signatures,
+    }
@@ -1,4 +1,4 @@
-from .device_exception import BOLOSPathPrefixError, DeviceException
+from .device_exception import BOLOSPathPrefixError, DeviceException, StatusWord
 from .errors import (
     BadStateError,
     ClaNotSupportedError,
@@ -21,6 +21,7 @@ from .errors import (
 
 __all__ = [
     "DeviceException",
+    "StatusWord",
     "DenyError",
     "UnknownDeviceError",
     "WrongP1P2Error",
@@ -4,28 +4,50 @@ from typing import Any, Dict, Union
 from .errors import *
 
 
+class StatusWord(enum.IntEnum):
+    """Status words, mirrors ``src/sw.h``."""
+
+    SW_OK = 0x9000
+    SW_DENY = 0x6985
+    SW_WRONG_P1P2 = 0x6A86
+    SW_WRONG_DATA_LENGTH = 0x6A87
+    SW_INS_NOT_SUPPORTED = 0x6D00
+    SW_CLA_NOT_SUPPORTED = 0x6E00
+    SW_WRONG_RESPONSE_LENGTH = 0xB000
+    SW_DISPLAY_BIP32_PATH_FAIL = 0xB001
+    SW_DISPLAY_ADDRESS_FAIL = 0xB002
+    SW_DISPLAY_AMOUNT_FAIL = 0xB003
+    SW_WRONG_TX_LENGTH = 0xB004
+    SW_TX_PARSING_FAIL = 0xB005
+    SW_TX_HASH_FAIL = 0xB006
+    SW_BAD_STATE = 0xB007
+    SW_SIGNATURE_FAIL = 0xB008
+    SW_INVALID_TX = 0xB009
+    SW_INVALID_SIGNATURE = 0xB00A
+
+
 class BOLOSPathPrefixError(Exception):
     pass
 
 
 class DeviceException(Exception):  # pylint: disable=too-few-public-methods
     exc: Dict[int, Any] = {
-        0x6985: DenyError,
-        0x6A86: WrongP1P2Error,
-        0x6A87: WrongDataLengthError,
-        0x6D00: InsNotSupportedError,
-        0x6E00: ClaNotSupportedError,
-        0xB000: WrongResponseLengthError,
-        0xB001: DisplayBip32PathFailError,
-        0xB002: DisplayAddressFailError,
-        0xB003: DisplayAmountFailError,
-        0xB004: WrongTxLengthError,
-        0xB005: TxParsingFailError,
-        0xB006: TxHashFail,
-        0xB007: BadStateError,
-        0xB008: SignatureFailError,
-        0xB009: TxInvalidError,
-        0xB00A: InvalidSignatureError,
+        StatusWord.SW_DENY: DenyError,
+        StatusWord.SW_WRONG_P1P2: WrongP1P2Error,
+        StatusWord.SW_WRONG_DATA_LENGTH: WrongDataLengthError,
+        StatusWord.SW_INS_NOT_SUPPORTED: InsNotSupportedError,
+        StatusWord.SW_CLA_NOT_SUPPORTED: ClaNotSupportedError,
+        StatusWord.SW_WRONG_RESPONSE_LENGTH: WrongResponseLengthError,
+        StatusWord.SW_DISPLAY_BIP32_PATH_FAIL: DisplayBip32PathFailError,
+        StatusWord.SW_DISPLAY_ADDRESS_FAIL: DisplayAddressFailError,
+        StatusWord.SW_DISPLAY_AMOUNT_FAIL: DisplayAmountFailError,
+        StatusWord.SW_WRONG_TX_LENGTH: WrongTxLengthError,
+        StatusWord.SW_TX_PARSING_FAIL: TxParsingFailError,
+        StatusWord.SW_TX_HASH_FAIL: TxHashFail,
+        StatusWord.SW_BAD_STATE: BadStateError,
+        StatusWord.SW_SIGNATURE_FAIL: SignatureFailError,
+        StatusWord.SW_INVALID_TX: TxInvalidError,
+        StatusWord.SW_INVALID_SIGNATURE: InvalidSignatureError,
     }
 
     os_exc: Dict[int, Any] = {
@@ -0,0 +1,214 @@
+"""Exchange counters and latency histograms.
+
+`MeteredTransport` records every APDU by INS and P1 (the SIGN_TX stage:
+0 data, 1 sign, 2 end), `Command` records the wall time of each SIGN_TX phase,
+which includes the user confirmation screens shown while the data is sent.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from app_client.cmd_builder import InsType
+from app_client.transport import ApduTransport
+
+# upper bounds in seconds, 100us doubling up to ~105s
+LATENCY_BUCKETS: Tuple[float, ...] = tuple(0.0001 * 2 ** i for i in range(21))
+
+
+class Histogram:
+    """Fixed bucket histogram, quantiles are interpolated within a bucket."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        # last count is the +Inf bucket
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class ExchangeStats:
+    """Counters of the exchanges of one (INS, P1) pair."""
+
+    def __init__(self) -> None:
+        self.errors: int = 0
+        self.bytes_sent: int = 0
+        self.bytes_received: int = 0
+        self.latency = Histogram()
+
+    def snapshot(self) -> dict:
+        return {
+            "errors": self.errors,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "latency": self.latency.snapshot(),
+        }
+
+
+def ins_name(ins: int) -> str:
+    try:
+        return InsType(ins).name
+    except ValueError:
+        return f"0x{ins:02x}"
+
+
+class Metrics:
+    """Thread safe store of exchange and phase metrics.
+
+    Can be shared between several `Command` (e.g. the devices of a pool).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.exchanges: Dict[Tuple[int, int], ExchangeStats] = {}
+        self.phases: Dict[str, Histogram] = {}
+
+    def record_exchange(
+        self, ins: int, p1: int, sent: int, received: int, sw: int, elapsed: float
+    ) -> None:
+        with self._lock:
+            stats = self.exchanges.get((ins, p1))
+            if stats is None:
+                stats = self.exchanges[(ins, p1)] = ExchangeStats()
+            stats.bytes_sent += sent
+            stats.bytes_received += received
+            if sw != 0x9000:
+                stats.errors += 1
+            stats.latency.observe(elapsed)
+
+    def record_phase(self, name: str, elapsed: float) -> None:
+        with self._lock:
+            histogram = self.phases.get(name)
+            if histogram is None:
+                histogram = self.phases[name] = Histogram()
+            histogram.observe(elapsed)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - start)
+
+    def mean_latencies(self) -> Dict[Tuple[int, int], float]:
+        """Mean exchange latency in seconds by (INS, P1)."""
+        with self._lock:
+            return {
+                ins_p1: stats.latency.sum / stats.latency.count
+                for ins_p1, stats in self.exchanges.items()
+                if stats.latency.count
+            }
+
+    def snapshot(self) -> dict:
+        """Plain dict copy of the current metrics, safe to serialize."""
+        with self._lock:
+            return {
+                "exchanges": [
+                    {"ins": ins_name(ins), "p1": p1, **stats.snapshot()}
+                    for (ins, p1), stats in sorted(self.exchanges.items())
+                ],
+                "phases": {
+                    name: histogram.snapshot()
+                    for name, histogram in sorted(self.phases.items())
+                },
+            }
+
+    def render_openmetrics(self, prefix: str = "hathor_app") -> str:
+        """Metrics in the OpenMetrics text exposition format."""
+        lines: List[str] = []
+
+        def histogram_lines(name: str, labels: str, histogram: Histogram) -> None:
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+
+        with self._lock:
+            exchanges = sorted(self.exchanges.items())
+            counters = [
+                ("exchanges", "APDU exchanges", lambda s: s.latency.count),
+                ("exchange_errors", "Exchanges without 0x9000", lambda s: s.errors),
+                ("bytes_sent", "APDU bytes sent", lambda s: s.bytes_sent),
+                (
+                    "bytes_received",
+                    "Response bytes received",
+                    lambda s: s.bytes_received,
+                ),
+            ]
+            for name, help_text, value in counters:
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                lines.append(f"# HELP {prefix}_{name} {help_text}.")
+                for (ins, p1), stats in exchanges:
+                    labels = f'ins="{ins_name(ins)}",p1="{p1}"'
+                    lines.append(f"{prefix}_{name}_total{{{labels}}} {value(stats)}")
+
+            name = f"{prefix}_exchange_seconds"
+            lines.append(f"# TYPE {name} histogram")
+            lines.append(f"# HELP {name} APDU round trip latency.")
+            for (ins, p1), stats in exchanges:
+                labels = f'ins="{ins_name(ins)}",p1="{p1}"'
+                histogram_lines(name, labels, stats.latency)
+
+            name = f"{prefix}_phase_seconds"
+            lines.append(f"# TYPE {name} histogram")
+            lines.append(f"# HELP {name} Command phase duration.")
+            for phase, histogram in sorted(self.phases.items()):
+                histogram_lines(name, f'phase="{phase}"', histogram)
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+class MeteredTransport(ApduTransport):
+    """Record every exchange of `transport` on `metrics`."""
+
+    def __init__(self, transport: ApduTransport, metrics: Metrics) -> None:
+        self.transport = transport
+        self.metrics = metrics
+
+    def exchange_apdu_raw(self, data: bytes) -> Tuple[int, bytes]:
+        start = time.perf_counter()
+        sw, response = self.transport.exchange_apdu_raw(data)
+        elapsed = time.perf_counter() - start
+        ins, p1 = (data[1], data[2]) if len(data) >= 3 else (0, 0)
+        self.metrics.record_exchange(ins, p1, len(data), len(response), sw, elapsed)
+        return sw, response
+
+    def close(self) -> None:
+        close = getattr(self.transport, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,327 @@
+"""Split a payout into few transactions the device accepts.
+
+The device takes at most `TX_MAX_TOKENS` custom tokens per transaction, counts
+inputs and outputs on 1 byte and receives the data in at most 256 chunks.
+Each transaction costs a whole SIGN_TX round (data, one signature per input,
+end) and each output not marked as change is a confirmation screen, so the
+planner packs as many payments as possible in each transaction and keeps a
+single change output per token of a transaction.
+"""
+
+from collections import deque
+from typing import Deque, Dict, Iterable, List, NamedTuple, Tuple, Union
+
+from app_client.cmd_builder import MAX_APDU_LEN
+from app_client.transaction import (
+    MAX_OUTPUT_VALUE_32,
+    TOKEN_UID_LEN,
+    TX_HEADER,
+    TX_INPUT,
+    TX_MAX_INPUTS,
+    TX_MAX_OUTPUTS,
+    TX_MAX_TOKENS,
+    TX_OUTPUT_HEADER_32,
+    TX_OUTPUT_HEADER_64,
+    ChangeInfo,
+    Transaction,
+    TxInput,
+    TxOutput,
+)
+from app_client.utils import Bip32Path
+
+HTR_UID: bytes = b"\x00"
+
+# the chunk index (p2) is 1 byte
+MAX_SIGN_TX_DATA: int = 256 * MAX_APDU_LEN
+
+
+class PlanError(Exception):
+    pass
+
+
+class Utxo(NamedTuple):
+    tx_id: bytes
+    index: int
+    value: int
+    bip32_path: Union[str, Bip32Path]
+    token: bytes = HTR_UID
+
+
+class Payment(NamedTuple):
+    script: bytes
+    value: int
+    token: bytes = HTR_UID
+
+
+class PlannedTx(NamedTuple):
+    """Arguments of `Command.sign_tx` for one transaction of a plan."""
+
+    transaction: Transaction
+    change_list: List[ChangeInfo]
+
+
+def output_size(value: int, script: bytes) -> int:
+    if value > MAX_OUTPUT_VALUE_32:
+        return TX_OUTPUT_HEADER_64.size + len(script)
+    return TX_OUTPUT_HEADER_32.size + len(script)
+
+
+class _Segment:
+    """Payments of one token with the inputs paying for them."""
+
+    def __init__(self, token: bytes) -> None:
+        self.token = token
+        self.payments: List[Tuple[int, Payment]] = []
+        self.inputs: List[Utxo] = []
+        self.funds: int = 0
+        self.spent: int = 0
+        # inputs and payment outputs only
+        self.size: int = 0
+        # (payments, inputs, change) after each payment
+        self.history: List[Tuple[int, int, int]] = []
+
+    @property
+    def change(self) -> int:
+        return self.funds - self.spent
+
+    def add(self, position: int, payment: Payment, inputs: List[Utxo]) -> None:
+        self.payments.append((position, payment))
+        self.inputs.extend(inputs)
+        self.funds += sum(utxo.value for utxo in inputs)
+        self.spent += payment.value
+        self.size += output_size(payment.value, payment.script)
+        self.size += TX_INPUT.size * len(inputs)
+        self.history.append((len(self.payments), len(self.inputs), self.change))
+
+    def cut(self, pool: Deque[Utxo]) -> List[Tuple[int, Payment]]:
+        """Close the segment after the prefix of payments leaving the least change.
+
+        Change left in a closed segment can't pay for anything else, so the
+        segment is cut where it strands the least, keeping at least half of
+        its payments (the most on ties). Inputs after the cut go back to the
+        front of `pool`, the payments after it are returned.
+        """
+        first = (len(self.history) - 1) // 2
+        best = min(
+            range(first, len(self.history)),
+            key=lambda i: (self.history[i][2], -i),
+        )
+        num_payments, num_inputs, _ = self.history[best]
+        rest = self.payments[num_payments:]
+        pool.extendleft(reversed(self.inputs[num_inputs:]))
+        del self.payments[num_payments:]
+        del self.inputs[num_inputs:]
+        del self.history[best + 1 :]
+        self.funds = sum(utxo.value for utxo in self.inputs)
+        self.spent = sum(payment.value for _, payment in self.payments)
+        self.size = TX_INPUT.size * len(self.inputs) + sum(
+            output_size(payment.value, payment.script) for _, payment in self.payments
+        )
+        return rest
+
+
+class _Bin:
+    """Segments packed in one transaction."""
+
+    def __init__(self, change_output_size: int, change_info_size: int) -> None:
+        self.change_output_size = change_output_size
+        self.change_info_size = change_info_size
+        self.segments: List[_Segment] = []
+        self.tokens: List[bytes] = []
+        self.change: Dict[bytes, int] = {}
+        self.num_inputs: int = 0
+        self.num_outputs: int = 0
+        self.segments_size: int = 0
+
+    def size(self, num_tokens: int, num_change: int) -> int:
+        # change info is sent with the data: version byte, length and one per change
+        size = 2 + num_change * (self.change_info_size + self.change_output_size)
+        size += TX_HEADER.size + TOKEN_UID_LEN * num_tokens
+        return size + self.segments_size
+
+    def fits(self, segment: _Segment) -> bool:
+        new_token = segment.token != HTR_UID and segment.token not in self.tokens
+        new_change = segment.change > 0 and not self.change.get(segment.token)
+        num_tokens = len(self.tokens) + new_token
+        num_change = sum(1 for value in self.change.values() if value) + new_change
+        if num_tokens > TX_MAX_TOKENS:
+            return False
+        if self.num_inputs + len(segment.inputs) > TX_MAX_INPUTS:
+            return False
+        if self.num_outputs + len(segment.payments) + new_change > TX_MAX_OUTPUTS:
+            return False
+        return self.size(num_tokens, num_change) + segment.size <= MAX_SIGN_TX_DATA
+
+    def add(self, segment: _Segment) -> None:
+        if segment.token != HTR_UID and segment.token not in self.tokens:
+            self.tokens.append(segment.token)
+        if segment.change > 0 and not self.change.get(segment.token):
+            self.num_outputs += 1
+        self.change[segment.token] = self.change.get(segment.token, 0) + segment.change
+        self.num_inputs += len(segment.inputs)
+        self.num_outputs += len(segment.payments)
+        self.segments_size += segment.size
+        self.segments.append(segment)
+
+
+def _take(pool: Deque[Utxo], amount: int, token: bytes) -> List[Utxo]:
+    """Largest UTXOs first until `amount` is covered."""
+    taken: List[Utxo] = []
+    while amount > 0:
+        if not pool:
+            pool.extendleft(reversed(taken))
+            raise PlanError(
+                f"Not enough funds for token {token.hex()} once the change of "
+                "each transaction is set aside"
+            )
+        utxo = pool.popleft()
+        taken.append(utxo)
+        amount -= utxo.value
+    return taken
+
+
+def _segments(
+    token: bytes,
+    payments: List[Tuple[int, Payment]],
+    pool: Deque[Utxo],
+    max_size: int,
+) -> List[_Segment]:
+    """Cut the payments of a token in segments that fit a transaction alone."""
+    segments: List[_Segment] = []
+    segment = _Segment(token)
+    queue: Deque[Tuple[int, Payment]] = deque(payments)
+    while queue:
+        position, payment = queue.popleft()
+        taken = _take(pool, payment.value - segment.change, token)
+        size = output_size(payment.value, payment.script) + TX_INPUT.size * len(taken)
+        # keep room for the change output
+        full = len(segment.payments) + 2 > TX_MAX_OUTPUTS
+        full = full or len(segment.inputs) + len(taken) > TX_MAX_INPUTS
+        if full or segment.size + size > max_size:
+            pool.extendleft(reversed(taken))
+            if not segment.payments:
+                raise PlanError(
+                    f"Payment {position} needs {len(taken)} inputs, "
+                    "consolidate the UTXOs first"
+                )
+            queue.appendleft((position, payment))
+            queue.extendleft(reversed(segment.cut(pool)))
+            segments.append(segment)
+            segment = _Segment(token)
+            continue
+        segment.add(position, payment, taken)
+    if segment.payments:
+        segments.append(segment)
+    return segments
+
+
+def plan_payout(
+    payments: Iterable[Payment],
+    utxos: Iterable[Utxo],
+    change_path: Union[str, Bip32Path],
+    change_script: bytes,
+    tx_version: int = 1,
+) -> List[PlannedTx]:
+    """Split `payments` in transactions within the device limits.
+
+    UTXOs are spent largest first, so each payment uses as few inputs as
+    possible, then the payments of each token are packed first fit decreasing.
+    This is a greedy heuristic: the plan has few transactions but not always
+    the fewest, and the change of every transaction is spent, so funds that
+    barely cover the payments may not be enough once a transaction gets a
+    change output (`PlanError`). The change of a token in a transaction
+    goes to a single output of `change_script`, marked as change with
+    `change_path` so it has no confirmation screen.
+    Custom tokens of each transaction must be sent with `send_token_data_list`
+    before signing it.
+
+    Parameters
+    ----------
+    payments: Iterable[Payment]
+        Outputs to create, in the order they are confirmed on the device.
+    utxos: Iterable[Utxo]
+        Available unspent outputs, not all of them are spent.
+    change_path: Union[str, Bip32Path]
+        BIP32 path of the change address.
+    change_script: bytes
+        Output script of the change address of `change_path`.
+    tx_version: int
+        Version of the transactions, default 1.
+
+    Returns
+    -------
+    List[PlannedTx]
+        Transactions with their change list, ready for `Command.sign_tx`.
+
+    """
+    by_token: Dict[bytes, List[Tuple[int, Payment]]] = {}
+    for position, payment in enumerate(payments):
+        if payment.value <= 0:
+            raise PlanError(f"Payment {position}: value must be positive")
+        if payment.token != HTR_UID and len(payment.token) != TOKEN_UID_LEN:
+            raise PlanError(f"Payment {position}: invalid token uid")
+        by_token.setdefault(payment.token, []).append((position, payment))
+
+    pools: Dict[bytes, List[Utxo]] = {}
+    for utxo in utxos:
+        pools.setdefault(utxo.token, []).append(utxo)
+
+    change_path = Bip32Path.from_any(change_path)
+    change_info_size = len(ChangeInfo(0, change_path).serialize())
+    # change values are not known yet, count them as 8 byte values
+    change_output_size = TX_OUTPUT_HEADER_64.size + len(change_script)
+    max_segment_size = MAX_SIGN_TX_DATA - _Bin(
+        change_output_size, change_info_size
+    ).size(1, 1)
+
+    segments: List[_Segment] = []
+    for token, token_payments in by_token.items():
+        pool = deque(
+            sorted(pools.get(token, []), key=lambda utxo: utxo.value, reverse=True)
+        )
+        needed = sum(payment.value for _, payment in token_payments)
+        if sum(utxo.value for utxo in pool) < needed:
+            raise PlanError(f"Not enough funds for token {token.hex()}")
+        segments.extend(_segments(token, token_payments, pool, max_segment_size))
+
+    bins: List[_Bin] = []
+    segments.sort(key=lambda s: len(s.inputs) + len(s.payments), reverse=True)
+    for segment in segments:
+        for tx_bin in bins:
+            if tx_bin.fits(segment):
+                break
+        else:
+            tx_bin = _Bin(change_output_size, change_info_size)
+            bins.append(tx_bin)
+        tx_bin.add(segment)
+
+    plan: List[PlannedTx] = []
+    for tx_bin in bins:
+        token_data = {token: i + 1 for i, token in enumerate(tx_bin.tokens)}
+        token_data[HTR_UID] = 0
+
+        payouts = sorted(
+            (entry for segment in tx_bin.segments for entry in segment.payments),
+            key=lambda entry: entry[0],
+        )
+        outputs = [
+            TxOutput(payment.value, payment.script, token_data[payment.token])
+            for _, payment in payouts
+        ]
+        inputs = [
+            TxInput(utxo.tx_id, utxo.index, utxo.bip32_path)
+            for segment in tx_bin.segments
+            for utxo in segment.inputs
+        ]
+
+        change_list: List[ChangeInfo] = []
+        for token in [HTR_UID, *tx_bin.tokens]:
+            value = tx_bin.change.get(token, 0)
+            if value > 0:
+                change_list.append(ChangeInfo(len(outputs), change_path))
+                outputs.append(TxOutput(value, change_script, token_data[token]))
+
+        transaction = Transaction(tx_version, list(tx_bin.tokens), inputs, outputs)
+        plan.append(PlannedTx(transaction, change_list))
+
+    return plan
@@ -0,0 +1,142 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Iterable, List, Optional, Tuple
+
+from app_client.cmd import Command
+from app_client.metrics import Metrics
+from app_client.transaction import ChangeInfo, Transaction
+from app_client.transport import TransportAPI
+
+# job = (future, transaction, change_list, use_old_protocol)
+Job = Tuple["Future[List[bytes]]", Transaction, List[ChangeInfo], bool]
+
+
+class DeviceStats:
+    """Usage counters of one device of a `DevicePool`."""
+
+    def __init__(self, index: int) -> None:
+        self.index = index
+        self.jobs: int = 0
+        self.errors: int = 0
+        self.busy_time: float = 0.0
+
+    def utilisation(self, elapsed: float) -> float:
+        """Fraction of `elapsed` seconds this device spent signing."""
+        return self.busy_time / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        return (
+            "DeviceStats("
+            f"index={self.index}, "
+            f"jobs={self.jobs}, "
+            f"errors={self.errors}, "
+            f"busy_time={self.busy_time:.6f})"
+        )
+
+
+class DevicePool:
+    """Dispatch `sign_tx` jobs from a shared queue to N devices.
+
+    Each device has a worker thread taking the next job from the queue as soon
+    as it is idle, so a slow device (or a long user confirmation) does not hold
+    the others back.
+
+    Parameters
+    ----------
+    commands: List[Command]
+        One `Command` per device, each with its own transport.
+
+    """
+
+    def __init__(self, commands: List[Command]) -> None:
+        assert len(commands) > 0
+        self.commands = commands
+        self.stats: List[DeviceStats] = [DeviceStats(i) for i in range(len(commands))]
+        self.started_at: float = time.perf_counter()
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self._workers = [
+            threading.Thread(
+                target=self._worker, args=(i,), name=f"device-{i}", daemon=True
+            )
+            for i in range(len(commands))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @classmethod
+    def from_urls(
+        cls, urls: Iterable[str], debug: bool = False, metrics: Optional[Metrics] = None
+    ) -> "DevicePool":
+        return cls(
+            [Command(TransportAPI(url), debug=debug, metrics=metrics) for url in urls]
+        )
+
+    def __enter__(self) -> "DevicePool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _worker(self, index: int) -> None:
+        cmd = self.commands[index]
+        stats = self.stats[index]
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            future, transaction, change_list, use_old_protocol = job
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            start = time.perf_counter()
+            try:
+                signatures = cmd.sign_tx(
+                    transaction,
+                    change_list=change_list,
+                    use_old_protocol=use_old_protocol,
+                )
+            except BaseException as e:
+                with self._lock:
+                    stats.errors += 1
+                future.set_exception(e)
+            else:
+                future.set_result(signatures)
+            finally:
+                with self._lock:
+                    stats.jobs += 1
+                    stats.busy_time += time.perf_counter() - start
+
+    def submit(
+        self,
+        transaction: Transaction,
+        change_list: List[ChangeInfo] = [],
+        use_old_protocol: bool = False,
+    ) -> "Future[List[bytes]]":
+        """Queue a `sign_tx` job, the future resolves to the signatures."""
+        future: "Future[List[bytes]]" = Future()
+        self._queue.put((future, transaction, change_list, use_old_protocol))
+        return future
+
+    def sign_all(self, transactions: Iterable[Transaction]) -> List[List[bytes]]:
+        """Sign all `transactions` across the pool, results keep the input order."""
+        futures = [self.submit(tx) for tx in transactions]
+        return [future.result() for future in futures]
+
+    def utilisation(self) -> List[float]:
+        """Busy fraction of each device since the pool started."""
+        elapsed = time.perf_counter() - self.started_at
+        with self._lock:
+            return [stats.utilisation(elapsed) for stats in self.stats]
+
+    def close(self) -> None:
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        for cmd in self.commands:
+            close = getattr(cmd.transport, "close", None)
+            if close is not None:
+                close()
@@ -6,17 +6,19 @@ class TokenError(Exception):
 
 
 class Token:
+    __slots__ = ("version", "symbol", "name", "uid")
+
     def __init__(self, version: int, symbol: str, name: str, uid: Union[str, bytes]):
-        uid_hex = uid.hex() if isinstance(uid, bytes) else uid
-        assert len(uid_hex) == 64
+        uid_bytes = bytes.fromhex(uid) if isinstance(uid, str) else bytes(uid)
+        assert len(uid_bytes) == 32
         self.version = version
         self.symbol = symbol
         self.name = name
-        self.uid_hex = uid_hex
+        self.uid: bytes = uid_bytes
 
     @property
-    def uid(self):
-        return bytes.fromhex(self.uid_hex)
+    def uid_hex(self) -> str:
+        return self.uid.hex()
 
     def serialize(self, signature: Optional[bytes] = None) -> bytes:
         cdata = b"".join(
@@ -0,0 +1,108 @@
+"""Persistent cache of token signatures.
+
+Token signatures are deterministic until the device token secret is reset, so
+they can be stored per device and per reset epoch: `reset_token_signatures`
+bumps the epoch of the device and every older signature is dropped.
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+from app_client.token import Token
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS epochs (
+    device BLOB PRIMARY KEY,
+    epoch INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS signatures (
+    device BLOB NOT NULL,
+    epoch INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    uid BLOB NOT NULL,
+    symbol TEXT NOT NULL,
+    name TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    PRIMARY KEY (device, epoch, version, uid, symbol, name)
+);
+"""
+
+
+class TokenSignatureCache:
+    """Token signatures by device fingerprint, epoch, token uid, symbol and name.
+
+    Parameters
+    ----------
+    path: Union[str, Path]
+        SQLite database file, default ":memory:" (not persistent).
+
+    """
+
+    def __init__(self, path: Union[str, Path] = ":memory:") -> None:
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._db:
+            self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _epoch(self, device: bytes) -> int:
+        # callers hold the lock
+        row = self._db.execute(
+            "SELECT epoch FROM epochs WHERE device = ?", (device,)
+        ).fetchone()
+        return row[0] if row is not None else 0
+
+    def epoch(self, device: bytes) -> int:
+        with self._lock:
+            return self._epoch(device)
+
+    def bump_epoch(self, device: bytes) -> int:
+        """New epoch after a reset, signatures of older epochs are deleted."""
+        with self._lock, self._db:
+            epoch = self._epoch(device) + 1
+            self._db.execute(
+                "INSERT OR REPLACE INTO epochs (device, epoch) VALUES (?, ?)",
+                (device, epoch),
+            )
+            self._db.execute(
+                "DELETE FROM signatures WHERE device = ? AND epoch < ?",
+                (device, epoch),
+            )
+        return epoch
+
+    def get(self, device: bytes, token: Token) -> Optional[bytes]:
+        with self._lock:
+            epoch = self._epoch(device)
+            row = self._db.execute(
+                "SELECT signature FROM signatures WHERE device = ? AND epoch = ? "
+                "AND version = ? AND uid = ? AND symbol = ? AND name = ?",
+                (device, epoch, token.version, token.uid, token.symbol, token.name),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def put(self, device: bytes, token: Token, signature: bytes) -> None:
+        with self._lock, self._db:
+            epoch = self._epoch(device)
+            self._db.execute(
+                "INSERT OR REPLACE INTO signatures "
+                "(device, epoch, version, uid, symbol, name, signature) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    device,
+                    epoch,
+                    token.version,
+                    token.uid,
+                    token.symbol,
+                    token.name,
+                    signature,
+                ),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
@@ -0,0 +1,110 @@
+"""APDU tracing.
+
+Call sites are guarded by `tracer.enabled`, so when tracing is off an exchange
+only pays for one attribute lookup and nothing is formatted or copied.
+Records go to the `app_client.apdu` logger (formatted lazily by logging) and to
+a ring buffer of the last exchanges, which can be dumped when something fails.
+"""
+
+import logging
+import sys
+import time
+from collections import deque
+from typing import Deque, Iterator, NamedTuple, Optional, TextIO, Union
+
+logger = logging.getLogger("app_client.apdu")
+
+
+class Hex:
+    """Lazy hex dump, only formatted if the record is emitted."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        self.data = data
+
+    def __str__(self) -> str:
+        return bytes(self.data).hex()
+
+
+class Exchange(NamedTuple):
+    timestamp: float
+    source: str
+    data: bytes
+    sw: int
+    response: bytes
+
+    def __str__(self) -> str:
+        return "{:.6f} {} > {}\n{:>{}} < {:04x} {}".format(
+            self.timestamp,
+            self.source,
+            self.data.hex(),
+            "",
+            len(f"{self.timestamp:.6f} {self.source}"),
+            self.sw,
+            self.response.hex(),
+        )
+
+
+class Tracer:
+    """Levelled APDU tracer with a bounded history.
+
+    Parameters
+    ----------
+    level: int
+        Logging level of exchange records, default `logging.DEBUG`.
+    ring_size: int
+        Number of exchanges kept in memory, default 0 (none).
+
+    """
+
+    def __init__(self, level: int = logging.DEBUG, ring_size: int = 0) -> None:
+        self.enabled: bool = False
+        self.configure(level=level, ring_size=ring_size)
+
+    def configure(
+        self, level: Optional[int] = None, ring_size: Optional[int] = None
+    ) -> None:
+        """Change the level or history size.
+
+        Must also be called after changing the `app_client.apdu` logger level,
+        `enabled` is only computed here to keep the hot path free.
+        """
+        if level is not None:
+            self.level = level
+        if ring_size is not None:
+            self.ring: Deque[Exchange] = deque(maxlen=ring_size)
+        self.enabled = bool(self.ring.maxlen) or logger.isEnabledFor(self.level)
+
+    def exchange(
+        self,
+        source: str,
+        data: Union[bytes, memoryview],
+        sw: int,
+        response: bytes,
+    ) -> None:
+        # APDU buffers are reused by the builder, keep a copy
+        record = Exchange(time.time(), source, bytes(data), sw, bytes(response))
+        if self.ring.maxlen:
+            self.ring.append(record)
+        logger.log(self.level, "%s", record)
+
+    def event(self, level: int, msg: str, *args) -> None:
+        """Log a non exchange record, `args` are only formatted if emitted."""
+        if logger.isEnabledFor(level):
+            logger.log(level, msg, *args)
+
+    def __iter__(self) -> Iterator[Exchange]:
+        return iter(self.ring)
+
+    def clear(self) -> None:
+        self.ring.clear()
+
+    def format(self) -> str:
+        return "\n".join(str(record) for record in self.ring)
+
+    def dump(self, file: TextIO = None) -> None:
+        print(self.format(), file=file or sys.stderr)
+
+
+tracer = Tracer()
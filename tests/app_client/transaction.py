@@ -1,41 +1,104 @@
 import hashlib
-from io import BytesIO
-from typing import List, Union
+import struct
+from concurrent.futures import Executor
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple, Union
 
 import hathorlib
+from cryptography.exceptions import InvalidSignature
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric import ec, utils
 
-from app_client.utils import bip32_path_from_string, read, read_int, read_uint, read_var
+from app_client.utils import Bip32Path
+
+# Output values above this use 8 bytes
+MAX_OUTPUT_VALUE_32: int = 0x7FFFFFFF
+
+# Device limits, counts are serialized on 1 byte
+TX_MAX_TOKENS: int = 10
+TX_MAX_INPUTS: int = 255
+TX_MAX_OUTPUTS: int = 255
+
+# Precompiled layouts of the sighash_all serialization
+TX_HEADER = struct.Struct(">HBBB")  # version, len(tokens), len(inputs), len(outputs)
+TX_INPUT = struct.Struct(">32sBH")  # tx_id, index, data_len (always 0)
+TX_OUTPUT_HEADER_32 = struct.Struct(">IBH")  # value, token_data, script_len
+TX_OUTPUT_HEADER_64 = struct.Struct(">qBH")  # -value, token_data, script_len
+TOKEN_UID_LEN: int = 32
+TOKEN_UID = struct.Struct(f"{TOKEN_UID_LEN}s")
+
+# the device signs the sha256d digest, verify against it without rehashing
+SIGHASH_ECDSA = ec.ECDSA(utils.Prehashed(hashes.SHA256()))
 
 
 class TransactionError(Exception):
     pass
 
 
+@lru_cache(maxsize=1024)
+def load_public_key(public_key_bytes: bytes) -> ec.EllipticCurvePublicKey:
+    """Decompressed public key object, cached by its compressed bytes."""
+    return hathorlib.utils.get_public_key_from_bytes_compressed(public_key_bytes)
+
+
+def _verify_chunk(
+    digest: bytes, items: List[Tuple[bytes, bytes]], first: int
+) -> Optional[int]:
+    """Index of the first invalid (signature, public key) pair, None if all are."""
+    for i, (signature, public_key_bytes) in enumerate(items, first):
+        try:
+            load_public_key(public_key_bytes).verify(signature, digest, SIGHASH_ECDSA)
+        except InvalidSignature:
+            return i
+    return None
+
+
 class TxInput:
-    def __init__(self, tx_id: bytes, index: int, bip32_path: str = None):
+    __slots__ = ("tx_id", "index", "bip32_path")
+
+    def __init__(
+        self,
+        tx_id: bytes,
+        index: int,
+        bip32_path: Optional[Union[str, Bip32Path]] = None,
+    ):
         assert len(tx_id) == 32
-        self.tx_id = tx_id
+        self.tx_id = bytes(tx_id)
         self.index = index
         self.bip32_path = bip32_path
 
+    def serialized_size(self) -> int:
+        return TX_INPUT.size
+
+    def serialize_into(self, buf: bytearray, offset: int) -> int:
+        """Write the input at `offset` of `buf`, returns the offset after it."""
+        TX_INPUT.pack_into(buf, offset, self.tx_id, self.index, 0)
+        return offset + TX_INPUT.size
+
     def serialize(self) -> bytes:
-        return b"".join(
-            [self.tx_id, self.index.to_bytes(1, byteorder="big"), b"\x00\x00"]
-        )
+        return TX_INPUT.pack(self.tx_id, self.index, 0)
 
-    @classmethod
-    def from_bytes(cls, hexa: Union[bytes, BytesIO]):
-        buf: BytesIO = BytesIO(hexa) if isinstance(hexa, bytes) else hexa
+    def serialize_iter(self) -> Iterator[bytes]:
+        yield self.serialize()
 
-        tx_id: bytes = read(buf, 32)
-        index: int = read_uint(buf, 8, byteorder="big")
-        data_len: int = read_uint(buf, 16, byteorder="big")
+    @classmethod
+    def parse(cls, view: memoryview, offset: int = 0) -> Tuple["TxInput", int]:
+        """Parse an input at `offset` of `view`, returns it and the offset after it."""
+        if len(view) - offset < TX_INPUT.size:
+            raise TransactionError("Input: not enough data")
+        tx_id, index, data_len = TX_INPUT.unpack_from(view, offset)
         if data_len != 0:
             raise TransactionError("Input: data length MUST be 0")
 
-        return cls(tx_id, index)
+        return cls(tx_id, index), offset + TX_INPUT.size
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview]) -> "TxInput":
+        tx_input, offset = cls.parse(memoryview(data))
+        if offset != len(data):
+            raise TransactionError("Input: trailing data")
+
+        return tx_input
 
     def __str__(self):
         return (
@@ -47,49 +110,91 @@ class TxInput:
 
 
 class TxOutput:
+    __slots__ = ("value", "script", "token_data")
+
     def __init__(
         self, value: int, script: bytes, token_data: int = 0, is_authority: bool = False
     ):
         self.value = value
-        self.script = script
+        self.script = bytes(script)
         # 0x80 is token authority mask
         self.token_data = token_data | 0x80 if is_authority else token_data
 
     def serialize_value(self) -> bytes:
-        if self.value & 0x80000000:
+        if self.value > MAX_OUTPUT_VALUE_32:
             # value will use 8 bytes
             return (-self.value).to_bytes(8, byteorder="big", signed=True)
         return self.value.to_bytes(4, byteorder="big")
 
-    def serialize(self) -> bytes:
+    def serialized_size(self) -> int:
+        if self.value > MAX_OUTPUT_VALUE_32:
+            return TX_OUTPUT_HEADER_64.size + len(self.script)
+        return TX_OUTPUT_HEADER_32.size + len(self.script)
+
+    def serialize_into(self, buf: bytearray, offset: int) -> int:
+        """Write the output at `offset` of `buf`, returns the offset after it."""
         script_len = len(self.script)
+        if self.value > MAX_OUTPUT_VALUE_32:
+            # value will use 8 bytes
+            TX_OUTPUT_HEADER_64.pack_into(
+                buf, offset, -self.value, self.token_data, script_len
+            )
+            offset += TX_OUTPUT_HEADER_64.size
+        else:
+            TX_OUTPUT_HEADER_32.pack_into(
+                buf, offset, self.value, self.token_data, script_len
+            )
+            offset += TX_OUTPUT_HEADER_32.size
+        buf[offset : offset + script_len] = self.script
+        return offset + script_len
 
-        return b"".join(
-            [
-                self.serialize_value(),
-                self.token_data.to_bytes(1, byteorder="big"),
-                script_len.to_bytes(2, byteorder="big"),
-                self.script,
-            ]
-        )
+    def serialize(self) -> bytes:
+        buf = bytearray(self.serialized_size())
+        self.serialize_into(buf, 0)
+        return bytes(buf)
+
+    def serialize_iter(self) -> Iterator[bytes]:
+        """Serialized output in pieces, the script is not copied."""
+        if self.value > MAX_OUTPUT_VALUE_32:
+            yield TX_OUTPUT_HEADER_64.pack(
+                -self.value, self.token_data, len(self.script)
+            )
+        else:
+            yield TX_OUTPUT_HEADER_32.pack(
+                self.value, self.token_data, len(self.script)
+            )
+        yield self.script
 
     @classmethod
-    def from_bytes(cls, hexa: Union[bytes, BytesIO]):
-        buf: BytesIO = BytesIO(hexa) if isinstance(hexa, bytes) else hexa
+    def parse(cls, view: memoryview, offset: int = 0) -> Tuple["TxOutput", int]:
+        """Parse an output at `offset` of `view`, returns it and the offset after it."""
+        size = len(view)
+        if size - offset < TX_OUTPUT_HEADER_32.size:
+            raise TransactionError("Output: not enough data")
+
+        # if first bit is 1 value has length 8 bytes, otherwise it's 4 bytes
+        header = TX_OUTPUT_HEADER_64 if view[offset] & 0x80 else TX_OUTPUT_HEADER_32
+        if size - offset < header.size:
+            raise TransactionError("Output: not enough data")
+        value, token_data, script_len = header.unpack_from(view, offset)
+        if value < 0:
+            # 8 byte values are serialized negated
+            value = -value
+
+        offset += header.size
+        end = offset + script_len
+        if end > size:
+            raise TransactionError("Output: not enough data for script")
+
+        return cls(value, bytes(view[offset:end]), token_data), end
 
-        b = buf.read(1)
-        buf.seek(-1, 1)
-
-        value: int = 0
-        if b & 0x80:
-            value = -read_int(buf, 64, byteorder="big")
-        else:
-            value = read_uint(buf, 32, byteorder="big")
-
-        token_data: bytes = read(buf, 1)
-        script_len, script = read_var(buf)
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview]) -> "TxOutput":
+        tx_output, offset = cls.parse(memoryview(data))
+        if offset != len(data):
+            raise TransactionError("Output: trailing data")
 
-        return cls(value, script, token_data)
+        return tx_output
 
     def __str__(self):
         return (
@@ -101,6 +206,8 @@ class TxOutput:
 
 
 class Transaction:
+    __slots__ = ("tx_version", "tokens", "inputs", "outputs", "sighash_all")
+
     def __init__(
         self,
         tx_version,
@@ -114,62 +221,115 @@ class Transaction:
         self.outputs = outputs
         self.sighash_all = None
 
+    def serialized_size(self) -> int:
+        size = TX_HEADER.size + TOKEN_UID_LEN * len(self.tokens)
+        size += TX_INPUT.size * len(self.inputs)
+        return size + sum(tx_output.serialized_size() for tx_output in self.outputs)
+
     def serialize(self) -> bytes:
-        """This serialize returns the number of complete outputs on each chunk
-        this is imperative for testing, we need to know how many outputs to confirm
+        """Serialize the sighash_all data of the transaction.
+
+        The exact size is computed first and every element is packed in place,
+        so the cost is linear on the number of tokens, inputs and outputs.
         """
         if self.sighash_all is not None:
             return self.sighash_all
 
-        cdata = b"".join(
-            [
-                self.tx_version.to_bytes(2, byteorder="big"),
-                len(self.tokens).to_bytes(1, byteorder="big"),
-                len(self.inputs).to_bytes(1, byteorder="big"),
-                len(self.outputs).to_bytes(1, byteorder="big"),
-            ]
+        buf = bytearray(self.serialized_size())
+        TX_HEADER.pack_into(
+            buf,
+            0,
+            self.tx_version,
+            len(self.tokens),
+            len(self.inputs),
+            len(self.outputs),
         )
+        offset = TX_HEADER.size
 
         for token in self.tokens:
-            cdata = b"".join([cdata, token])
+            buf[offset : offset + TOKEN_UID_LEN] = token
+            offset += TOKEN_UID_LEN
 
         for tx_input in self.inputs:
-            input_bytes = tx_input.serialize()
-            cdata = b"".join([cdata, input_bytes])
+            offset = tx_input.serialize_into(buf, offset)
 
         for tx_output in self.outputs:
-            output_bytes = tx_output.serialize()
-            cdata = b"".join([cdata, output_bytes])
+            offset = tx_output.serialize_into(buf, offset)
 
-        self.sighash_all = cdata
+        assert offset == len(buf)
+        self.sighash_all = bytes(buf)
         return self.sighash_all
 
+    def serialize_iter(self) -> Iterator[bytes]:
+        """Yield the sighash_all data in pieces (header, tokens, inputs, outputs).
+
+        Used to stream the transaction to the device without holding the whole
+        serialization in memory, the result is not cached.
+        """
+        if self.sighash_all is not None:
+            yield self.sighash_all
+            return
+
+        yield TX_HEADER.pack(
+            self.tx_version, len(self.tokens), len(self.inputs), len(self.outputs)
+        )
+        yield from self.tokens
+        for tx_input in self.inputs:
+            yield from tx_input.serialize_iter()
+        for tx_output in self.outputs:
+            yield from tx_output.serialize_iter()
+
     @classmethod
-    def from_bytes(cls, hexa: Union[bytes, BytesIO]):
-        buf: BytesIO = BytesIO(hex) if isinstance(hexa, bytes) else hexa
+    def parse(cls, view: memoryview, offset: int = 0) -> Tuple["Transaction", int]:
+        """Parse sighash_all data at `offset` of `view`.
+
+        Fixed size elements (tokens and inputs) are unpacked in one pass over
+        the buffer, nothing is copied besides the fields themselves.
+        Returns the transaction and the offset after it.
+        """
+        if len(view) - offset < TX_HEADER.size:
+            raise TransactionError("Transaction: not enough data")
+        tx_version, num_tokens, num_inputs, num_outputs = TX_HEADER.unpack_from(
+            view, offset
+        )
+        offset += TX_HEADER.size
 
-        tx_version: int = read_uint(buf, 16, byteorder="big")
-        num_tokens: int = read_uint(buf, 8, byteorder="big")
-        num_inputs: int = read_uint(buf, 8, byteorder="big")
-        num_outputs: int = read_uint(buf, 8, byteorder="big")
+        end = offset + TOKEN_UID_LEN * num_tokens + TX_INPUT.size * num_inputs
+        if end > len(view):
+            raise TransactionError("Transaction: not enough data")
 
-        tokens = []
-        for _ in range(num_tokens):
-            tokens.append(read(buf, 32))
+        tokens = [
+            token
+            for (token,) in TOKEN_UID.iter_unpack(
+                view[offset : offset + TOKEN_UID_LEN * num_tokens]
+            )
+        ]
+        offset += TOKEN_UID_LEN * num_tokens
 
         inputs = []
-        for _ in range(num_inputs):
-            input_bytes = read(buf, 32)
-            tx_input = TxInput.from_bytes(input_bytes)
-            inputs.append(tx_input)
+        for tx_id, index, data_len in TX_INPUT.iter_unpack(view[offset:end]):
+            if data_len != 0:
+                raise TransactionError("Input: data length MUST be 0")
+            inputs.append(TxInput(tx_id, index))
+        offset = end
 
         outputs = []
         for _ in range(num_outputs):
-            output_bytes = read(buf, 32)
-            tx_output = TxOutput.from_bytes(output_bytes)
+            tx_output, offset = TxOutput.parse(view, offset)
+            if tx_output.token_data & 0x7F > num_tokens:
+                raise TransactionError("Output: token index out of range")
             outputs.append(tx_output)
 
-        return cls(tx_version, tokens, inputs, outputs)
+        return cls(tx_version, tokens, inputs, outputs), offset
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview]) -> "Transaction":
+        """Parse a transaction from its sighash_all data (see `serialize`)."""
+        tx, offset = cls.parse(memoryview(data))
+        if offset != len(data):
+            raise TransactionError("Transaction: trailing data")
+
+        return tx
 
     def __str__(self):
         stokens = [token.hex() for token in self.tokens]
@@ -181,37 +341,58 @@ class Transaction:
         """Verify signature from `self.serialize` that returns the sighash_all bytes
         and `public_key_bytes` which is the compressed pubkey bytes
         """
-        hash_ctx = hashlib.sha256()
-        hash_ctx.update(self.serialize())
-        pubkey = hathorlib.utils.get_public_key_from_bytes_compressed(public_key_bytes)
-        return pubkey.verify(signature, hash_ctx.digest(), ec.ECDSA(hashes.SHA256()))
+        pubkey = load_public_key(public_key_bytes)
+        return pubkey.verify(signature, self.sighash_digest(), SIGHASH_ECDSA)
+
+    def sighash_digest(self) -> bytes:
+        """sha256d of the sighash_all data, the digest the device signs."""
+        return hashlib.sha256(hashlib.sha256(self.serialize()).digest()).digest()
+
+    def verify_signatures(
+        self,
+        signatures: List[bytes],
+        public_keys: List[bytes],
+        executor: Optional[Executor] = None,
+        chunk_size: int = 16,
+    ) -> None:
+        """Verify one signature per input, the transaction is hashed only once.
+
+        With an `executor` (threads or processes) the inputs are verified in
+        chunks of `chunk_size` by its workers.
+        Raises `TransactionError` with the index of the first invalid signature.
+        """
+        assert len(signatures) == len(public_keys)
+        digest = self.sighash_digest()
+        items = list(zip(signatures, public_keys))
+
+        if executor is None or len(items) <= chunk_size:
+            invalid = _verify_chunk(digest, items, 0)
+        else:
+            futures = [
+                executor.submit(_verify_chunk, digest, items[i : i + chunk_size], i)
+                for i in range(0, len(items), chunk_size)
+            ]
+            results = [future.result() for future in futures]
+            invalid = min((i for i in results if i is not None), default=None)
+
+        if invalid is not None:
+            raise TransactionError(f"Invalid signature for input {invalid}")
 
 
 class ChangeInfo:
-    def __init__(self, output_index: int, path: str) -> None:
+    __slots__ = ("output_index", "path")
+
+    def __init__(self, output_index: int, path: Union[str, Bip32Path]) -> None:
         self.output_index = output_index
-        self.path = path
+        # parsed once, serialize only concatenates the packed path
+        self.path = Bip32Path.from_any(path)
 
     @property
     def bip32_path(self) -> List[bytes]:
-        return bip32_path_from_string(self.path)
+        return self.path.components
 
     def serialize(self) -> bytes:
-        bip32_path = self.bip32_path
-        return b"".join(
-            [
-                self.output_index.to_bytes(1, byteorder="big"),
-                len(bip32_path).to_bytes(1, byteorder="big"),
-                *bip32_path,
-            ]
-        )
+        return bytes((self.output_index,)) + self.path.serialize()
 
     def old_proto_bytes(self) -> bytes:
-        bip32_path = self.bip32_path
-        return b"".join(
-            [
-                (0x80 | len(bip32_path)).to_bytes(1, byteorder="big"),
-                self.output_index.to_bytes(1, byteorder="big"),
-                *bip32_path,
-            ]
-        )
+        return bytes((0x80 | len(self.path), self.output_index)) + self.path.packed
@@ -1,9 +1,19 @@
+import asyncio
+import logging
+import socket
+import struct
 from abc import ABCMeta, abstractmethod
-from typing import Tuple
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Iterator, Optional, Tuple
 from urllib.parse import urljoin
 
 from requests import Session
 
+from app_client.trace import tracer
+
+if TYPE_CHECKING:
+    import aiohttp
+
 
 class ApduTransport(metaclass=ABCMeta):
     @abstractmethod
@@ -23,15 +33,315 @@ class TransportAPI(ApduTransport):
         return urljoin(self.server, path)
 
     def exchange_apdu_raw(self, data: bytes) -> Tuple[int, bytes]:
-        print("Transport =====")
-        print(data.hex())
-        url = self.endpoint("/apdu")
-        print(url)
-        response = self.session.post(url, json={"data": data.hex()})
-        print(response.status_code, response.text)
+        response = self.session.post(self.endpoint("/apdu"), json={"data": data.hex()})
         if response.status_code != 200:
+            if tracer.enabled:
+                tracer.event(
+                    logging.ERROR,
+                    "%s: %s %s",
+                    self.server,
+                    response.status_code,
+                    response.text,
+                )
             raise Exception("Exchange failed with {}".format(data.hex()))
         rdata = response.json()
         cdata = rdata["data"]
         sw = int.from_bytes(bytes.fromhex(cdata[-4:]), byteorder="big", signed=False)
-        return sw, bytes.fromhex(cdata[:-4])
+        rapdu = bytes.fromhex(cdata[:-4])
+        if tracer.enabled:
+            tracer.exchange(self.server, data, sw, rapdu)
+        return sw, rapdu
+
+
+# length prefix of APDUs and responses on the speculos APDU port
+TCP_LENGTH = struct.Struct(">I")
+
+
+class TcpApduTransport(ApduTransport):
+    """Raw APDUs over the speculos APDU socket (`--apdu-port`, default 9999).
+
+    Commands are sent as `len(4) || apdu`, responses come back as
+    `len(4) || data || sw(2)`. The socket stays open between exchanges and
+    both directions go through preallocated buffers.
+    """
+
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 9999, timeout: Optional[float] = None
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.socket = socket.create_connection((host, port), timeout=timeout)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # length prefix, header and the largest short APDU
+        self._send_buf = bytearray(TCP_LENGTH.size + 5 + 255)
+        self._recv_buf = bytearray(TCP_LENGTH.size + 255 + 2)
+
+    def close(self) -> None:
+        self.socket.close()
+
+    def _recv_exactly(self, view: memoryview) -> None:
+        received: int = 0
+        while received < len(view):
+            size = self.socket.recv_into(view[received:])
+            if size == 0:
+                raise ConnectionError(f"{self.host}:{self.port}: connection closed")
+            received += size
+
+    def exchange_apdu_raw(self, data: bytes) -> Tuple[int, bytes]:
+        size = len(data)
+        if TCP_LENGTH.size + size > len(self._send_buf):
+            self._send_buf = bytearray(TCP_LENGTH.size + size)
+        TCP_LENGTH.pack_into(self._send_buf, 0, size)
+        self._send_buf[TCP_LENGTH.size : TCP_LENGTH.size + size] = data
+        self.socket.sendall(memoryview(self._send_buf)[: TCP_LENGTH.size + size])
+
+        view = memoryview(self._recv_buf)
+        self._recv_exactly(view[: TCP_LENGTH.size])
+        (length,) = TCP_LENGTH.unpack_from(self._recv_buf)
+        if length + 2 > len(self._recv_buf):
+            self._recv_buf = bytearray(length + 2)
+            view = memoryview(self._recv_buf)
+        self._recv_exactly(view[: length + 2])
+
+        sw = int.from_bytes(view[length : length + 2], byteorder="big")
+        rapdu = bytes(view[:length])
+        if tracer.enabled:
+            tracer.exchange(f"{self.host}:{self.port}", data, sw, rapdu)
+        return sw, rapdu
+
+
+LEDGER_VENDOR_ID: int = 0x2C97
+HID_PACKET_SIZE: int = 64
+HID_CHANNEL: int = 0x0101
+HID_TAG_APDU: int = 0x05
+# channel, tag, sequence index
+HID_HEADER = struct.Struct(">HBH")
+HID_LENGTH = struct.Struct(">H")
+
+
+class HidFramingError(Exception):
+    pass
+
+
+class HidFramer:
+    """Ledger HID framing of APDUs in 64 bytes packets.
+
+    Every packet starts with `channel(2) || tag(1) || sequence(2)`, the first
+    one also carries the big endian length of the whole message.
+    Packets are written in a single reused buffer, prefixed by the HID report
+    id (0) expected by hidapi `write`.
+    """
+
+    def __init__(
+        self, channel: int = HID_CHANNEL, packet_size: int = HID_PACKET_SIZE
+    ) -> None:
+        self.channel = channel
+        self.packet_size = packet_size
+        self._packet = bytearray(1 + packet_size)
+        self._padding = bytes(packet_size)
+
+    def frame(self, apdu: bytes) -> Iterator[memoryview]:
+        """Yield the report of each packet, valid until the next one is asked."""
+        data = memoryview(apdu)
+        packet = memoryview(self._packet)[1:]
+        offset: int = 0
+        sequence: int = 0
+        while sequence == 0 or offset < len(data):
+            packet[:] = self._padding
+            HID_HEADER.pack_into(packet, 0, self.channel, HID_TAG_APDU, sequence)
+            start = HID_HEADER.size
+            if sequence == 0:
+                HID_LENGTH.pack_into(packet, start, len(data))
+                start += HID_LENGTH.size
+            size = min(self.packet_size - start, len(data) - offset)
+            packet[start : start + size] = data[offset : offset + size]
+            offset += size
+            sequence += 1
+            yield memoryview(self._packet)
+
+    def reassembler(self) -> "HidReassembler":
+        return HidReassembler(self.channel)
+
+
+class HidReassembler:
+    """Rebuild a message from its packets.
+
+    The length is known from the first packet, so the message buffer is
+    allocated once and each payload is copied in place (no concatenation).
+    """
+
+    def __init__(self, channel: int = HID_CHANNEL) -> None:
+        self.channel = channel
+        self.sequence: int = 0
+        self.received: int = 0
+        self.message: Optional[bytearray] = None
+
+    @property
+    def done(self) -> bool:
+        return self.message is not None and self.received == len(self.message)
+
+    def feed(self, packet: bytes) -> bool:
+        """Add the next packet, returns True once the message is complete."""
+        view = memoryview(packet)
+        if len(view) < HID_HEADER.size:
+            raise HidFramingError("HID packet too short")
+        channel, tag, sequence = HID_HEADER.unpack_from(view)
+        if channel != self.channel or tag != HID_TAG_APDU:
+            raise HidFramingError(f"Unexpected channel {channel:04x} or tag {tag:02x}")
+        if sequence != self.sequence:
+            raise HidFramingError(f"Expected sequence {self.sequence}, got {sequence}")
+        start = HID_HEADER.size
+        if sequence == 0:
+            if len(view) < start + HID_LENGTH.size:
+                raise HidFramingError("HID first packet too short")
+            (length,) = HID_LENGTH.unpack_from(view, start)
+            start += HID_LENGTH.size
+            self.message = bytearray(length)
+        assert self.message is not None
+        size = min(len(view) - start, len(self.message) - self.received)
+        self.message[self.received : self.received + size] = view[start : start + size]
+        self.received += size
+        self.sequence += 1
+        return self.done
+
+
+class HidTransport(ApduTransport):
+    """APDUs to a physical Ledger device over USB HID.
+
+    `device` is an opened hidapi device (`hid.device`), or any object with the
+    same `write(report)` and `read(size, timeout_ms)` methods.
+    """
+
+    def __init__(self, device, timeout_ms: int = 0) -> None:
+        self.device = device
+        self.timeout_ms = timeout_ms
+        self.framer = HidFramer()
+
+    @classmethod
+    def open(cls, path: Optional[bytes] = None, timeout_ms: int = 0) -> "HidTransport":
+        """Open the device at `path`, default the first Ledger found."""
+        # hidapi is only needed to reach physical devices
+        import hid
+
+        if path is None:
+            devices = [
+                info["path"]
+                for info in hid.enumerate(LEDGER_VENDOR_ID, 0)
+                if info["interface_number"] == 0 or info["usage_page"] == 0xFFA0
+            ]
+            if not devices:
+                raise ConnectionError("No Ledger device found")
+            path = devices[0]
+        device = hid.device()
+        device.open_path(path)
+        device.set_nonblocking(False)
+        return cls(device, timeout_ms=timeout_ms)
+
+    def close(self) -> None:
+        self.device.close()
+
+    def exchange_apdu_raw(self, data: bytes) -> Tuple[int, bytes]:
+        for report in self.framer.frame(data):
+            self.device.write(report)
+
+        reassembler = self.framer.reassembler()
+        while True:
+            packet = self.device.read(HID_PACKET_SIZE + 1, self.timeout_ms)
+            if not packet:
+                raise TimeoutError("No response from the HID device")
+            if reassembler.feed(bytes(packet)):
+                break
+
+        message = reassembler.message
+        if len(message) < 2:
+            raise HidFramingError("Response without status word")
+        sw = int.from_bytes(message[-2:], byteorder="big")
+        rapdu = bytes(message[:-2])
+        if tracer.enabled:
+            tracer.exchange("hid", data, sw, rapdu)
+        return sw, rapdu
+
+
+class AsyncApduTransport(metaclass=ABCMeta):
+    @abstractmethod
+    async def exchange_apdu_raw(self, data: bytes) -> Tuple[int, bytes]:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+    async def __aenter__(self) -> "AsyncApduTransport":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+class AsyncTransportAPI(AsyncApduTransport):
+    """Non blocking version of `TransportAPI`, one event loop can drive many.
+
+    The HTTP session is bound to an event loop, it is opened on the first
+    exchange so the transport can be built outside of one.
+    """
+
+    def __init__(self, server: str) -> None:
+        self.server = server
+        self.session: Optional["aiohttp.ClientSession"] = None
+
+    async def open(self) -> "aiohttp.ClientSession":
+        if self.session is None:
+            # aiohttp is only needed by the async client
+            import aiohttp
+
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def endpoint(self, path: str) -> str:
+        return urljoin(self.server, path)
+
+    async def exchange_apdu_raw(self, data: bytes) -> Tuple[int, bytes]:
+        session = await self.open()
+        async with session.post(
+            self.endpoint("/apdu"), json={"data": data.hex()}
+        ) as response:
+            if response.status != 200:
+                raise Exception("Exchange failed with {}".format(data.hex()))
+            rdata = await response.json()
+        cdata = rdata["data"]
+        sw = int.from_bytes(bytes.fromhex(cdata[-4:]), byteorder="big", signed=False)
+        rapdu = bytes.fromhex(cdata[:-4])
+        if tracer.enabled:
+            tracer.exchange(self.server, data, sw, rapdu)
+        return sw, rapdu
+
+
+class AsyncTransportAdapter(AsyncApduTransport):
+    """Expose a blocking `ApduTransport` as an `AsyncApduTransport`.
+
+    In-memory transports (e.g. `HathorEmulator`) are called inline, pass an
+    `executor` to move a transport doing real I/O off the event loop.
+    """
+
+    def __init__(
+        self, transport: ApduTransport, executor: Optional[Executor] = None
+    ) -> None:
+        self.transport = transport
+        self.executor = executor
+
+    async def close(self) -> None:
+        close = getattr(self.transport, "close", None)
+        if close is not None:
+            close()
+
+    async def exchange_apdu_raw(self, data: bytes) -> Tuple[int, bytes]:
+        if self.executor is None:
+            return self.transport.exchange_apdu_raw(data)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, self.transport.exchange_apdu_raw, data
+        )
@@ -1,32 +1,115 @@
+import struct
+from functools import lru_cache
 from io import BytesIO
-from typing import List, Literal
+from typing import Iterable, Iterator, List, Literal, Optional, Union
 
 UINT64_MAX: int = 18446744073709551615
 UINT32_MAX: int = 4294967295
 UINT16_MAX: int = 65535
 
 
-def bip32_path_from_string(path: str) -> List[bytes]:
-    splitted_path: List[str] = path.split("/")
+HARDENED: int = 0x80000000
 
-    if not splitted_path:
-        raise Exception(f"BIP32 path format error: '{path}'")
 
-    if "m" in splitted_path and splitted_path[0] == "m":
-        splitted_path = splitted_path[1:]
+class Bip32Path:
+    """Immutable BIP32 path, parsed once and holding its wire bytes.
 
-    return [
-        int(p).to_bytes(4, byteorder="big")
-        if "'" not in p
-        else (0x80000000 | int(p[:-1])).to_bytes(4, byteorder="big")
-        for p in splitted_path
-    ]
+    Paths parsed from strings are interned by `Bip32Path.parse`, so building the
+    same path many times costs a cache lookup.
+    `child` and `sibling` derive new paths without parsing anything.
+
+    Attributes
+    ----------
+    indexes: Tuple[int, ...]
+        Derivation indexes, hardened ones have `HARDENED` set.
+    packed: bytes
+        Big endian indexes (4 bytes each), as sent after the length byte.
+
+    """
+
+    __slots__ = ("indexes", "packed")
+
+    def __init__(self, indexes: Iterable[int], packed: Optional[bytes] = None) -> None:
+        indexes = tuple(indexes)
+        if packed is None:
+            packed = struct.pack(f">{len(indexes)}I", *indexes)
+        object.__setattr__(self, "indexes", indexes)
+        object.__setattr__(self, "packed", packed)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Bip32Path is immutable")
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def parse(path: str) -> "Bip32Path":
+        splitted_path: List[str] = path.split("/")
+
+        if "m" in splitted_path and splitted_path[0] == "m":
+            splitted_path = splitted_path[1:]
+
+        return Bip32Path(
+            int(p) if "'" not in p else HARDENED | int(p[:-1]) for p in splitted_path
+        )
+
+    @classmethod
+    def from_any(cls, path: Union[str, "Bip32Path"]) -> "Bip32Path":
+        return path if isinstance(path, Bip32Path) else cls.parse(path)
+
+    def child(self, index: int, hardened: bool = False) -> "Bip32Path":
+        if hardened:
+            index |= HARDENED
+        return Bip32Path(
+            self.indexes + (index,), self.packed + index.to_bytes(4, byteorder="big")
+        )
+
+    def sibling(self, index: int, hardened: bool = False) -> "Bip32Path":
+        return self.parent.child(index, hardened)
+
+    @property
+    def parent(self) -> "Bip32Path":
+        return Bip32Path(self.indexes[:-1], self.packed[:-4])
+
+    @property
+    def components(self) -> List[bytes]:
+        """One 4 bytes item per index, as `bip32_path_from_string` returns."""
+        packed = self.packed
+        return [packed[i : i + 4] for i in range(0, len(packed), 4)]
+
+    def serialize(self) -> bytes:
+        """Length prefixed path as read by the app."""
+        return bytes((len(self.indexes),)) + self.packed
+
+    def __len__(self) -> int:
+        return len(self.indexes)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.indexes)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Bip32Path):
+            return self.indexes == other.indexes
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.indexes)
+
+    def __str__(self) -> str:
+        return "/".join(
+            ["m", *(f"{i ^ HARDENED}'" if i & HARDENED else str(i) for i in self)]
+        )
+
+    def __repr__(self) -> str:
+        return f"Bip32Path('{self}')"
+
+
+def bip32_path_from_string(path: Union[str, Bip32Path]) -> List[bytes]:
+    return Bip32Path.from_any(path).components
 
 
 def read_var(buf: BytesIO):
-    length = buf.read(1)
+    length: int = read_uint(buf, 8)
 
-    return length, read(length)
+    return length, read(buf, length)
 
 
 def read(buf: BytesIO, size: int) -> bytes:
@@ -0,0 +1,94 @@
+"""pytest-benchmark suite of the host client hot paths, no simulator needed.
+
+Run from the `tests` folder, `make bench-save` records a baseline and
+`make bench` fails when the fastest round of a benchmark regresses by more than
+50% against it (medians are too noisy on shared runners).
+"""
+
+import hashlib
+import os
+
+import pytest
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, utils
+
+from app_client.cmd_builder import MAX_APDU_LEN, CommandBuilder, InsType, chunkify
+from app_client.exception import DeviceException
+from app_client.token import Token
+from app_client.transaction import load_public_key
+from app_client.utils import Bip32Path, bip32_path_from_string
+from bench.bench_serialize import SIZES, make_tx, serialize_uncached
+from utils import TxGenerator
+
+
+def test_command_builder_serialize(benchmark):
+    builder = CommandBuilder()
+    cdata = bytes(MAX_APDU_LEN)
+
+    benchmark(builder.serialize, 0xE0, InsType.INS_SIGN_TX, 0, 0, cdata)
+
+
+def test_chunkify(benchmark):
+    data = os.urandom(8 * MAX_APDU_LEN + 100)
+
+    benchmark(lambda: list(chunkify(data, MAX_APDU_LEN)))
+
+
+@pytest.mark.parametrize("num", SIZES)
+def test_transaction_serialize(benchmark, num):
+    benchmark(serialize_uncached, make_tx(num))
+
+
+def test_bip32_path_from_string(benchmark):
+    benchmark(bip32_path_from_string, "m/44'/280'/0'/0/7")
+
+
+def test_bip32_path_parse_uncached(benchmark):
+    benchmark(Bip32Path.parse.__wrapped__, "m/44'/280'/0'/0/7")
+
+
+def test_token_serialize(benchmark):
+    token = Token(1, "HATHR", "Hathor Benchmark Token", os.urandom(32))
+
+    benchmark(token.serialize, bytes(32))
+
+
+def signed_tx():
+    tx = make_tx(10)
+    private_key = ec.generate_private_key(ec.SECP256K1())
+    digest = hashlib.sha256(hashlib.sha256(tx.serialize()).digest()).digest()
+    signature = private_key.sign(digest, ec.ECDSA(utils.Prehashed(hashes.SHA256())))
+    public_key = private_key.public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.CompressedPoint
+    )
+    return tx, signature, public_key
+
+
+def test_verify_signature(benchmark):
+    """Public key already decompressed, as when a wallet verifies many inputs."""
+    tx, signature, public_key = signed_tx()
+
+    benchmark(tx.verify_signature, signature, public_key)
+
+
+def test_verify_signature_cold(benchmark):
+    """First verification with a key, decompresses the public key."""
+    tx, signature, public_key = signed_tx()
+
+    def verify():
+        load_public_key.cache_clear()
+        tx.verify_signature(signature, public_key)
+
+    benchmark(verify)
+
+
+def test_device_exception(benchmark):
+    benchmark(DeviceException, error_code=0xB009, ins=InsType.INS_SIGN_TX)
+
+
+def test_generator_tx(benchmark):
+    benchmark(TxGenerator(seed=0).tx)
+
+
+def test_generator_sighash(benchmark):
+    benchmark(TxGenerator(seed=0).sighash)
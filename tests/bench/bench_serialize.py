@@ -0,0 +1,48 @@
+"""Benchmark of `Transaction.serialize` against the number of inputs and outputs.
+
+Run from the `tests` folder with
+
+    python -m bench.bench_serialize
+
+The cost per element should stay flat as the transaction grows.
+"""
+
+import os
+import timeit
+
+from app_client.emulator import P2PKH_PREFIX, P2PKH_SUFFIX
+from app_client.transaction import Transaction, TxInput, TxOutput
+
+SIZES = [1, 10, 100, 255]
+SCRIPT = P2PKH_PREFIX + bytes(20) + P2PKH_SUFFIX
+
+
+def make_tx(num: int) -> Transaction:
+    inputs = [TxInput(os.urandom(32), i % 256) for i in range(num)]
+    outputs = [TxOutput(1000 + i, SCRIPT) for i in range(num)]
+    return Transaction(1, [], inputs, outputs)
+
+
+def serialize_uncached(tx: Transaction) -> bytes:
+    # drop the cached sighash_all so each call serializes
+    tx.sighash_all = None
+    return tx.serialize()
+
+
+def bench(num: int, number: int = 200) -> float:
+    """Seconds per serialize of a transaction with `num` inputs and outputs."""
+    tx = make_tx(num)
+
+    timings = timeit.repeat(lambda: serialize_uncached(tx), number=number, repeat=5)
+    return min(timings) / number
+
+
+def main() -> None:
+    print(f"{'inputs/outputs':>15} {'us/tx':>10} {'ns/element':>11}")
+    for num in SIZES:
+        elapsed = bench(num)
+        print(f"{num:>15} {elapsed * 1e6:>10.2f} {elapsed * 1e9 / (2 * num):>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,21 +23,120 @@ Addresses: m/44'/280'/0'/0/0-9
 | 9 | HR3vvY4AktDo9EWBnvsqqfKeWttRWc1wUW |
 """
 
+import os
 from pathlib import Path
+from urllib.parse import urlparse
 
 import pytest
 
-from app_client.automation import CommandAutomation, FakeAutomation
+from app_client.automation import CommandAutomation, EventAutomation, FakeAutomation
 from app_client.cmd import Command
-from app_client.transport import TransportAPI
+from app_client.emulator import HathorEmulator
+from app_client.trace import logger, tracer
+from app_client.transport import HidTransport, TcpApduTransport, TransportAPI
+from utils import check_devices, gen, worker_device
 
 
 def pytest_addoption(parser):
-    parser.addoption("--hid", action="store_true")
+    parser.addoption(
+        "--hid", action="store_true", help="Run against a Ledger device over USB HID"
+    )
     parser.addoption("--headless", action="store_true")
     parser.addoption(
-        "--url", help="Speculos API endpoint", default="http://localhost:5000/"
+        "--screen-events",
+        action="store_true",
+        help="With --headless, answer each screen from the speculos event stream "
+        "instead of posting automation rules",
+    )
+    parser.addoption(
+        "--emulator",
+        action="store_true",
+        help="Run against the in-process app emulator instead of speculos",
+    )
+    parser.addoption(
+        "--url",
+        help="Speculos API endpoint, comma separated to give one per xdist worker",
+        default="http://localhost:5000/",
+    )
+    parser.addoption(
+        "--apdu-port",
+        help="Speculos raw APDU port, used instead of the HTTP API when set "
+        "(comma separated, one per --url)",
+    )
+    parser.addoption(
+        "--tx-seed",
+        type=int,
+        default=os.environ.get("TX_SEED"),
+        help="Seed of the fake transactions (default: $TX_SEED or random), "
+        "reported in the header to reproduce a run",
+    )
+    parser.addoption(
+        "--apdu-trace",
+        type=int,
+        default=0,
+        help="Keep the last N APDU exchanges and report them on failure",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "token_signatures: uses or resets the token signatures of the shared "
+        "device, such tests run on a single xdist worker (--dist loadgroup)",
+    )
+    config.addinivalue_line(
+        "markers",
+        "screen_events: the automation rules of --headless hang on its screens, "
+        "skipped unless --screen-events or --emulator answers them",
+    )
+    # pytest only sets --log-level while tests run, tracing is decided up front
+    if config.getoption("log_level"):
+        logger.setLevel(config.getoption("log_level").upper())
+    tracer.configure(ring_size=config.getoption("apdu_trace"))
+
+    # the controller picks the seed, xdist workers get it in their workerinput
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is not None:
+        gen.reseed(workerinput["tx_seed"])
+    else:
+        gen.reseed(config.getoption("tx_seed"))
+    config.option.tx_seed = gen.seed
+
+    check_devices(config)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    node.workerinput["tx_seed"] = node.config.option.tx_seed
+
+
+def pytest_report_header(config):
+    return f"tx seed: {config.option.tx_seed} (rerun with --tx-seed)"
+
+
+def pytest_collection_modifyitems(config, items):
+    rules_only = config.getoption("headless") and not (
+        config.getoption("screen_events") or config.getoption("emulator")
     )
+    for item in items:
+        if item.get_closest_marker("token_signatures") is not None:
+            item.add_marker(pytest.mark.xdist_group("token_signatures"))
+        if rules_only and item.get_closest_marker("screen_events") is not None:
+            item.add_marker(
+                pytest.mark.skip(
+                    "speculos: hangs with automation rules, run with --screen-events"
+                )
+            )
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    if report.when == "call":
+        if report.failed and tracer.ring:
+            report.sections.append(("APDU trace", tracer.format()))
+        tracer.clear()
 
 
 @pytest.fixture(scope="module")
@@ -55,7 +154,8 @@ def sw_h_path():
 
 @pytest.fixture(scope="session")
 def server(pytestconfig):
-    return pytestconfig.getoption("url")
+    """Speculos endpoint of this worker (unused with --emulator)."""
+    return worker_device(pytestconfig, "url")
 
 
 @pytest.fixture(scope="session")
@@ -68,9 +168,16 @@ def headless(pytestconfig):
     return pytestconfig.getoption("headless")
 
 
+@pytest.fixture(scope="session")
+def emulator(pytestconfig):
+    return pytestconfig.getoption("emulator")
+
+
 @pytest.fixture(scope="session", autouse=True)
-def automation(headless, server):
-    if headless:
+def automation(pytestconfig, headless, emulator, server):
+    if headless and not emulator and pytestconfig.getoption("screen_events"):
+        ca = EventAutomation(server)
+    elif headless and not emulator:
         ca = CommandAutomation(server)
     else:
         ca = FakeAutomation()
@@ -80,8 +187,21 @@ def automation(headless, server):
 
 
 @pytest.fixture(scope="session")
-def transport(server):
-    transport = TransportAPI(server)
+def apdu_port(pytestconfig):
+    port = worker_device(pytestconfig, "apdu_port")
+    return int(port) if port is not None else None
+
+
+@pytest.fixture(scope="session")
+def transport(server, hid, emulator, apdu_port):
+    if emulator:
+        transport = HathorEmulator()
+    elif hid:
+        transport = HidTransport.open()
+    elif apdu_port:
+        transport = TcpApduTransport(urlparse(server).hostname, apdu_port)
+    else:
+        transport = TransportAPI(server)
     yield transport
     transport.close()
 
@@ -93,6 +213,17 @@ def cmd(transport):
     yield command
 
 
+@pytest.fixture
+def speculos_stand_in():
+    """Offline speculos API, confirmations are drawn on its event stream."""
+    # aiohttp is only needed by the stand-in
+    from stand_in import SpeculosStandIn
+
+    server = SpeculosStandIn()
+    yield server
+    server.close()
+
+
 @pytest.fixture(scope="session")
 def public_key_bytes():
     """Public key bytes for paths m/44'/280'/0'/0/0-9 for test seed.
@@ -130,3 +261,21 @@ def public_key_bytes():
             "03cc7f5488dd61522d75c69035c72431b12e869be3ffc4da13c86cfe8a672d06d2"
         ),
     ]
+
+
+@pytest.fixture(scope="session")
+def addresses():
+    """Addresses for paths m/44'/280'/0'/0/0-9 for test seed (see above)."""
+
+    return [
+        "HJYAnivCTdRtxcgeJW8pKk1y7przypne3C",
+        "HAgKJhndq6LCd3qd5tRZC7ixFAk5AyXH2J",
+        "H7Db39doQWtPxPx28e47xGt2hRWekhPsrF",
+        "HA8LYkjuoM5pYJMRowDRyxF7ynGrcZAXSJ",
+        "HRW3GHh7ocfWkYFtn8ek5aNatEKCuZNz9X",
+        "HGN15ort55joYigANsSgc25bihEcWhT9AC",
+        "HQWUGHSmhDRYFTihwRXV7KYtjb4u84LJgZ",
+        "HBdTnYddrfDAw4mSXWystLVRdQgiDoikrH",
+        "HTwehQ1oZvxwAxVB9ET8tesQnNWR1BnfKJ",
+        "HR3vvY4AktDo9EWBnvsqqfKeWttRWc1wUW",
+    ]
@@ -0,0 +1,114 @@
+"""Offline stand-in for the speculos REST API, used by the `speculos_stand_in`
+fixture. Kept apart from `utils` so only its users import aiohttp."""
+
+import asyncio
+import json
+import queue
+import threading
+from typing import List, Optional, Tuple
+
+from aiohttp import web
+
+from app_client.emulator import HathorEmulator, approve_all
+
+
+class SpeculosStandIn:
+    """Stand-in for the speculos REST API, runs offline.
+
+    APDUs are answered by `HathorEmulator`. With `screens` each confirmation
+    is drawn on the event stream (one screen per value, then "Approve" and
+    "Reject") and navigated with the buttons like a Nano S flow, otherwise
+    everything is approved. Rule sets posted to `/automation` are recorded in
+    `automations`, they are not applied.
+    """
+
+    def __init__(self, screens: bool = True) -> None:
+        self.device = HathorEmulator(approve=self.approve if screens else approve_all)
+        self.subscribers: List["asyncio.Queue[Optional[dict]]"] = []
+        self.buttons: "queue.Queue[str]" = queue.Queue()
+        self.automations: List[dict] = []
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.url = asyncio.run_coroutine_threadsafe(self.start(), self.loop).result()
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/apdu", self.apdu)
+        app.router.add_post("/automation", self.automation)
+        app.router.add_get("/events", self.events)
+        app.router.add_delete("/events", self.delete_events)
+        app.router.add_post("/button/{name}", self.button)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        return f"http://127.0.0.1:{port}/"
+
+    async def apdu(self, request: web.Request) -> web.Response:
+        data = bytes.fromhex((await request.json())["data"])
+        sw, response = await self.loop.run_in_executor(
+            None, self.device.exchange_apdu_raw, data
+        )
+        return web.json_response({"data": (response + sw.to_bytes(2, "big")).hex()})
+
+    async def automation(self, request: web.Request) -> web.Response:
+        self.automations.append(await request.json())
+        return web.json_response({})
+
+    async def events(self, request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        # subscribe before the client sees the stream as connected
+        events: "asyncio.Queue[Optional[dict]]" = asyncio.Queue()
+        self.subscribers.append(events)
+        try:
+            await response.prepare(request)
+            while True:
+                event = await events.get()
+                if event is None:
+                    return response
+                await response.write(f"data: {json.dumps(event)}\n\n".encode())
+        finally:
+            self.subscribers.remove(events)
+
+    async def delete_events(self, request: web.Request) -> web.Response:
+        return web.json_response({})
+
+    async def button(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        if name not in ("left", "right", "both"):
+            raise web.HTTPBadRequest(text=f"unknown button {name!r}")
+        self.buttons.put(name)
+        return web.json_response({})
+
+    def draw(self, texts: Tuple[str, ...]) -> None:
+        for i, text in enumerate(texts):
+            event = {"text": text, "x": 0, "y": 3 + 16 * i}
+            for events in list(self.subscribers):
+                self.loop.call_soon_threadsafe(events.put_nowait, event)
+
+    def approve(self, title: str, fields: Tuple[str, ...]) -> bool:
+        # called by the emulator in an executor thread
+        pages = [(title, *fields[:1]), *((f,) for f in fields[1:])]
+        pages += [("Approve",), ("Reject",)]
+        page = 0
+        while True:
+            self.draw(pages[page])
+            button = self.buttons.get(timeout=5)
+            if button == "right":
+                page = (page + 1) % len(pages)
+            elif button == "left":
+                page = (page - 1) % len(pages)
+            elif pages[page] == ("Approve",):
+                return True
+            elif pages[page] == ("Reject",):
+                return False
+
+    def close(self) -> None:
+        # end the open streams, cleanup waits for their handlers
+        for events in list(self.subscribers):
+            self.loop.call_soon_threadsafe(events.put_nowait, None)
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app_client.async_cmd import AsyncCommand
+from app_client.emulator import HathorEmulator
+from app_client.exception import InvalidSignatureError
+from app_client.transport import AsyncTransportAdapter, AsyncTransportAPI
+from stand_in import SpeculosStandIn
+from utils import fake_signable_tx, fake_token
+
+
+def async_cmd() -> AsyncCommand:
+    return AsyncCommand(transport=AsyncTransportAdapter(HathorEmulator()))
+
+
+def test_async_get_version():
+    assert asyncio.run(async_cmd().get_version()) == (b"HTR", 1, 1, 0)
+
+
+def test_async_sign_tx_many_devices(public_key_bytes):
+    async def sign_all(txs):
+        cmds = [async_cmd() for _ in txs]
+        return await asyncio.gather(*[cmd.sign_tx(tx) for cmd, tx in zip(cmds, txs)])
+
+    txs = [fake_signable_tx(3) for _ in range(5)]
+    results = asyncio.run(sign_all(txs))
+
+    for tx, signatures in zip(txs, results):
+        assert len(signatures) == len(tx.inputs)
+        for index, signature in enumerate(signatures):
+            tx.verify_signature(signature, public_key_bytes[index])
+
+
+def test_async_sign_then_reset():
+    async def run():
+        cmd = async_cmd()
+        token = fake_token()
+        signature = await cmd.sign_token_data(token)
+        await cmd.verify_token_signature(token, signature)
+        await cmd.reset_token_signatures()
+        with pytest.raises(InvalidSignatureError):
+            await cmd.verify_token_signature(token, signature)
+
+    asyncio.run(run())
+
+
+def test_async_transport_api(public_key_bytes):
+    servers = [SpeculosStandIn(screens=False) for _ in range(2)]
+    # built outside of an event loop, like a sync fixture does
+    transports = [AsyncTransportAPI(server.url) for server in servers]
+    txs = [fake_signable_tx(3) for _ in servers]
+
+    async def sign_all():
+        async with transports[0], transports[1]:
+            cmds = [AsyncCommand(transport=transport) for transport in transports]
+            version = await cmds[0].get_version()
+            signatures = await asyncio.gather(
+                *[cmd.sign_tx(tx) for cmd, tx in zip(cmds, txs)]
+            )
+        return version, signatures
+
+    try:
+        version, results = asyncio.run(sign_all())
+    finally:
+        for server in servers:
+            server.close()
+
+    assert version == (b"HTR", 1, 1, 0)
+    assert all(transport.session is None for transport in transports)
+    for tx, signatures in zip(txs, results):
+        tx.verify_signatures(signatures, public_key_bytes[: len(tx.inputs)])
@@ -0,0 +1,63 @@
+import json
+
+from app_client.automation import (
+    ACCEPT_ALL,
+    CommandAutomation,
+    ConditionFlag,
+    Rules,
+    RuleSet,
+)
+
+
+def test_rule_run_once_does_not_mutate_actions():
+    go_left = [list(action) for action in Rules.go_left]
+
+    for _ in range(3):
+        rule = Rules.rule(
+            Rules.go_left, "Output", conditions=[("seen", ConditionFlag.RUN_ONCE)]
+        )
+        assert rule["actions"] == go_left + [["setbool", "seen", True]]
+    assert Rules.go_left == go_left
+
+
+def test_ruleset_compile():
+    rules = Rules.sign_tx_accept_rule()
+
+    ruleset = RuleSet.compile(rules)
+    assert RuleSet.compile(Rules.sign_tx_accept_rule()) is ruleset
+    assert ruleset != RuleSet.compile(Rules.sign_tx_reject_send_rule())
+    assert json.loads(ruleset.payload) == {"version": 1, "rules": rules}
+    assert ruleset.rules == rules
+    assert not ruleset.stateful
+
+
+def test_automation_skips_active_ruleset(speculos_stand_in):
+    automation = CommandAutomation(speculos_stand_in.url)
+    once = [
+        Rules.rule(
+            Rules.go_left, "Output", conditions=[("seen", ConditionFlag.RUN_ONCE)]
+        )
+    ]
+    try:
+        automation.set_accept_all()
+        automation.set_accept_all()
+        automation.automation(Rules.get_address_rule())
+        automation.automation(Rules.get_address_rule())
+        automation.set_accept_all()
+        # conditions are reset by every post
+        automation.automation(once)
+        automation.automation(once)
+        automation.invalidate()
+        automation.automation(Rules.get_address_rule())
+    finally:
+        automation.close()
+
+    assert [body["rules"] for body in speculos_stand_in.automations] == [
+        ACCEPT_ALL.rules,
+        Rules.get_address_rule(),
+        ACCEPT_ALL.rules,
+        once,
+        once,
+        Rules.get_address_rule(),
+    ]
+    assert (automation.posted, automation.skipped) == (6, 2)
@@ -0,0 +1,177 @@
+import tracemalloc
+
+import pytest
+
+from app_client.batch import SighashBatch, TransactionBatch
+from app_client.transaction import Transaction, TransactionError, TxInput, TxOutput
+from utils import fake_input, fake_script, fake_tx, gen
+
+
+def fake_batch_tx() -> Transaction:
+    tokens = [gen.randbytes(32) for _ in range(gen.randint(0, 3))]
+    inputs = [
+        TxInput(gen.randbytes(32), gen.randint(0, 255))
+        for _ in range(gen.randint(0, 5))
+    ]
+    outputs = [
+        TxOutput(
+            gen.randint(1, 2 ** 60),
+            fake_script(),
+            gen.randint(0, len(tokens)),
+            gen.randint(0, 1) == 1,
+        )
+        for _ in range(gen.randint(1, 5))
+    ]
+    return Transaction(1, tokens, inputs, outputs)
+
+
+def test_batch_columns(tmp_path):
+    txs = [fake_batch_tx() for _ in range(20)]
+    path = tmp_path / "sighash.bin"
+    path.write_bytes(b"".join(tx.serialize() for tx in txs))
+
+    batch = SighashBatch.from_file(path)
+
+    assert len(batch) == len(txs)
+    assert batch.tx_version.tolist() == [tx.tx_version for tx in txs]
+    inputs = [tx_input for tx in txs for tx_input in tx.inputs]
+    outputs = [tx_output for tx in txs for tx_output in tx.outputs]
+    assert [bytes(uid) for uid in batch.token_uid] == [
+        token for tx in txs for token in tx.tokens
+    ]
+    assert [bytes(tx_id) for tx_id in batch.input_tx_id] == [i.tx_id for i in inputs]
+    assert batch.input_index.tolist() == [i.index for i in inputs]
+    assert batch.output_value.tolist() == [o.value for o in outputs]
+    assert batch.output_token_data.tolist() == [o.token_data for o in outputs]
+    assert [batch.output_script(row) for row in range(len(outputs))] == [
+        o.script for o in outputs
+    ]
+    for i, tx in enumerate(txs):
+        start = batch.output_start[i]
+        assert (batch.output_tx[start : start + len(tx.outputs)] == i).all()
+
+
+def test_batch_sum_by_token():
+    txs = [fake_batch_tx() for _ in range(10)]
+    expected = {}
+    for tx in txs:
+        for tx_output in tx.outputs:
+            if tx_output.token_data & 0x80:
+                continue
+            index = tx_output.token_data & 0x7F
+            uid = b"" if index == 0 else tx.tokens[index - 1]
+            expected[uid] = expected.get(uid, 0) + tx_output.value
+
+    batch = SighashBatch.from_blobs(tx.serialize() for tx in txs)
+
+    assert batch.output_sum_by_token() == expected
+
+
+def test_batch_sum_by_token_overflow():
+    tx = fake_tx(outputs=[TxOutput(2 ** 63 - 1, fake_script()) for _ in range(4)])
+
+    batch = SighashBatch(tx.serialize())
+
+    assert batch.output_sum_by_token() == {b"": 4 * (2 ** 63 - 1)}
+
+
+def test_batch_sum_by_token_zero_uid():
+    # a custom token whose uid is all zeros is not HTR
+    tx = fake_tx(
+        outputs=[TxOutput(10, fake_script()), TxOutput(5, fake_script(), 1)],
+        tokens=[bytes(32)],
+    )
+
+    batch = SighashBatch(tx.serialize())
+
+    assert batch.output_sum_by_token() == {b"": 10, bytes(32): 5}
+
+
+def test_batch_token_index_out_of_range():
+    tx_a = fake_tx(tokens=[gen.randbytes(32)])
+    tx_a.outputs[0].token_data = 2
+    tx_b = fake_tx(tokens=[gen.randbytes(32)])
+
+    # the index must not resolve into the tokens of the next transaction
+    with pytest.raises(TransactionError, match="token index"):
+        SighashBatch.from_blobs([tx_a.serialize(), tx_b.serialize()])
+    with pytest.raises(TransactionError, match="token index"):
+        SighashBatch.from_blobs([tx_b.serialize(), tx_a.serialize()])
+
+
+def test_batch_errors():
+    tx = fake_tx()
+    tx.outputs[0].value = 2 ** 40
+    sighash_all = tx.serialize()
+
+    assert len(SighashBatch(b"")) == 0
+    with pytest.raises(TransactionError):
+        SighashBatch(sighash_all + sighash_all[:-1])
+    with pytest.raises(TransactionError):
+        SighashBatch(sighash_all + sighash_all[:3])
+
+    # cut inside the header of the first output
+    first_output = len(sighash_all) - sum(len(o.serialize()) for o in tx.outputs)
+    for cut in [1, 3, 5, 7]:
+        with pytest.raises(TransactionError):
+            SighashBatch(sighash_all[: first_output + cut])
+
+
+def test_transaction_batch():
+    txs = [fake_batch_tx() for _ in range(20)]
+    for tx in txs:
+        tx.inputs.append(fake_input())
+    batch = TransactionBatch(txs[:10])
+    batch.extend(txs[10:])
+
+    assert len(batch) == len(txs)
+    for i, tx in enumerate(txs):
+        assert batch.serialize(i) == tx.serialize()
+        copy = batch[i]
+        assert copy.serialize() == tx.serialize()
+        assert [str(x.bip32_path) for x in copy.inputs] == [
+            str(x.bip32_path) if x.bip32_path else "None" for x in tx.inputs
+        ]
+    assert [t.serialize() for t in batch] == [t.serialize() for t in txs]
+    assert bytes(batch.tokens(0)) == b"".join(txs[0].tokens)
+    assert batch[-1].serialize() == txs[-1].serialize()
+    with pytest.raises(IndexError):
+        batch[len(txs)]
+
+
+def test_transaction_batch_memory():
+    blobs = [fake_tx(tokens=[]).serialize() for _ in range(500)]
+
+    tracemalloc.start()
+    try:
+        txs = [Transaction.from_bytes(blob) for blob in blobs]
+        objects_size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        tracemalloc.clear_traces()
+        batch = TransactionBatch(txs)
+        batch_size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    assert len(batch) == len(txs)
+    assert batch_size * 3 < objects_size
+
+
+def test_transaction_batch_invalid():
+    txs = [fake_batch_tx() for _ in range(3)]
+    batch = TransactionBatch(txs[:1])
+    bad_token = fake_batch_tx()
+    bad_token.tokens.append(bytes(31))
+    bad_value = fake_batch_tx()
+    bad_value.outputs.append(TxOutput(2 ** 64, fake_script()))
+
+    with pytest.raises(TransactionError):
+        batch.append(bad_token)
+    with pytest.raises(OverflowError):
+        batch.append(bad_value)
+    with pytest.raises(TransactionError):
+        batch.extend([txs[1], bad_token, txs[2]])
+
+    assert len(batch) == 2
+    assert [batch.serialize(i) for i in range(2)] == [tx.serialize() for tx in txs[:2]]
+    assert batch[1].serialize() == txs[1].serialize()
@@ -0,0 +1,47 @@
+import pytest
+
+from app_client.transaction import ChangeInfo
+from app_client.utils import HARDENED, Bip32Path, bip32_path_from_string
+
+
+def test_parse():
+    path = Bip32Path.parse("m/44'/280'/0'/0/7")
+
+    assert path.indexes == (HARDENED | 44, HARDENED | 280, HARDENED, 0, 7)
+    assert path.packed == b"".join(bip32_path_from_string("m/44'/280'/0'/0/7"))
+    assert path.serialize() == bytes([5]) + path.packed
+    assert str(path) == "m/44'/280'/0'/0/7"
+    # interned
+    assert Bip32Path.parse("m/44'/280'/0'/0/7") is path
+    assert Bip32Path.from_any(path) is path
+
+
+def test_derive():
+    account = Bip32Path.parse("m/44'/280'/0'")
+    change = account.child(0)
+
+    assert account.child(1, hardened=True) == Bip32Path.parse("m/44'/280'/0'/1'")
+    for i in range(5):
+        child = change.child(i)
+        assert child == Bip32Path.parse(f"m/44'/280'/0'/0/{i}")
+        assert child.packed == Bip32Path.parse(f"m/44'/280'/0'/0/{i}").packed
+        assert child.sibling(9) == change.child(9)
+        assert child.parent == change
+    assert len({change.child(1), Bip32Path.parse("m/44'/280'/0'/0/1")}) == 1
+
+
+def test_immutable():
+    path = Bip32Path.parse("m/44'/280'/0'/0/0")
+
+    with pytest.raises(AttributeError):
+        path.packed = b""
+
+
+def test_change_info():
+    path = "m/44'/280'/0'/0/3"
+
+    for change in [ChangeInfo(2, path), ChangeInfo(2, Bip32Path.parse(path))]:
+        assert change.serialize() == b"\x02\x05" + b"".join(
+            bip32_path_from_string(path)
+        )
+        assert change.old_proto_bytes()[:2] == b"\x85\x02"
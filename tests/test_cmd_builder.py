@@ -0,0 +1,73 @@
+from app_client.cmd_builder import MAX_APDU_LEN, CommandBuilder, InsType, chunkify
+from app_client.transaction import ChangeInfo
+from utils import fake_input, fake_tx
+
+
+def test_chunkify():
+    data = bytes(range(256)) * 3
+    chunks = list(chunkify(data, MAX_APDU_LEN))
+
+    assert b"".join(chunk for _, chunk in chunks) == data
+    assert [is_last for is_last, _ in chunks] == [False, False, False, True]
+    assert all(chunk.obj is data for _, chunk in chunks)
+
+    chunks = list(chunkify(data[:510], MAX_APDU_LEN))
+    assert [is_last for is_last, _ in chunks] == [False, True]
+
+
+def test_sign_tx_send_data():
+    builder = CommandBuilder()
+    tx = fake_tx(inputs=[fake_input() for _ in range(10)])
+    change_list = [ChangeInfo(0, "m/44'/280'/0'/0/0")]
+    cdata = b"".join([b"\x01\x01", change_list[0].serialize(), tx.serialize()])
+
+    chunks = [
+        bytes(chunk) for chunk in builder.sign_tx_send_data(tx, change_list=change_list)
+    ]
+
+    assert len(chunks) == (len(cdata) + MAX_APDU_LEN - 1) // MAX_APDU_LEN
+    for i, chunk in enumerate(chunks):
+        assert chunk[:4] == bytes([0xE0, InsType.INS_SIGN_TX, 0, i])
+        assert chunk[4] == len(chunk) - 5
+    assert b"".join(chunk[5:] for chunk in chunks) == cdata
+
+
+def test_sign_tx_send_data_stream():
+    builder = CommandBuilder()
+    for num_inputs in [1, 7, 50]:
+        tx = fake_tx(inputs=[fake_input() for _ in range(num_inputs)])
+        for use_old_protocol in [True, False]:
+            change_list = [ChangeInfo(0, "m/44'/280'/0'/0/0")]
+            expected = [
+                bytes(chunk)
+                for chunk in builder.sign_tx_send_data(
+                    tx, change_list=change_list, use_old_protocol=use_old_protocol
+                )
+            ]
+            tx.sighash_all = None
+            chunks = [
+                bytes(chunk)
+                for chunk in builder.sign_tx_send_data(
+                    tx,
+                    change_list=change_list,
+                    use_old_protocol=use_old_protocol,
+                    stream=True,
+                )
+            ]
+
+            assert chunks == expected
+            assert tx.sighash_all is None
+
+
+def test_sign_tx_send_data_views():
+    builder = CommandBuilder()
+    tx = fake_tx(inputs=[fake_input() for _ in range(10)])
+
+    chunks = list(builder.sign_tx_send_data(tx))
+    views = builder.sign_tx_send_data(tx, views=True)
+
+    assert len(set(chunks)) == len(chunks) > 1
+    for chunk, view in zip(chunks, views):
+        assert isinstance(chunk, bytes)
+        assert isinstance(view, memoryview)
+        assert view == chunk
@@ -0,0 +1,74 @@
+from typing import List, Tuple
+
+import pytest
+from hathorlib.scripts import P2PKH
+from hathorlib.utils import get_address_from_public_key_hash
+
+from app_client.cmd import Command
+from app_client.cost import SIGN_TX_DATA, SIGN_TX_SIGN, CostModel
+from app_client.emulator import HathorEmulator
+from app_client.metrics import Metrics
+from app_client.transaction import ChangeInfo, TxOutput
+from app_client.utils import Bip32Path
+from utils import fake_input, fake_output, fake_tx
+
+
+def test_estimate_matches_sign_tx():
+    screens: List[Tuple[str, ...]] = []
+
+    def approve(title: str, fields: Tuple[str, ...]) -> bool:
+        screens.append((title, *fields))
+        return True
+
+    emulator = HathorEmulator(approve=approve)
+    metrics = Metrics()
+    cmd = Command(emulator, metrics=metrics)
+
+    path = "m/44'/280'/0'/1/0"
+    change_script = P2PKH.create_output_script(
+        get_address_from_public_key_hash(
+            emulator.pubkey_hash(Bip32Path.parse(path).indexes)
+        )
+    )
+    outputs = [fake_output() for _ in range(12)]
+    outputs.append(TxOutput(5, change_script))
+    tx = fake_tx(inputs=[fake_input() for _ in range(30)], outputs=outputs, tokens=[])
+    change_list = [ChangeInfo(12, path)]
+
+    estimate = cmd.estimate(tx, change_list)
+    assert estimate.seconds == 0.0
+
+    cmd.sign_tx(tx, change_list)
+
+    recorded = metrics.exchanges
+    assert estimate.apdus == sum(s.latency.count for s in recorded.values())
+    assert estimate.bytes_sent == sum(s.bytes_sent for s in recorded.values())
+    assert estimate.data_chunks == recorded[SIGN_TX_DATA].latency.count
+    assert estimate.sign_calls == recorded[SIGN_TX_SIGN].latency.count == 30
+    # change output has no screen
+    assert estimate.screens == len(screens) == 13
+
+    # calibrated on the same exchanges, the prediction is the recorded time
+    predicted = cmd.estimate(tx, change_list)
+    total = sum(s.latency.sum for s in recorded.values())
+    assert predicted.seconds == pytest.approx(total)
+    assert predicted.exchanges == estimate.exchanges
+
+
+def test_cost_model():
+    tx = fake_tx(inputs=[fake_input() for _ in range(3)], tokens=[])
+    cmd = Command(HathorEmulator())
+    model = CostModel(
+        {SIGN_TX_DATA: 0.5, SIGN_TX_SIGN: 0.25},
+        byte_seconds=0.001,
+        screen_seconds=2.0,
+        default_latency=0.1,
+    )
+
+    estimate = cmd.estimate(tx, model=model)
+
+    expected = 0.5 * estimate.data_chunks + 0.25 * 3 + 0.1
+    expected += 0.001 * estimate.bytes_sent + 2.0 * estimate.screens
+    assert estimate.seconds == pytest.approx(expected)
+    # old protocol with no change shows every output
+    assert cmd.estimate(tx, use_old_protocol=True).screens == len(tx.outputs) + 1
@@ -1,10 +1,9 @@
 import pytest
-from faker import Faker
 
 from app_client.exception import InvalidSignatureError
-from utils import fake_token
+from utils import fake_token, gen
 
-fake = Faker()
+pytestmark = pytest.mark.token_signatures
 
 
 def test_sign_token(cmd):
@@ -36,7 +35,7 @@ def test_sign_then_reset(cmd):
 
     # verify invalid signature
     with pytest.raises(InvalidSignatureError):
-        cmd.verify_token_signature(token, fake.binary(70))
+        cmd.verify_token_signature(token, gen.randbytes(70))
 
     # reset signatures
     cmd.reset_token_signatures()
@@ -0,0 +1,69 @@
+import pytest
+
+from app_client.cmd import Command
+from app_client.emulator import HathorEmulator, StatusWord
+from app_client.exception import BadStateError, DenyError, TxInvalidError
+from utils import fake_input, fake_signable_tx, fake_token, fake_tx, parse_sw
+
+
+def test_emulator_status_words(sw_h_path):
+    expected_status_words = dict(parse_sw(sw_h_path))
+
+    status_words = {sw.name: sw.value for sw in StatusWord if sw != StatusWord.SW_OK}
+
+    assert status_words == expected_status_words
+
+
+def test_emulator_deny():
+    titles = []
+
+    def deny_tx(title, fields):
+        titles.append(title)
+        return title != "Transaction?"
+
+    cmd = Command(transport=HathorEmulator(approve=deny_tx))
+    with pytest.raises(DenyError):
+        cmd.sign_tx(fake_tx(tokens=[]))
+
+    assert titles[-1] == "Transaction?"
+    assert all(title == "Output" for title in titles[:-1])
+
+    # user did not approve, signing must fail
+    sw, _ = cmd.transport.exchange_apdu_raw(
+        next(cmd.builder.sign_tx_signatures(fake_tx(tokens=[])))
+    )
+    assert sw == StatusWord.SW_BAD_STATE
+
+
+def test_emulator_first_chunk_twice():
+    cmd = Command(transport=HathorEmulator())
+    # 10 inputs will not fit in a single chunk
+    tx = fake_tx(inputs=[fake_input() for _ in range(10)], tokens=[])
+    first_chunk = next(cmd.builder.sign_tx_send_data(tx))
+
+    sw, _ = cmd.transport.exchange_apdu_raw(first_chunk)
+    assert sw == StatusWord.SW_OK
+    with pytest.raises(BadStateError):
+        cmd.sign_tx(tx)
+
+
+def test_emulator_unregistered_token():
+    cmd = Command(transport=HathorEmulator())
+    token = fake_token()
+    tx = fake_tx(tokens=[token.uid])
+
+    with pytest.raises(TxInvalidError):
+        cmd.sign_tx(tx)
+
+    cmd.send_token_data(token, cmd.sign_token_data(token))
+    cmd.sign_tx(tx)
+
+
+def test_emulator_sign_tx_stream(public_key_bytes):
+    cmd = Command(transport=HathorEmulator())
+    tx = fake_signable_tx(10)
+
+    signatures = cmd.sign_tx(tx, stream=True)
+
+    for index, signature in enumerate(signatures):
+        tx.verify_signature(signature, public_key_bytes[index])
@@ -0,0 +1,96 @@
+from typing import List
+
+import pytest
+
+from app_client.automation import (
+    EventAutomation,
+    Screen,
+    accept_all,
+    reject_all,
+)
+from app_client.cmd import Command
+from app_client.emulator import P2PKH_PREFIX, P2PKH_SUFFIX, HathorEmulator
+from app_client.exception import DenyError
+from app_client.transaction import ChangeInfo, TxOutput
+from app_client.transport import TransportAPI
+from app_client.utils import Bip32Path
+from utils import fake_input, fake_output, fake_tx
+
+
+def change_script(device: HathorEmulator, path: str) -> bytes:
+    pubkey_hash = device.pubkey_hash(Bip32Path.parse(path).indexes)
+    return P2PKH_PREFIX + pubkey_hash + P2PKH_SUFFIX
+
+
+def test_event_automation_sign_tx_change(speculos_stand_in):
+    path = "m/44'/280'/0'/0/3"
+    outputs = [fake_output() for _ in range(3)]
+    outputs.insert(1, TxOutput(10, change_script(speculos_stand_in.device, path)))
+    tx = fake_tx(inputs=[fake_input() for _ in range(2)], outputs=outputs, tokens=[])
+    automation = EventAutomation(speculos_stand_in.url, settle=0.01)
+    cmd = Command(TransportAPI(speculos_stand_in.url))
+    try:
+        automation.set_accept_all()
+        signatures = cmd.sign_tx(tx, change_list=[ChangeInfo(1, path)])
+    finally:
+        automation.close()
+        cmd.transport.close()
+
+    assert len(signatures) == 2
+    titles = [screen.title for screen in automation.screens]
+    # the change output is not shown
+    assert titles.count("Output") == 3
+    assert "Transaction?" in titles
+    assert automation.screens[-1].texts == ("Approve",)
+    outputs_shown = [s.texts[1] for s in automation.screens if s.title == "Output"]
+    assert outputs_shown == ["1/3", "2/3", "3/3"]
+
+
+def test_event_automation_callback(speculos_stand_in):
+    seen: List[Screen] = []
+
+    def reject_second_output(screen: Screen) -> str:
+        seen.append(screen)
+        if ("Output", "2/2") in (s.texts for s in seen):
+            return reject_all(screen)
+        return accept_all(screen)
+
+    tx = fake_tx(outputs=[fake_output() for _ in range(2)], tokens=[])
+    automation = EventAutomation(speculos_stand_in.url, settle=0.01)
+    cmd = Command(TransportAPI(speculos_stand_in.url))
+    try:
+        automation.set_callback(reject_second_output)
+        with pytest.raises(DenyError):
+            cmd.sign_tx(tx)
+    finally:
+        automation.close()
+        cmd.transport.close()
+
+    assert seen == automation.screens
+    assert [s.texts for s in seen if s.title == "Output"] == [
+        ("Output", "1/2"),
+        ("Output", "2/2"),
+    ]
+
+
+def test_event_automation_button_error(speculos_stand_in):
+    automation = EventAutomation(speculos_stand_in.url, settle=0.01)
+    try:
+        automation.set_callback(lambda screen: "middle")
+        speculos_stand_in.draw(("Output", "1/1"))
+        with pytest.raises(Exception, match="event stream failed"):
+            automation.join(timeout=5)
+        # reported once, the automation can be closed afterwards
+        automation.close()
+    finally:
+        automation.close()
+
+    assert [s.texts for s in automation.screens] == [("Output", "1/1")]
+
+
+def test_event_automation_idle_screens():
+    for texts in [("Hathor", "is ready"), ("Processing",), ("Quit",)]:
+        assert accept_all(Screen(0, texts)) is None
+        assert reject_all(Screen(0, texts)) is None
+    assert accept_all(Screen(0, ("Approve",))) == "both"
+    assert reject_all(Screen(0, ("Output", "1/2"))) == "right"
@@ -0,0 +1,55 @@
+from app_client.emulator import P2PKH_PREFIX, P2PKH_SUFFIX
+from app_client.transaction import (
+    MAX_OUTPUT_VALUE_32,
+    TX_MAX_INPUTS,
+    TX_MAX_OUTPUTS,
+    TX_MAX_TOKENS,
+    Transaction,
+)
+from utils import TxGenerator, fake_tx
+
+
+def test_generator_seeded():
+    first, second = TxGenerator(seed=42), TxGenerator(seed=42)
+
+    for _ in range(50):
+        assert first.tx().serialize() == second.tx().serialize()
+        assert first.sighash() == second.sighash()
+    assert first.token().serialize() == second.token().serialize()
+    assert TxGenerator(seed=1).tx().serialize() != TxGenerator(seed=2).tx().serialize()
+
+
+def test_generator_shapes():
+    gen = TxGenerator(seed=7)
+
+    for _ in range(100):
+        data = gen.sighash()
+        assert Transaction.from_bytes(data).serialize() == data
+
+        tx = gen.tx()
+        assert Transaction.from_bytes(tx.serialize()).serialize() == tx.serialize()
+        for tx_output in tx.outputs:
+            assert tx_output.script[:3] == P2PKH_PREFIX
+            assert tx_output.script[23:] == P2PKH_SUFFIX
+            assert 1 <= tx_output.value <= 9999
+            assert tx_output.token_data <= len(tx.tokens)
+
+    max_inputs, max_outputs, max_tokens, big, authority, empty = gen.edge_txs()
+    assert len(max_inputs.inputs) == TX_MAX_INPUTS
+    assert len(max_outputs.outputs) == TX_MAX_OUTPUTS
+    assert len(max_tokens.tokens) == TX_MAX_TOKENS
+    assert {o.token_data for o in max_tokens.outputs} == set(range(TX_MAX_TOKENS + 1))
+    assert all(o.value > MAX_OUTPUT_VALUE_32 for o in big.outputs)
+    assert any(o.token_data & 0x80 for o in authority.outputs)
+    assert empty.inputs == []
+    for tx in (max_inputs, max_outputs, max_tokens, big, authority, empty):
+        assert Transaction.from_bytes(tx.serialize()).serialize() == tx.serialize()
+
+
+def test_fake_tx():
+    tx = fake_tx(tokens=[])
+
+    assert tx.tokens == []
+    assert 1 <= len(tx.inputs) <= 10
+    assert all(o.token_data == 0 for o in tx.outputs)
+    assert all(str(i.bip32_path).startswith("m/44'/280'/0'/0/") for i in tx.inputs)
@@ -0,0 +1,78 @@
+from collections import deque
+
+import pytest
+
+from app_client.cmd import Command
+from app_client.emulator import HathorEmulator
+from app_client.transport import (
+    HID_PACKET_SIZE,
+    HidFramer,
+    HidFramingError,
+    HidReassembler,
+    HidTransport,
+)
+from utils import fake_signable_tx, gen
+
+
+class LoopbackHidDevice:
+    """Virtual Ledger speaking HID framing, answered by `HathorEmulator`."""
+
+    def __init__(self, device: HathorEmulator) -> None:
+        self.device = device
+        self.framer = HidFramer()
+        self.reassembler = HidReassembler()
+        self.responses = deque()
+        self.writes = 0
+
+    def write(self, report) -> int:
+        report = bytes(report)
+        assert len(report) == HID_PACKET_SIZE + 1 and report[0] == 0
+        self.writes += 1
+        if self.reassembler.feed(report[1:]):
+            sw, response = self.device.exchange_apdu_raw(self.reassembler.message)
+            self.reassembler = HidReassembler()
+            for packet in self.framer.frame(response + sw.to_bytes(2, "big")):
+                self.responses.append(bytes(packet[1:]))
+        return len(report)
+
+    def read(self, size: int, timeout_ms: int = 0) -> list:
+        return list(self.responses.popleft()) if self.responses else []
+
+    def close(self) -> None:
+        pass
+
+
+def test_hid_framing():
+    framer = HidFramer()
+    apdu = bytes(range(256)) + bytes(range(4))
+
+    reports = [bytes(report) for report in framer.frame(apdu)]
+
+    # 57 bytes in the first packet, 59 in the next ones
+    assert len(reports) == 1 + (len(apdu) - 57 + 58) // 59
+    assert reports[0][:8] == bytes.fromhex("00010105000001") + b"\x04"
+    assert reports[1][:6] == bytes.fromhex("000101050001")
+    reassembler = HidReassembler()
+    assert [reassembler.feed(report[1:]) for report in reports][-1]
+    assert reassembler.message == apdu
+
+    with pytest.raises(HidFramingError):
+        HidReassembler().feed(reports[1][1:])
+    # header without the message length
+    with pytest.raises(HidFramingError):
+        HidReassembler().feed(reports[0][1:6])
+
+
+def test_hid_transport_loopback(public_key_bytes):
+    device = LoopbackHidDevice(HathorEmulator())
+    cmd = Command(HidTransport(device))
+
+    assert cmd.get_version()[0] == b"HTR"
+    tx = fake_signable_tx(gen.count())
+    signatures = cmd.sign_tx(tx)
+    tx.verify_signatures(signatures, public_key_bytes[: len(tx.inputs)])
+
+    pub_key, _, _ = cmd.get_xpub("m/44'/280'/0'/0/0")
+    assert len(pub_key) == 65
+    # 65 + 32 + 4 + 2 bytes response spans two packets
+    assert not device.responses
@@ -0,0 +1,53 @@
+from app_client.cmd import Command
+from app_client.cmd_builder import InsType
+from app_client.emulator import HathorEmulator
+from app_client.metrics import Histogram, Metrics
+from utils import fake_input, fake_tx
+
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+    for value in [0.5] * 50 + [1.5] * 45 + [3.0] * 4 + [10.0]:
+        histogram.observe(value)
+
+    assert histogram.count == 100
+    assert histogram.counts == [50, 45, 4, 1]
+    assert histogram.quantile(0.50) == 1.0
+    assert 1.0 < histogram.quantile(0.95) <= 2.0
+    assert 2.0 < histogram.quantile(0.99) <= 4.0
+    assert histogram.quantile(1.0) == 4.0
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_command_metrics():
+    metrics = Metrics()
+    cmd = Command(HathorEmulator(), metrics=metrics)
+    tx = fake_tx(inputs=[fake_input() for _ in range(20)], tokens=[])
+    sighash_len = len(tx.serialize()) + 2
+
+    cmd.get_version()
+    signatures = cmd.sign_tx(tx)
+
+    snapshot = metrics.snapshot()
+    exchanges = {(e["ins"], e["p1"]): e for e in snapshot["exchanges"]}
+    data = exchanges[(InsType.INS_SIGN_TX.name, 0)]
+    assert data["latency"]["count"] == (sighash_len + 254) // 255
+    assert data["bytes_sent"] == sighash_len + 5 * data["latency"]["count"]
+    assert data["errors"] == 0
+    sign = exchanges[(InsType.INS_SIGN_TX.name, 1)]
+    assert sign["latency"]["count"] == len(signatures)
+    assert sign["bytes_received"] == sum(len(s) for s in signatures)
+    assert exchanges[(InsType.INS_SIGN_TX.name, 2)]["latency"]["count"] == 1
+    assert exchanges[(InsType.INS_GET_VERSION.name, 0)]["latency"]["count"] == 1
+    assert set(snapshot["phases"]) == {"sign_tx_data", "sign_tx_sign", "sign_tx_end"}
+    assert snapshot["phases"]["sign_tx_data"]["count"] == 1
+
+    text = metrics.render_openmetrics()
+    assert text.endswith("# EOF\n")
+    assert "# TYPE hathor_app_exchanges counter" in text
+    assert 'hathor_app_exchanges_total{ins="INS_SIGN_TX",p1="2"} 1' in text
+    assert 'hathor_app_phase_seconds_count{phase="sign_tx_end"} 1' in text
+    assert (
+        'hathor_app_exchange_seconds_bucket{ins="INS_GET_VERSION",p1="0",le="+Inf"} 1'
+        in text
+    )
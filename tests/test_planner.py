@@ -0,0 +1,154 @@
+from typing import Dict, List
+
+import pytest
+from hathorlib.scripts import P2PKH
+from hathorlib.utils import get_address_from_public_key_hash
+
+from app_client.cmd import Command
+from app_client.emulator import HathorEmulator
+from app_client.planner import (
+    HTR_UID,
+    MAX_SIGN_TX_DATA,
+    Payment,
+    PlanError,
+    PlannedTx,
+    Utxo,
+    plan_payout,
+)
+from app_client.transaction import TX_MAX_INPUTS, TX_MAX_OUTPUTS, TX_MAX_TOKENS
+from app_client.utils import Bip32Path
+from utils import fake_path, fake_script, fake_token, gen
+
+CHANGE_PATH = "m/44'/280'/0'/1/0"
+
+
+def fake_utxos(token: bytes, values: List[int]) -> List[Utxo]:
+    return [
+        Utxo(gen.randbytes(32), gen.randint(0, 255), value, fake_path(), token)
+        for value in values
+    ]
+
+
+def check_plan(plan: List[PlannedTx], payments: List[Payment], utxos: List[Utxo]):
+    values = {(utxo.tx_id, utxo.index): utxo for utxo in utxos}
+    paid: List[Payment] = []
+    for tx, change_list in plan:
+        assert len(tx.tokens) <= TX_MAX_TOKENS
+        assert len(tx.inputs) <= TX_MAX_INPUTS
+        assert len(tx.outputs) <= TX_MAX_OUTPUTS
+        assert tx.serialized_size() < MAX_SIGN_TX_DATA
+
+        uids = [HTR_UID, *tx.tokens]
+        balance: Dict[bytes, int] = {}
+        for tx_input in tx.inputs:
+            utxo = values.pop((tx_input.tx_id, tx_input.index))
+            balance[utxo.token] = balance.get(utxo.token, 0) + utxo.value
+        change_indices = [change.output_index for change in change_list]
+        for index, tx_output in enumerate(tx.outputs):
+            token = uids[tx_output.token_data]
+            balance[token] -= tx_output.value
+            if index not in change_indices:
+                paid.append(Payment(tx_output.script, tx_output.value, token))
+        assert all(value == 0 for value in balance.values())
+        # a single change output per token
+        change_tokens = {uids[tx.outputs[i].token_data] for i in change_indices}
+        assert len(change_list) == len(change_tokens)
+
+    assert sorted(paid) == sorted(payments)
+
+
+def test_plan_split_outputs():
+    payments = [Payment(fake_script(), 10) for _ in range(600)]
+    utxos = fake_utxos(HTR_UID, [1000] * 7)
+
+    plan = plan_payout(payments, utxos, CHANGE_PATH, fake_script())
+
+    assert len(plan) == 3
+    check_plan(plan, payments, utxos)
+
+
+def test_plan_exact_funds():
+    # every transaction must be cut where it leaves no change
+    payments = [Payment(fake_script(), 3) for _ in range(300)]
+    utxos = fake_utxos(HTR_UID, [5] * 180)
+
+    plan = plan_payout(payments, utxos, CHANGE_PATH, fake_script())
+
+    assert len(plan) == 2
+    assert all(not change_list for _, change_list in plan)
+    check_plan(plan, payments, utxos)
+
+
+def test_plan_split_tokens():
+    tokens = [gen.randbytes(32) for _ in range(25)]
+    payments = [Payment(fake_script(), 5, token) for token in tokens]
+    payments.append(Payment(fake_script(), 5))
+    utxos = [utxo for token in tokens for utxo in fake_utxos(token, [3, 4])]
+    utxos.extend(fake_utxos(HTR_UID, [100]))
+
+    plan = plan_payout(payments, utxos, CHANGE_PATH, fake_script())
+
+    assert len(plan) == 3
+    assert sorted(len(tx.tokens) for tx, _ in plan) == [5, 10, 10]
+    check_plan(plan, payments, utxos)
+
+
+def test_plan_split_inputs():
+    payments = [Payment(fake_script(), 100) for _ in range(5)]
+    utxos = fake_utxos(HTR_UID, [1] * 500)
+
+    plan = plan_payout(payments, utxos, CHANGE_PATH, fake_script())
+
+    # a payment is never split, so 2 payments of 100 inputs per transaction
+    assert len(plan) == 3
+    assert all(not change_list for _, change_list in plan)
+    check_plan(plan, payments, utxos)
+
+
+def test_plan_errors():
+    with pytest.raises(PlanError):
+        plan_payout(
+            [Payment(fake_script(), 10)],
+            fake_utxos(HTR_UID, [9]),
+            CHANGE_PATH,
+            fake_script(),
+        )
+    with pytest.raises(PlanError):
+        plan_payout(
+            [Payment(fake_script(), 0)],
+            fake_utxos(HTR_UID, [9]),
+            CHANGE_PATH,
+            fake_script(),
+        )
+    with pytest.raises(PlanError):
+        # needs more inputs than a transaction can have
+        plan_payout(
+            [Payment(fake_script(), 300)],
+            fake_utxos(HTR_UID, [1] * 300),
+            CHANGE_PATH,
+            fake_script(),
+        )
+
+
+def test_plan_sign():
+    emulator = HathorEmulator()
+    cmd = Command(emulator)
+    pubkey_hash = emulator.pubkey_hash(Bip32Path.parse(CHANGE_PATH).indexes)
+    change_script = P2PKH.create_output_script(
+        get_address_from_public_key_hash(pubkey_hash)
+    )
+
+    tokens = {token.uid: token for token in (fake_token() for _ in range(12))}
+    payments = [Payment(fake_script(), 7, uid) for uid in tokens]
+    payments.extend(Payment(fake_script(), 3) for _ in range(20))
+    utxos = [utxo for uid in tokens for utxo in fake_utxos(uid, [10])]
+    utxos.extend(fake_utxos(HTR_UID, [50, 50]))
+
+    plan = plan_payout(payments, utxos, CHANGE_PATH, change_script)
+
+    assert len(plan) == 2
+    check_plan(plan, payments, utxos)
+    for tx, change_list in plan:
+        cmd.send_token_data_list([tokens[uid] for uid in tx.tokens])
+        signatures = cmd.sign_tx(tx, change_list)
+        assert len(signatures) == len(tx.inputs)
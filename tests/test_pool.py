@@ -0,0 +1,38 @@
+import pytest
+
+from app_client.cmd import Command
+from app_client.emulator import HathorEmulator
+from app_client.exception import DenyError
+from app_client.pool import DevicePool
+from utils import fake_signable_tx
+
+
+def test_pool_sign_all(public_key_bytes):
+    txs = [fake_signable_tx(2) for _ in range(20)]
+
+    with DevicePool([Command(HathorEmulator()) for _ in range(4)]) as pool:
+        results = pool.sign_all(txs)
+        stats = pool.stats
+        utilisation = pool.utilisation()
+
+    for tx, signatures in zip(txs, results):
+        assert len(signatures) == len(tx.inputs)
+        for index, signature in enumerate(signatures):
+            tx.verify_signature(signature, public_key_bytes[index])
+
+    assert sum(s.jobs for s in stats) == len(txs)
+    assert all(s.errors == 0 for s in stats)
+    assert len(utilisation) == 4
+    assert all(0 <= u <= 1 for u in utilisation)
+
+
+def test_pool_errors():
+    def deny_all(title, fields):
+        return False
+
+    with DevicePool([Command(HathorEmulator(approve=deny_all))]) as pool:
+        future = pool.submit(fake_signable_tx(2))
+        with pytest.raises(DenyError):
+            future.result()
+
+        assert pool.stats[0].errors == 1
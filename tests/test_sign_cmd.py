@@ -1,21 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
-from faker import Faker
 from hathorlib.scripts import P2PKH
 from hathorlib.utils import get_address_from_public_key_hash, get_hash160
 
-from app_client.exception import BadStateError
-from app_client.transaction import ChangeInfo, TxInput, TxOutput
-from utils import fake_tx
-
-fake = Faker()
+from app_client.transaction import ChangeInfo, TransactionError, TxOutput
+from utils import fake_signable_tx, gen
 
 
 def test_sign_tx(cmd, public_key_bytes):
-    inputs = [
-        TxInput(fake.sha256(True), fake.pyint(0, 255), "m/44'/280'/0'/0/{}".format(x))
-        for x in range(10)
-    ]
-    tx = fake_tx(inputs=inputs, tokens=[])
+    tx = fake_signable_tx(10)
     signatures = cmd.sign_tx(tx)
     print("sighash_all = {}".format(tx.serialize().hex()))
 
@@ -23,45 +17,57 @@ def test_sign_tx(cmd, public_key_bytes):
         print("verifying signature {}".format(signature.hex()))
         tx.verify_signature(signature, public_key_bytes[index])
 
+    tx.verify_signatures(signatures, public_key_bytes)
+
+
+def test_verify_signatures(cmd, public_key_bytes):
+    tx = fake_signable_tx(40)
+    signatures = cmd.sign_tx(tx)
+    public_keys = [public_key_bytes[x % 10] for x in range(40)]
+
+    with ThreadPoolExecutor(2) as executor:
+        tx.verify_signatures(signatures, public_keys, executor=executor)
+        signatures[30], signatures[35] = signatures[35], signatures[30]
+        with pytest.raises(TransactionError, match="input 30"):
+            tx.verify_signatures(signatures, public_keys, executor=executor)
+    with pytest.raises(TransactionError, match="input 30"):
+        tx.verify_signatures(signatures, public_keys)
+
 
-@pytest.mark.skip("speculos: hanging tests")
+@pytest.mark.screen_events
 def test_sign_tx_change_old_protocol(cmd, public_key_bytes):
     outputs = [
         TxOutput(
-            fake.pyint(1),
+            gen.randint(1, 9999),
             P2PKH.create_output_script(
                 get_address_from_public_key_hash(get_hash160(public_key_bytes[x]))
             ),
         )
         for x in range(5)
     ]
-    change_index = fake.pyint(0, 5)
+    change_index = gen.randint(0, 4)
     change_list = [ChangeInfo(change_index, "m/44'/280'/0'/0/{}".format(change_index))]
-    tx = fake_tx(outputs=outputs, tokens=[])
-    try:
-        cmd.sign_tx(tx, change_list=change_list, use_old_protocol=True)
-    except BadStateError:
-        pytest.skip("speculos automation failed, not the test")
+    tx = fake_signable_tx(outputs=outputs)
+    signatures = cmd.sign_tx(tx, change_list=change_list, use_old_protocol=True)
+    tx.verify_signatures(signatures, public_key_bytes)
 
 
-@pytest.mark.skip("speculos: hanging tests")
+@pytest.mark.screen_events
 def test_sign_tx_change_protocol_v1(cmd, public_key_bytes):
     outputs = [
         TxOutput(
-            fake.pyint(1),
+            gen.randint(1, 9999),
             P2PKH.create_output_script(
                 get_address_from_public_key_hash(get_hash160(public_key_bytes[x]))
             ),
         )
         for x in range(5)
     ]
-    change_indices = [fake.pyint(0, 5) for x in range(5)]
+    change_indices = sorted(gen.random.sample(range(5), gen.randint(1, 4)))
     change_list = [
         ChangeInfo(change_index, "m/44'/280'/0'/0/{}".format(change_index))
         for change_index in change_indices
     ]
-    tx = fake_tx(outputs=outputs, tokens=[])
-    try:
-        cmd.sign_tx(tx, change_list=change_list, use_old_protocol=False)
-    except BadStateError:
-        pytest.skip("speculos automation failed, not the test")
+    tx = fake_signable_tx(outputs=outputs)
+    signatures = cmd.sign_tx(tx, change_list=change_list, use_old_protocol=False)
+    tx.verify_signatures(signatures, public_key_bytes)
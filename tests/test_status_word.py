@@ -1,32 +1,7 @@
-import re
-from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
-from app_client.exception import DeviceException
-
-SW_RE = re.compile(
-    r"""(?x)
-    \#                                 # character '#'
-    define                             # string 'define'
-    \s+                                # spaces
-    (?P<identifier>SW(?:_[A-Z0-9]+)*)  # identifier (e.g. 'SW_OK')
-    \s+                                # spaces
-    0x(?P<sw>[a-fA-F0-9]{4})           # 4 bytes status word
-"""
-)
-
-
-def parse_sw(path: Path) -> List[Tuple[str, int]]:
-    if not path.is_file():
-        raise FileNotFoundError(f"Can't find file: '{path}'")
-
-    sw_h: str = path.read_text()
-
-    return [
-        (identifier, int(sw, base=16))
-        for identifier, sw in SW_RE.findall(sw_h)
-        if sw != "9000"
-    ]
+from app_client.exception import DeviceException, StatusWord
+from utils import parse_sw
 
 
 def test_status_word(sw_h_path):
@@ -44,3 +19,7 @@ def test_status_word(sw_h_path):
         assert (
             sw in expected_status_words
         ), f"{status_words[sw]}({hex(sw)}) not found in sw.h!"
+
+
+def test_status_word_exceptions():
+    assert set(DeviceException.exc) == set(StatusWord) - {StatusWord.SW_OK}
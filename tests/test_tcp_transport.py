@@ -0,0 +1,73 @@
+import socket
+import struct
+import threading
+
+from app_client.cmd import Command
+from app_client.emulator import HathorEmulator
+from app_client.transport import TcpApduTransport
+from utils import fake_signable_tx
+
+
+class SpeculosApduServer:
+    """Stand-in for the speculos APDU port, answered by `HathorEmulator`."""
+
+    def __init__(self, device: HathorEmulator) -> None:
+        self.device = device
+        self.server = socket.create_server(("127.0.0.1", 0))
+        self.port = self.server.getsockname()[1]
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def recv_exactly(self, conn: socket.socket, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError
+            data += chunk
+        return data
+
+    def serve(self) -> None:
+        conn, _ = self.server.accept()
+        with conn:
+            try:
+                while True:
+                    (size,) = struct.unpack(">I", self.recv_exactly(conn, 4))
+                    sw, response = self.device.exchange_apdu_raw(
+                        self.recv_exactly(conn, size)
+                    )
+                    conn.sendall(
+                        b"".join(
+                            [
+                                struct.pack(">I", len(response)),
+                                response,
+                                sw.to_bytes(2, byteorder="big"),
+                            ]
+                        )
+                    )
+            except ConnectionError:
+                pass
+
+    def close(self) -> None:
+        self.server.close()
+        self.thread.join(timeout=5)
+
+
+def test_tcp_transport_sign_tx(public_key_bytes):
+    server = SpeculosApduServer(HathorEmulator())
+    transport = TcpApduTransport("127.0.0.1", server.port, timeout=5)
+    cmd = Command(transport)
+    try:
+        assert transport.socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+        assert cmd.get_version()[0] == b"HTR"
+
+        tx = fake_signable_tx(10)
+        signatures = cmd.sign_tx(tx)
+        tx.verify_signatures(signatures, public_key_bytes)
+
+        # errors only carry the status word
+        sw, response = transport.exchange_apdu_raw(bytes.fromhex("e0ff000000"))
+        assert (sw, response) == (0x6D00, b"")
+    finally:
+        transport.close()
+        server.close()
@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app_client.cmd import Command
+from app_client.emulator import HathorEmulator
+from app_client.token_cache import TokenSignatureCache
+from utils import fake_token
+
+
+class ScreenCounter:
+    def __init__(self):
+        self.screens = []
+
+    def __call__(self, title, fields):
+        self.screens.append(title)
+        return True
+
+    def count(self, title):
+        return self.screens.count(title)
+
+
+def test_token_cache_persistent(tmp_path):
+    approve = ScreenCounter()
+    device = HathorEmulator(approve=approve)
+    tokens = [fake_token() for _ in range(5)]
+
+    cache = TokenSignatureCache(tmp_path / "tokens.db")
+    cmd = Command(device, token_cache=cache)
+    cmd.send_token_data_list(tokens)
+    cmd.send_token_data_list(tokens)
+    cache.close()
+    assert approve.count("Confirm token data") == 5
+
+    # a new session reuses the stored signatures
+    cache = TokenSignatureCache(tmp_path / "tokens.db")
+    cmd = Command(device, token_cache=cache, device_id=cmd.device_fingerprint())
+    cmd.send_token_data_list(tokens)
+    assert approve.count("Confirm token data") == 5
+    assert len(cache) == 5
+
+
+def test_token_cache_reset():
+    approve = ScreenCounter()
+    device = HathorEmulator(approve=approve)
+    cache = TokenSignatureCache()
+    cmd = Command(device, token_cache=cache)
+    token = fake_token()
+
+    signature = cmd.sign_token_data(token)
+    device_id = cmd.device_fingerprint()
+    assert cmd.sign_token_data(token) == signature
+    assert cache.epoch(device_id) == 0
+
+    cmd.reset_token_signatures()
+    assert cache.epoch(device_id) == 1
+    assert len(cache) == 0
+    assert cmd.sign_token_data(token) != signature
+    assert approve.count("Confirm token data") == 2
+
+
+def test_token_cache_external_reset():
+    approve = ScreenCounter()
+    device = HathorEmulator(approve=approve)
+    cache = TokenSignatureCache()
+    cmd = Command(device, token_cache=cache)
+    tokens = [fake_token() for _ in range(3)]
+    cmd.send_token_data_list(tokens)
+
+    # reset by a client without the cache, stored signatures are stale
+    Command(device).reset_token_signatures()
+    cmd.send_token_data_list(tokens)
+
+    assert cache.epoch(cmd.device_fingerprint()) == 1
+    assert approve.count("Confirm token data") == 6
+    assert [uid for uid, _ in device.token_registry] == [t.uid for t in tokens]
+
+
+def test_token_cache_external_reset_sign():
+    approve = ScreenCounter()
+    device = HathorEmulator(approve=approve)
+    cmd = Command(device, token_cache=TokenSignatureCache())
+    token = fake_token()
+    signature = cmd.sign_token_data(token)
+
+    Command(device).reset_token_signatures()
+    new_signature = cmd.sign_token_data(token)
+
+    assert new_signature != signature
+    cmd.verify_token_signature(token, new_signature)
+    assert cmd.token_cache.epoch(cmd.device_fingerprint()) == 1
+    assert approve.count("Confirm token data") == 2
+
+
+def test_token_cache_bump_epoch_threads():
+    cache = TokenSignatureCache()
+    device = bytes(4)
+
+    with ThreadPoolExecutor(8) as executor:
+        epochs = list(executor.map(lambda _: cache.bump_epoch(device), range(200)))
+
+    assert sorted(epochs) == list(range(1, 201))
+    assert cache.epoch(device) == 200
@@ -0,0 +1,66 @@
+import logging
+
+from app_client.cmd import Command
+from app_client.emulator import HathorEmulator
+from app_client.trace import Hex, Tracer, logger, tracer
+from utils import fake_tx
+
+
+class Unformattable:
+    def __str__(self) -> str:
+        raise AssertionError("formatted while disabled")
+
+
+def test_tracer_disabled(caplog):
+    caplog.set_level(logging.WARNING, logger=logger.name)
+    trace = Tracer()
+
+    assert not trace.enabled
+    trace.event(logging.DEBUG, "%s", Unformattable())
+    assert list(trace) == []
+
+
+def test_tracer_ring():
+    trace = Tracer(ring_size=3)
+    data = bytearray(b"\xe0\x04\x00\x00\x00")
+
+    assert trace.enabled
+    for i in range(5):
+        data[3] = i
+        trace.exchange("test", memoryview(data), 0x9000, bytes([i]))
+
+    # oldest exchanges are dropped, data is copied out of the reused buffer
+    assert [(r.data[3], r.response) for r in trace] == [
+        (2, b"\x02"),
+        (3, b"\x03"),
+        (4, b"\x04"),
+    ]
+    assert "e004000400" in trace.format()
+    assert "9000 04" in trace.format()
+
+    trace.clear()
+    assert trace.format() == ""
+
+
+def test_tracer_logging(caplog):
+    previous = logger.level
+    caplog.set_level(logging.DEBUG, logger=logger.name)
+    tracer.configure()
+    try:
+        assert tracer.enabled
+        cmd = Command(HathorEmulator())
+        cmd.sign_tx(fake_tx(tokens=[]))
+    finally:
+        # keep the session tracing (--log-level, --apdu-trace) as it was
+        logger.setLevel(previous)
+        tracer.configure()
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(msg.startswith("change: 0100") for msg in messages)
+    assert any(msg.startswith("sign_tx: 9000") for msg in messages)
+    assert any(" emulator > e006" in msg for msg in messages)
+
+
+def test_hex():
+    assert str(Hex(b"\x01\x02")) == "0102"
+    assert str(Hex(memoryview(b"\x01\x02"))) == "0102"
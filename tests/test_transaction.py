@@ -0,0 +1,101 @@
+import pytest
+
+from app_client.transaction import Transaction, TransactionError, TxInput, TxOutput
+from utils import fake_script, fake_tx, gen
+
+
+def test_serialize_layout():
+    tx_id = bytes(range(32))
+    token = bytes(range(32, 64))
+    script = fake_script()
+    tx = Transaction(
+        1,
+        [token],
+        [TxInput(tx_id, 7)],
+        [TxOutput(100, script), TxOutput(2 ** 31, script, 1)],
+    )
+
+    assert tx.serialize() == b"".join(
+        [
+            b"\x00\x01\x01\x01\x02",
+            token,
+            tx_id,
+            b"\x07\x00\x00",
+            b"\x00\x00\x00\x64\x00\x00\x19",
+            script,
+            (-(2 ** 31)).to_bytes(8, byteorder="big", signed=True),
+            b"\x01\x00\x19",
+            script,
+        ]
+    )
+
+
+def test_serialize_size():
+    tx = fake_tx()
+
+    assert len(tx.serialize()) == tx.serialized_size()
+    assert tx.serialize() is tx.serialize()
+    for tx_output in tx.outputs:
+        assert len(tx_output.serialize()) == tx_output.serialized_size()
+
+
+def test_serialize_max_size():
+    inputs = [TxInput(gen.randbytes(32), gen.randint(0, 255)) for _ in range(255)]
+    outputs = [TxOutput(gen.randint(1, 2 ** 60), fake_script()) for _ in range(255)]
+    tokens = [gen.randbytes(32) for _ in range(10)]
+    tx = Transaction(1, tokens, inputs, outputs)
+    sighash_all = tx.serialize()
+
+    assert len(sighash_all) == tx.serialized_size()
+    assert sighash_all[:5] == b"\x00\x01\x0a\xff\xff"
+
+
+def test_serialize_iter():
+    tx = fake_tx()
+
+    assert b"".join(tx.serialize_iter()) == tx.serialize()
+
+
+def test_from_bytes():
+    tokens = [gen.randbytes(32) for _ in range(10)]
+    inputs = [TxInput(gen.randbytes(32), gen.randint(0, 255)) for _ in range(255)]
+    outputs = [
+        TxOutput(gen.randint(1, 2 ** 60), fake_script(), gen.randint(0, 10), x % 2 == 0)
+        for x in range(255)
+    ]
+    sighash_all = Transaction(1, tokens, inputs, outputs).serialize()
+
+    tx = Transaction.from_bytes(sighash_all)
+
+    assert tx.serialize() == sighash_all
+    assert tx.tokens == tokens
+    assert [(i.tx_id, i.index) for i in tx.inputs] == [
+        (i.tx_id, i.index) for i in inputs
+    ]
+    assert [(o.value, o.token_data, o.script) for o in tx.outputs] == [
+        (o.value, o.token_data, o.script) for o in outputs
+    ]
+    # also parses from a view, e.g. inside a larger buffer
+    assert Transaction.from_bytes(memoryview(sighash_all)).serialize() == sighash_all
+
+
+def test_from_bytes_errors():
+    sighash_all = fake_tx().serialize()
+
+    with pytest.raises(TransactionError):
+        Transaction.from_bytes(sighash_all[:-1])
+    with pytest.raises(TransactionError):
+        Transaction.from_bytes(sighash_all + b"\x00")
+    bad_token = fake_tx(tokens=[gen.randbytes(32)])
+    bad_token.outputs[0].token_data = 2
+    with pytest.raises(TransactionError, match="token index"):
+        Transaction.from_bytes(bad_token.serialize())
+
+    tx_input = TxInput(gen.randbytes(32), 1)
+    with pytest.raises(TransactionError):
+        TxInput.from_bytes(tx_input.serialize()[:-2] + b"\x00\x01")
+
+    tx_output = TxOutput(2 ** 40, fake_script())
+    assert TxOutput.from_bytes(tx_output.serialize()).value == 2 ** 40
+    with pytest.raises(TransactionError):
+        TxOutput.from_bytes(tx_output.serialize()[:-1])
@@ -1,21 +1,21 @@
-from faker import Faker
+import pytest
 
 from app_client.transaction import Transaction, TxInput, TxOutput
-from utils import fake_path, fake_script, fake_token
+from utils import fake_path, fake_script, fake_token, gen
 
-fake = Faker()
+pytestmark = pytest.mark.token_signatures
 
 
 def test_sign_tx_with_token(cmd):
-    num = fake.pyint(2, 8)
+    num = gen.randint(2, 8)
     print("Sending TX with {} custom tokens".format(num))
 
     tokens = [fake_token() for _ in range(num)]
     inputs = [
-        TxInput(fake.sha256(True), fake.pyint(0, 255), fake_path())
+        TxInput(gen.randbytes(32), gen.randint(0, 255), fake_path())
         for _ in range(num + 1)
     ]
-    outputs = [TxOutput(fake.pyint(1), fake_script(), x) for x in range(num + 1)]
+    outputs = [TxOutput(gen.randint(1, 9999), fake_script(), x) for x in range(num + 1)]
     tx = Transaction(1, [t.uid for t in tokens], inputs, outputs)
     print(str(tx))
     sigs = []
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils import check_devices, worker_device
+
+
+class FakeConfig:
+    def __init__(self, workerid=None, workercount=None, numprocesses=None, **options):
+        self.options = {
+            "url": "http://localhost:5000/",
+            "apdu_port": None,
+            "emulator": False,
+            "hid": False,
+            **options,
+        }
+        self.option = SimpleNamespace(numprocesses=numprocesses)
+        if workerid is not None:
+            self.workerinput = {"workerid": workerid, "workercount": workercount}
+
+    def getoption(self, name):
+        return self.options[name]
+
+
+def test_worker_device():
+    url = "http://localhost:5000/,http://localhost:5001/"
+    options = {"url": url, "apdu_port": "9999, 9998"}
+
+    assert worker_device(FakeConfig(**options), "url") == "http://localhost:5000/"
+    gw1 = FakeConfig("gw1", 2, **options)
+    assert worker_device(gw1, "url") == "http://localhost:5001/"
+    assert worker_device(gw1, "apdu_port") == "9998"
+    assert worker_device(FakeConfig("gw1", 2), "apdu_port") is None
+
+
+def test_check_devices():
+    url = "http://localhost:5000/,http://localhost:5001/"
+
+    check_devices(FakeConfig(numprocesses=2, url=url, apdu_port="9999,9998"))
+    check_devices(FakeConfig("gw1", 2, url=url))
+    check_devices(FakeConfig(numprocesses=4, emulator=True))
+    with pytest.raises(pytest.UsageError, match="--apdu-port"):
+        check_devices(FakeConfig(numprocesses=2, url=url, apdu_port="9999"))
+    with pytest.raises(pytest.UsageError, match="workers"):
+        check_devices(FakeConfig(numprocesses=3, url=url))
+    with pytest.raises(pytest.UsageError, match="workers"):
+        check_devices(FakeConfig(numprocesses=2, hid=True))
@@ -0,0 +1,82 @@
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from hathorlib.utils import get_address_b58_from_public_key_hash, get_hash160
+
+from app_client.utils import Bip32Path
+from app_client.xpub import (
+    CURVE_ORDER,
+    GENERATOR,
+    XPub,
+    addresses_from_public_keys,
+    compress_point,
+    decode_point,
+    derive_addresses,
+    scalar_base_mult,
+)
+
+
+def test_xpub_addresses(cmd, public_key_bytes, addresses):
+    xpub = XPub.from_device(cmd, "m/44'/280'/0'/0")
+
+    assert [address for _, address in xpub.addresses(0, 10)] == addresses
+    assert [xpub.public_key_at(i) for i in range(10)] == public_key_bytes
+
+
+def test_xpub_child_matches_device(cmd):
+    account = XPub.from_device(cmd, "m/44'/280'/0'")
+    pub_key, chain_code, fingerprint = cmd.get_xpub("m/44'/280'/0'/0/10")
+
+    child = account.derive("0/10")
+
+    assert child.path == Bip32Path.parse("m/44'/280'/0'/0/10")
+    assert child.public_key == compress_point(decode_point(pub_key))
+    assert child.chain_code == chain_code
+    assert child.fingerprint == fingerprint
+    assert account.child(0) is account.child(0)
+    with pytest.raises(ValueError):
+        account.child(0x80000000)
+
+
+def test_decode_point():
+    pub_key = bytes.fromhex(
+        "04962e6c4afe696afa985363fb53bee05cd22463b1cb79bde72ffb8fbd029c6e7d"
+        "d6469fb7bc5bdf9e362212434f581d882cbba2522e2a708340d2cba101c5e850"
+    )
+    point = decode_point(pub_key)
+
+    assert decode_point(compress_point(point)) == point
+    with pytest.raises(ValueError):
+        decode_point(pub_key[:33])
+
+
+def test_scalar_base_mult():
+    for scalar in [1, 2, 255, 256, CURVE_ORDER - 1, 0x1234 << 200]:
+        numbers = (
+            ec.derive_private_key(scalar, ec.SECP256K1()).public_key().public_numbers()
+        )
+        assert scalar_base_mult(scalar) == (numbers.x, numbers.y)
+    # doubling and point at infinity
+    assert scalar_base_mult(1, offset=GENERATOR) == scalar_base_mult(2)
+    assert scalar_base_mult(CURVE_ORDER - 1, offset=GENERATOR) is None
+
+
+def test_derive_addresses(cmd, addresses):
+    xpub = XPub.from_device(cmd, "m/44'/280'/0'/0")
+    expected = [(i, xpub.address(i)) for i in range(95, 130)]
+
+    assert list(derive_addresses(xpub, 0, 10, processes=0)) == list(
+        enumerate(addresses)
+    )
+    assert list(derive_addresses(xpub, 95, 35, processes=0, chunk_size=8)) == expected
+    assert list(derive_addresses(xpub, 95, 35, processes=2, chunk_size=8)) == expected
+    # checked before the first address is requested
+    for start, count in [(-1, 10), (0, -1), (0x80000000 - 5, 10)]:
+        with pytest.raises(ValueError):
+            derive_addresses(xpub, start, count)
+
+
+def test_address_encoding(public_key_bytes):
+    assert addresses_from_public_keys(public_key_bytes) == [
+        get_address_b58_from_public_key_hash(get_hash160(key))
+        for key in public_key_bytes
+    ]
@@ -1,30 +1,203 @@
-from typing import Optional
+import os
+import random
+import re
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
 
-import hathorlib
-from faker import Faker
+import pytest
 
+from app_client.emulator import P2PKH_PREFIX, P2PKH_SUFFIX
 from app_client.token import Token
-from app_client.transaction import Transaction, TxInput, TxOutput
+from app_client.transaction import (
+    MAX_OUTPUT_VALUE_32,
+    TX_HEADER,
+    TX_MAX_INPUTS,
+    TX_MAX_OUTPUTS,
+    TX_MAX_TOKENS,
+    TX_OUTPUT_HEADER_32,
+    Transaction,
+    TxInput,
+    TxOutput,
+)
+from app_client.utils import Bip32Path
 
-fake = Faker()
+PATHS: List[str] = ["m/44'/280'/0'/0/{}".format(i) for i in range(256)]
+SYMBOL_LETTERS: bytes = b"ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+class TxGenerator:
+    """Seeded generator of test transactions, much faster than Faker.
+
+    Random bytes are cut from slabs of `slab_size` bytes, P2PKH scripts are
+    built from a template and BIP32 paths are parsed once, so a transaction
+    costs a few slices and object constructions.
+    The same seed always generates the same data.
+    """
+
+    def __init__(self, seed: Optional[int] = None, slab_size: int = 1 << 16) -> None:
+        self.slab_size = slab_size
+        self._paths: List[Bip32Path] = [Bip32Path.parse(path) for path in PATHS]
+        self.reseed(seed)
+
+    def reseed(self, seed: Optional[int] = None) -> None:
+        """Restart the sequence from `seed`, a random one when None."""
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), byteorder="big")
+        self.seed = seed
+        self.random = random.Random(seed)
+        self._slab: bytes = b""
+        self._pos: int = 0
+
+    def randbytes(self, size: int) -> bytes:
+        if self._pos + size > len(self._slab):
+            slab_size = max(self.slab_size, size)
+            self._slab = self.random.getrandbits(8 * slab_size).to_bytes(
+                slab_size, byteorder="big"
+            )
+            self._pos = 0
+        pos = self._pos
+        self._pos += size
+        return self._slab[pos : self._pos]
+
+    def randint(self, low: int, high: int) -> int:
+        """Random integer in [low, high]."""
+        return self.random.randrange(low, high + 1)
+
+    def count(self, high: int = 10) -> int:
+        """Random count in [1, high] from a single byte (high <= 256)."""
+        return 1 + self.randbytes(1)[0] % high
+
+    def path(self) -> Bip32Path:
+        return self._paths[self.randbytes(1)[0]]
+
+    def script(self) -> bytes:
+        """Output P2PKH script for a random public key hash."""
+        return P2PKH_PREFIX + self.randbytes(20) + P2PKH_SUFFIX
+
+    def input(self) -> TxInput:
+        data = self.randbytes(34)
+        return TxInput(data[:32], data[32], self._paths[data[33]])
+
+    def output(
+        self, value: Optional[int] = None, token_data: int = 0, authority: bool = False
+    ) -> TxOutput:
+        data = self.randbytes(22)
+        if value is None:
+            value = 1 + (data[20] << 8 | data[21]) % 9999
+        return TxOutput(
+            value, P2PKH_PREFIX + data[:20] + P2PKH_SUFFIX, token_data, authority
+        )
+
+    def token(self) -> Token:
+        data = self.randbytes(40)
+        symbol = bytes(SYMBOL_LETTERS[b % 26] for b in data[32 : 32 + 2 + data[32] % 4])
+        name = symbol.decode() + " token"
+        return Token(1, symbol.decode(), name, data[:32])
+
+    def tx(
+        self,
+        num_inputs: Optional[int] = None,
+        num_outputs: Optional[int] = None,
+        num_tokens: Optional[int] = None,
+        big_values: bool = False,
+        authority: bool = False,
+    ) -> Transaction:
+        """Random transaction, counts default to 1-10 like `fake_tx`.
+
+        `big_values` makes every output value need 8 bytes, `authority` marks
+        the outputs of custom tokens as authorities.
+        All the random bytes of the transaction are taken in a single slice.
+        """
+        if num_inputs is None:
+            num_inputs = self.count()
+        if num_outputs is None:
+            num_outputs = self.count()
+        if num_tokens is None:
+            num_tokens = self.count()
+
+        data = self.randbytes(32 * num_tokens + 34 * num_inputs + 22 * num_outputs)
+        end = 32 * num_tokens
+        tokens = [data[i : i + 32] for i in range(0, end, 32)]
+        paths = self._paths
+        inputs = [
+            TxInput(data[i : i + 32], data[i + 32], paths[data[i + 33]])
+            for i in range(end, end + 34 * num_inputs, 34)
+        ]
+        end += 34 * num_inputs
+
+        base = MAX_OUTPUT_VALUE_32 + 1 if big_values else 1
+        outputs = []
+        for n, i in enumerate(range(end, len(data), 22)):
+            token_data = n % (num_tokens + 1)
+            outputs.append(
+                TxOutput(
+                    base + (data[i + 20] << 8 | data[i + 21]) % 9999,
+                    P2PKH_PREFIX + data[i : i + 20] + P2PKH_SUFFIX,
+                    token_data,
+                    authority and token_data > 0,
+                )
+            )
+        return Transaction(1, tokens, inputs, outputs)
+
+    def sighash(
+        self,
+        num_inputs: Optional[int] = None,
+        num_outputs: Optional[int] = None,
+        num_tokens: Optional[int] = None,
+    ) -> bytes:
+        """sighash_all data of a random transaction, no object is built.
+
+        Same shape as `tx` with 4 byte values, for fuzzing and bulk archives.
+        """
+        if num_inputs is None:
+            num_inputs = self.count()
+        if num_outputs is None:
+            num_outputs = self.count()
+        if num_tokens is None:
+            num_tokens = self.count()
+
+        data = self.randbytes(32 * num_tokens + 33 * num_inputs + 22 * num_outputs)
+        end = 32 * num_tokens + 33 * num_inputs
+        pieces = [TX_HEADER.pack(1, num_tokens, num_inputs, num_outputs)]
+        pieces.append(data[: 32 * num_tokens])
+        # tx_id and index then a 0 data length
+        pieces.extend(
+            data[i : i + 33] + b"\x00\x00" for i in range(32 * num_tokens, end, 33)
+        )
+        for n, i in enumerate(range(end, len(data), 22)):
+            value = 1 + (data[i + 20] << 8 | data[i + 21]) % 9999
+            header = TX_OUTPUT_HEADER_32.pack(value, n % (num_tokens + 1), 25)
+            pieces.extend((header, P2PKH_PREFIX, data[i : i + 20], P2PKH_SUFFIX))
+        return b"".join(pieces)
+
+    def edge_txs(self) -> Iterator[Transaction]:
+        """Transactions at the limits of the device and of the serialization."""
+        yield self.tx(num_inputs=TX_MAX_INPUTS, num_outputs=1, num_tokens=0)
+        yield self.tx(num_inputs=1, num_outputs=TX_MAX_OUTPUTS, num_tokens=0)
+        yield self.tx(num_tokens=TX_MAX_TOKENS, num_outputs=TX_MAX_TOKENS + 1)
+        yield self.tx(big_values=True)
+        yield self.tx(num_tokens=3, num_outputs=8, authority=True)
+        yield self.tx(num_inputs=0, num_outputs=1, num_tokens=0)
+
+
+gen = TxGenerator()
 
 
 def fake_path() -> str:
-    return "m/44'/280'/0'/0/{}".format(fake.pyint(0, 255))
+    return PATHS[gen.randbytes(1)[0]]
 
 
 def fake_script() -> bytes:
     """Output P2PKH script for a random address"""
-    # return b"".join([b"\x76\xa9\x14", pkh, b"\x88\xac"])
-    return hathorlib.scripts.P2PKH.create_output_script(fake.binary(length=25))
+    return gen.script()
 
 
 def fake_input() -> TxInput:
-    return TxInput(fake.sha256(True), fake.pyint(0, 255), fake_path())
+    return gen.input()
 
 
 def fake_output() -> TxOutput:
-    return TxOutput(fake.pyint(1), fake_script())
+    return gen.output()
 
 
 def fake_tx(
@@ -32,17 +205,114 @@ def fake_tx(
     outputs: Optional[TxOutput] = None,
     tokens: Optional[bytes] = None,
 ) -> Transaction:
-    tx_inps = inputs or [fake_input() for _ in range(fake.pyint(1, 10))]
-    tx_outps = outputs or [fake_output() for _ in range(fake.pyint(1, 10))]
-    tkns = (
-        [fake.sha256(True) for _ in range(fake.pyint(1, 10))]
-        if tokens is None
-        else tokens
+    # outputs are all HTR, tokens are only listed
+    tx = gen.tx(
+        num_inputs=0 if inputs else None,
+        num_outputs=0 if outputs else None,
+        num_tokens=0,
+    )
+    if inputs:
+        tx.inputs = inputs
+    if outputs:
+        tx.outputs = outputs
+    tx.tokens = (
+        [gen.randbytes(32) for _ in range(gen.count())] if tokens is None else tokens
     )
+    return tx
+
 
-    return Transaction(1, tkns, tx_inps, tx_outps)
+def fake_signable_tx(
+    num_inputs: int = 10, outputs: Optional[List[TxOutput]] = None
+) -> Transaction:
+    """Transaction without tokens spending from m/44'/280'/0'/0/{i % 10}.
+
+    Input `i` is signed by the key `i % 10` of the `public_key_bytes` fixture.
+    """
+    inputs = [
+        TxInput(gen.randbytes(32), gen.randbytes(1)[0], PATHS[i % 10])
+        for i in range(num_inputs)
+    ]
+    return fake_tx(inputs=inputs, outputs=outputs, tokens=[])
 
 
 def fake_token():
-    c = fake.cryptocurrency()
-    return Token(1, c[0], c[1], fake.sha256())
+    return gen.token()
+
+
+SW_RE = re.compile(
+    r"""(?x)
+    \#                                 # character '#'
+    define                             # string 'define'
+    \s+                                # spaces
+    (?P<identifier>SW(?:_[A-Z0-9]+)*)  # identifier (e.g. 'SW_OK')
+    \s+                                # spaces
+    0x(?P<sw>[a-fA-F0-9]{4})           # 4 bytes status word
+"""
+)
+
+
+def parse_sw(path: Path) -> List[Tuple[str, int]]:
+    if not path.is_file():
+        raise FileNotFoundError(f"Can't find file: '{path}'")
+
+    sw_h: str = path.read_text()
+
+    return [
+        (identifier, int(sw, base=16))
+        for identifier, sw in SW_RE.findall(sw_h)
+        if sw != "9000"
+    ]
+
+
+def worker_index(config) -> int:
+    """Index of this pytest-xdist worker (gw0, gw1, ...), 0 without xdist."""
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is None:
+        return 0
+    return int(workerinput["workerid"][2:])
+
+
+def worker_count(config) -> int:
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is not None:
+        return int(workerinput["workercount"])
+    # on the xdist controller -n is already resolved ("auto" included)
+    return max(getattr(config.option, "numprocesses", None) or 1, 1)
+
+
+def split_option(value) -> List[str]:
+    return [item.strip() for item in str(value).split(",") if item.strip()]
+
+
+def worker_device(config, name: str) -> Optional[str]:
+    """Item of the comma separated option `name` used by this worker.
+
+    `check_devices` makes sure there is one per worker, with --emulator the
+    workers share the single default --url, which is not used.
+    """
+    value = config.getoption(name)
+    if not value:
+        return None
+    items = split_option(value)
+    return items[worker_index(config) % len(items)]
+
+
+def check_devices(config) -> None:
+    """One device per xdist worker, and one --apdu-port per --url."""
+    # every worker needs its own device, the emulator is created per worker
+    if config.getoption("emulator"):
+        return
+    urls = split_option(config.getoption("url"))
+    ports = config.getoption("apdu_port")
+    if ports and len(split_option(ports)) != len(urls):
+        raise pytest.UsageError(
+            f"{len(split_option(ports))} --apdu-port for {len(urls)} --url, "
+            "give one port per Speculos"
+        )
+    workers = worker_count(config)
+    devices = 1 if config.getoption("hid") else len(urls)
+    if workers > devices:
+        raise pytest.UsageError(
+            f"{workers} xdist workers for {devices} device(s), "
+            "give one --url per worker or use --emulator"
+        )